@@ -1,16 +1,68 @@
-from aws_cdk import CfnOutput, Duration, RemovalPolicy, Stack
+import subprocess
+import sys
+
+import jsii
+from aws_cdk import (
+    BundlingOptions,
+    CfnOutput,
+    Duration,
+    ILocalBundling,
+    RemovalPolicy,
+    Stack,
+)
 from aws_cdk import aws_apigateway as apigateway
+from aws_cdk import aws_cloudfront as cloudfront
+from aws_cdk import aws_cloudfront_origins as origins
+from aws_cdk import aws_dynamodb as dynamodb
+from aws_cdk import aws_events as events
+from aws_cdk import aws_events_targets as events_targets
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_lambda as _lambda
+from aws_cdk import aws_lambda_event_sources as lambda_event_sources
 from aws_cdk import aws_s3 as s3
 from aws_cdk import aws_secretsmanager as secretsmanager
+from aws_cdk import aws_sqs as sqs
 from constructs import Construct
 
 NOTION_DATABASE_ID = "2c248e8d495b4722b002958aa4b8e70e"
+# 게시 Lambda에 함께 배포하는 boto3 (조건부 PutObject(IfMatch)는 1.35.68부터 지원)
+BOTO3_LAYER_REQUIREMENTS = "layers/boto3"
+
+
+@jsii.implements(ILocalBundling)
+class LocalPipBundling:
+    """Docker 없이 로컬 pip로 layer 패키지 설치 (실패하면 Docker 이미지로 빌드)
+
+    boto3와 의존성은 순수 Python이라 로컬에서 설치해도 Lambda에서 그대로 동작한다.
+    """
+
+    def __init__(self, requirements):
+        self.requirements = requirements
+
+    def try_bundle(self, output_dir, options):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--quiet",
+                "-r",
+                f"{self.requirements}/requirements.txt",
+                "-t",
+                f"{output_dir}/python",
+            ]
+        )
+        return result.returncode == 0
 
 
 class PostUploadStack(Stack):
-    def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        **kwargs,
+    ) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
         # S3 버킷 생성
@@ -19,6 +71,57 @@ class PostUploadStack(Stack):
             "PostUploadBucket",
             removal_policy=RemovalPolicy.RETAIN,
             auto_delete_objects=False,  # 버킷 삭제 시 객체 유지
+            lifecycle_rules=[
+                # 게시 작업 상태는 일주일 뒤 만료
+                s3.LifecycleRule(prefix="jobs/", expiration=Duration.days(7)),
+            ],
+        )
+
+        # 게시한 포스트(posts/, assets/, search/)만 서비스하는 CloudFront 배포
+        # 같은 버킷의 작업 상태(jobs/), 동기화 기록과 page index(meta/),
+        # manifest와 블록 캐시는 원본까지 가지 않고 403으로 응답
+        post_origin = origins.S3Origin(post_bucket)  # OAI로 읽기만 허용
+        deny_function = cloudfront.Function(
+            self,
+            "PostCloudFrontDeny",
+            code=cloudfront.FunctionCode.from_inline(
+                "function handler(event) {"
+                " return {statusCode: 403, statusDescription: 'Forbidden'}; }"
+            ),
+        )
+        denied = cloudfront.BehaviorOptions(
+            origin=post_origin,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            function_associations=[
+                cloudfront.FunctionAssociation(
+                    function=deny_function,
+                    event_type=cloudfront.FunctionEventType.VIEWER_REQUEST,
+                )
+            ],
+        )
+        # 사이트(gdg-web-static)와 다른 도메인이므로 프론트엔드가 fetch할 수 있게 CORS 허용
+        public = cloudfront.BehaviorOptions(
+            origin=post_origin,
+            viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+            response_headers_policy=cloudfront.ResponseHeadersPolicy.CORS_ALLOW_ALL_ORIGINS,
+        )
+        distribution = cloudfront.Distribution(
+            self,
+            "PostCloudFront",
+            default_behavior=denied,
+            # 앞의 경로 패턴이 먼저 적용됨
+            additional_behaviors={
+                "posts/*/manifest.json": denied,
+                "posts/*/blocks.json": denied,
+                "posts/*": public,
+                "assets/*": public,
+                "search/*": public,
+            },
+            enable_ipv6=False,  # IPv6 비활성화
+            price_class=cloudfront.PriceClass.PRICE_CLASS_200,
+            geo_restriction=cloudfront.GeoRestriction.allowlist(  # 지리적 제한 설정
+                "KR",  # 한국 지역 허용
+            ),
         )
 
         # Secrets Manager에 저장된 Notion API 키
@@ -26,20 +129,190 @@ class PostUploadStack(Stack):
             self, "NotionApiKey", "notion-api-key"
         )
 
-        # Lambda 함수 생성
+        # 게시 후 오래된 버전 폴더를 비동기로 정리하는 Lambda
+        version_gc_lambda = _lambda.Function(
+            self,
+            "PostVersionGcLambda",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="version_gc.lambda_handler",
+            code=_lambda.Code.from_asset("notion_lambda"),
+            timeout=Duration.minutes(5),
+            environment={
+                "POST_BUCKET": post_bucket.bucket_name,
+            },
+        )
+        post_bucket.grant_read_write(version_gc_lambda)
+
+        # 게시 작업 FIFO 큐 (worker가 15분 동안 처리할 수 있도록 visibility timeout 설정)
+        # 메시지 그룹(custom_id)마다 한 번에 하나씩 처리되므로 같은 포스트의 게시가 겹치지 않고,
+        # 전달 지연 동안 들어온 연속 클릭은 같은 배치로 모여 한 번만 게시됨
+        publish_dlq = sqs.Queue(
+            self,
+            "PostPublishDeadLetterQueue",
+            fifo=True,
+            retention_period=Duration.days(14),
+        )
+        publish_queue = sqs.Queue(
+            self,
+            "PostPublishQueue",
+            fifo=True,
+            content_based_deduplication=True,
+            delivery_delay=Duration.seconds(5),
+            visibility_timeout=Duration.minutes(90),
+            dead_letter_queue=sqs.DeadLetterQueue(
+                max_receive_count=3, queue=publish_dlq
+            ),
+        )
+
+        # 같은 포스트 수정본에 대한 반복 /upload, /delete 요청 기록 (조건부 쓰기, TTL 만료)
+        idempotency_table = dynamodb.Table(
+            self,
+            "PostRequestIdempotencyTable",
+            partition_key=dynamodb.Attribute(
+                name="key", type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            time_to_live_attribute="expires_at",
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
+        lambda_environment = {
+            "POST_BUCKET": post_bucket.bucket_name,
+            "SECRET_NAME": "notion-api-key",
+            "DATABASE_ID": NOTION_DATABASE_ID,
+            "GC_FUNCTION_NAME": version_gc_lambda.function_name,
+            "PUBLISH_QUEUE_URL": publish_queue.queue_url,
+            "IDEMPOTENCY_TABLE": idempotency_table.table_name,
+            # 게시/삭제한 경로만 무효화 (긴 TTL을 써도 바로 반영)
+            "CLOUDFRONT_DISTRIBUTION_ID": distribution.distribution_id,
+        }
+
+        # 본문 이미지의 WebP 사본을 만드는 Pillow layer (선택)
+        # cdk deploy -c pillow_layer_arn=<arn> 으로 지정하지 않으면 원본만 게시
+        pillow_layer_arn = self.node.try_get_context("pillow_layer_arn")
+        publish_layers = []
+        # 큰 스크린샷을 디코딩/리사이즈할 수 있도록 layer를 쓰면 메모리도 늘림
+        publish_memory_size = 1024 if pillow_layer_arn else None
+        if pillow_layer_arn:
+            publish_layers.append(
+                _lambda.LayerVersion.from_layer_version_arn(
+                    self, "PillowLayer", pillow_layer_arn
+                )
+            )
+        # 조건부 PutObject(IfMatch)를 지원하는 boto3 layer
+        # 런타임 기본 boto3는 버전이 보장되지 않으므로 기본 배포에서 직접 빌드해 붙이고,
+        # cdk deploy -c boto3_layer_arn=<arn> 으로 지정하면 그 layer를 사용
+        boto3_layer_arn = self.node.try_get_context("boto3_layer_arn")
+        if boto3_layer_arn:
+            boto3_layer = _lambda.LayerVersion.from_layer_version_arn(
+                self, "Boto3Layer", boto3_layer_arn
+            )
+        else:
+            boto3_layer = _lambda.LayerVersion(
+                self,
+                "Boto3Layer",
+                code=_lambda.Code.from_asset(
+                    BOTO3_LAYER_REQUIREMENTS,
+                    bundling=BundlingOptions(
+                        image=_lambda.Runtime.PYTHON_3_12.bundling_image,
+                        command=[
+                            "bash",
+                            "-c",
+                            "pip install -r requirements.txt -t /asset-output/python",
+                        ],
+                        local=LocalPipBundling(BOTO3_LAYER_REQUIREMENTS),
+                    ),
+                ),
+                compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+                description="boto3>=1.35.68 for conditional PutObject",
+            )
+        publish_layers.append(boto3_layer)
+
+        # Lambda 함수 생성 (API 요청 처리, 업로드는 큐에 넣고 바로 응답)
         post_upload_lambda = _lambda.Function(
             self,
             "PostUploadLambda",
-            runtime=_lambda.Runtime.PYTHON_3_9,
+            runtime=_lambda.Runtime.PYTHON_3_12,
             handler="main.lambda_handler",
             code=_lambda.Code.from_asset("notion_lambda"),
             timeout=Duration.minutes(15),
-            environment={
-                "POST_BUCKET": post_bucket.bucket_name,
-                "SECRET_NAME": "notion-api-key",
-                "DATABASE_ID": NOTION_DATABASE_ID,
-            },
+            environment=lambda_environment,
+            layers=publish_layers,
+            memory_size=publish_memory_size,
+        )
+
+        # 큐의 게시 작업을 처리하는 worker Lambda
+        publish_worker_lambda = _lambda.Function(
+            self,
+            "PostPublishWorkerLambda",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="publish_worker.lambda_handler",
+            code=_lambda.Code.from_asset("notion_lambda"),
+            timeout=Duration.minutes(15),
+            environment=lambda_environment,
+            layers=publish_layers,
+            memory_size=publish_memory_size,
+        )
+        # 배치로 모아 같은 포스트의 연속 요청을 한 번에 처리,
+        # 동시 실행을 제한해 전체 재변환이 겹치지 않게 함
+        # (FIFO 큐는 batching window를 지원하지 않음)
+        publish_worker_lambda.add_event_source(
+            lambda_event_sources.SqsEventSource(
+                publish_queue,
+                batch_size=10,
+                max_concurrency=2,
+                report_batch_item_failures=True,
+            )
+        )
+        publish_queue.grant_send_messages(post_upload_lambda)
+        idempotency_table.grant_read_write_data(post_upload_lambda)
+
+        # 데이터베이스 전체 재게시용 Lambda (직접 호출, 남은 포스트는 sync_id로 이어서 실행)
+        bulk_sync_lambda = _lambda.Function(
+            self,
+            "PostBulkSyncLambda",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="bulk_sync.lambda_handler",
+            code=_lambda.Code.from_asset("notion_lambda"),
+            timeout=Duration.minutes(15),
+            environment=lambda_environment,
+            layers=publish_layers,
+            memory_size=publish_memory_size,
+        )
+
+        # 게시 Lambda가 GC Lambda를 비동기로 호출
+        version_gc_lambda.grant_invoke(post_upload_lambda)
+        # Notion 상태와 S3 게시 상태를 매일 비교해 복구하는 Lambda
+        reconcile_lambda = _lambda.Function(
+            self,
+            "PostReconcileLambda",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="reconcile.lambda_handler",
+            code=_lambda.Code.from_asset("notion_lambda"),
+            timeout=Duration.minutes(15),
+            environment=lambda_environment,
+            layers=publish_layers,
+            memory_size=publish_memory_size,
         )
+        events.Rule(
+            self,
+            "PostReconcileSchedule",
+            schedule=events.Schedule.rate(Duration.days(1)),
+            targets=[events_targets.LambdaFunction(reconcile_lambda)],
+        )
+
+        for publisher in (publish_worker_lambda, bulk_sync_lambda, reconcile_lambda):
+            version_gc_lambda.grant_invoke(publisher)
+            post_bucket.grant_read_write(publisher)
+            notion_api_secret.grant_read(publisher)
+
+        for publisher in (
+            post_upload_lambda,
+            publish_worker_lambda,
+            bulk_sync_lambda,
+            reconcile_lambda,
+        ):
+            distribution.grant_create_invalidation(publisher)
 
         # Lambda의 IAM 역할에 S3 권한 추가
         post_bucket.grant_read_write(post_upload_lambda)
@@ -92,6 +365,12 @@ class PostUploadStack(Stack):
                         "method.response.header.Access-Control-Allow-Headers": True,
                     },
                 ),
+                apigateway.MethodResponse(
+                    status_code="202",
+                    response_parameters={
+                        "method.response.header.Access-Control-Allow-Origin": True,
+                    },
+                ),
                 apigateway.MethodResponse(
                     status_code="403",
                     response_parameters={
@@ -141,6 +420,32 @@ class PostUploadStack(Stack):
             },
         )
 
+        # /status 엔드포인트 (게시 작업 상태 조회)
+        status_resource = api.root.add_resource("status")
+        status_resource.add_method(
+            "GET",
+            post_upload_integration,
+            method_responses=[
+                apigateway.MethodResponse(
+                    status_code="200",
+                    response_parameters={
+                        "method.response.header.Access-Control-Allow-Origin": True,
+                        "method.response.header.Access-Control-Allow-Headers": True,
+                    },
+                ),
+                apigateway.MethodResponse(
+                    status_code="404",
+                    response_parameters={
+                        "method.response.header.Access-Control-Allow-Origin": True,
+                    },
+                ),
+            ],
+            request_parameters={
+                "method.request.header.Authorization": True,
+                "method.request.querystring.job_id": True,
+            },
+        )
+
         # API Gateway에 CORS 추가 (OPTIONS, POST만 허용)
         api.root.add_method(
             "OPTIONS",
@@ -150,7 +455,7 @@ class PostUploadStack(Stack):
                         status_code="200",
                         response_parameters={
                             "method.response.header.Access-Control-Allow-Headers": "'Authorization'",
-                            "method.response.header.Access-Control-Allow-Methods": "'OPTIONS,POST'",
+                            "method.response.header.Access-Control-Allow-Methods": "'OPTIONS,GET,POST'",
                             "method.response.header.Access-Control-Allow-Origin": "'*'",
                         },
                     )
@@ -194,6 +499,30 @@ class PostUploadStack(Stack):
             description="Name of the S3 bucket",
         )
 
+        # 포스트 CloudFront 배포 URL 출력
+        CfnOutput(
+            self,
+            "PostCloudFrontURL",
+            value=f"https://{distribution.distribution_domain_name}",
+            description="The CloudFront distribution URL for published posts",
+        )
+
+        # 전체 재게시 Lambda 이름 출력
+        CfnOutput(
+            self,
+            "BulkSyncFunctionName",
+            value=bulk_sync_lambda.function_name,
+            description="Name of the Lambda function for full-database sync",
+        )
+
+        # 게시 작업 큐 URL 출력
+        CfnOutput(
+            self,
+            "PublishQueueUrl",
+            value=publish_queue.queue_url,
+            description="URL of the SQS queue for publish jobs",
+        )
+
         # Secrets Manager ARN 출력
         CfnOutput(
             self,
@@ -0,0 +1,236 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from botocore.exceptions import BotoCoreError, ClientError
+from cdn import flush_invalidations
+from client import NotionAPIError, fetch_database_pages, fetch_page, request_stats
+from config import get_client
+from main import DATABASE_ID, S3_BUCKET_NAME, check_config, get_custom_id, publish_page
+from metrics import correlation_id, emit_metrics, start_trace
+
+# 동시에 변환할 포스트 수 (Notion 요청은 client의 rate limiter를 함께 사용)
+SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "2"))
+# 남은 실행 시간이 이보다 짧으면 새 포스트를 시작하지 않고 checkpoint만 저장
+SYNC_TIME_MARGIN_SECONDS = float(os.getenv("SYNC_TIME_MARGIN_SECONDS", "180"))
+# 동기화 진행 상태 저장 위치 (posts/와 분리)
+SYNC_PREFIX = "meta/sync"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def build_filter(statuses=None, edited_after=None):
+    """상태와 마지막 수정 시간으로 데이터베이스 쿼리 필터 생성 (조건이 없으면 None)"""
+    conditions = []
+    if statuses:
+        status_filters = [
+            {"property": "status", "status": {"equals": status}} for status in statuses
+        ]
+        conditions.append(
+            status_filters[0] if len(status_filters) == 1 else {"or": status_filters}
+        )
+    if edited_after:
+        conditions.append(
+            {
+                "timestamp": "last_edited_time",
+                "last_edited_time": {"on_or_after": edited_after},
+            }
+        )
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"and": conditions}
+
+
+def checkpoint_key(sync_id):
+    return f"{SYNC_PREFIX}/{sync_id}.json"
+
+
+def load_checkpoint(sync_id, bucket_name):
+    """저장된 동기화 상태 (없으면 None)"""
+    try:
+        response = get_client("s3").get_object(
+            Bucket=bucket_name, Key=checkpoint_key(sync_id)
+        )
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+            print(f"Error loading sync checkpoint {sync_id}: {e}")
+        return None
+
+
+def save_checkpoint(checkpoint, bucket_name):
+    """동기화 상태를 S3에 기록"""
+    checkpoint["updated_at"] = _now()
+    try:
+        get_client("s3").put_object(
+            Bucket=bucket_name,
+            Key=checkpoint_key(checkpoint["sync_id"]),
+            Body=json.dumps(checkpoint, ensure_ascii=False).encode("utf-8"),
+            ContentType="application/json; charset=utf-8",
+        )
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error saving sync checkpoint {checkpoint['sync_id']}: {e}")
+
+
+def select_pages(statuses=None, edited_after=None):
+    """데이터베이스를 한 번 쿼리해 동기화할 페이지 선택
+
+    Returns:
+        {page_id: page 객체} (custom_id가 없는 페이지는 제외, 쿼리 순서 유지)
+    """
+    pages = fetch_database_pages(
+        DATABASE_ID, filter=build_filter(statuses, edited_after)
+    )
+    return {
+        page["id"]: page
+        for page in pages
+        if not page.get("archived") and get_custom_id(page)
+    }
+
+
+def new_checkpoint(pages, params):
+    return {
+        "sync_id": uuid.uuid4().hex,
+        "params": params,
+        "status": "running",
+        "started_at": _now(),
+        "pending": list(pages),
+        "results": [],
+    }
+
+
+def sync_one(page_id, page, force):
+    """포스트 하나를 게시하고 결과와 소요 시간 반환"""
+    started = time.monotonic()
+    custom_id = None
+    try:
+        # 이어서 실행하는 경우 커버 서명 URL이 만료됐을 수 있어 다시 조회
+        page = page or fetch_page(page_id)
+        custom_id = get_custom_id(page)
+        response = publish_page(page, custom_id, force)
+        status_code = response["statusCode"]
+        message = json.loads(response["body"]).get("message")
+    except NotionAPIError as e:
+        status_code, message = 502, f"Notion API request failed: {e}"
+    except Exception as e:
+        status_code, message = 500, str(e)
+    return {
+        "page_id": page_id,
+        "custom_id": custom_id,
+        "status_code": status_code,
+        "message": message,
+        "seconds": round(time.monotonic() - started, 2),
+    }
+
+
+def run_sync(checkpoint, pages, bucket_name, time_left, force=False, max_workers=None):
+    """checkpoint의 남은 페이지를 worker pool로 게시
+
+    time_left()가 SYNC_TIME_MARGIN_SECONDS보다 작아지면 새 포스트를 시작하지 않고,
+    진행 중인 포스트가 끝나면 남은 페이지를 checkpoint에 남긴 채 멈춘다.
+    """
+    max_workers = max_workers or SYNC_MAX_WORKERS
+    queue = list(checkpoint["pending"])
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queue or running:
+            while queue and len(running) < max_workers:
+                if time_left() < SYNC_TIME_MARGIN_SECONDS:
+                    queue = []
+                    break
+                page_id = queue.pop(0)
+                future = executor.submit(sync_one, page_id, pages.get(page_id), force)
+                running[future] = page_id
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_id = running.pop(future)
+                result = future.result()
+                print(
+                    f"Synced post {result['custom_id']} ({page_id}): "
+                    f"{result['status_code']} {result['message']} "
+                    f"in {result['seconds']}s"
+                )
+                checkpoint["results"].append(result)
+                checkpoint["pending"].remove(page_id)
+            save_checkpoint(checkpoint, bucket_name)
+
+    checkpoint["status"] = "paused" if checkpoint["pending"] else "completed"
+    save_checkpoint(checkpoint, bucket_name)
+    return checkpoint
+
+
+def summarize(checkpoint):
+    results = checkpoint["results"]
+    return {
+        "sync_id": checkpoint["sync_id"],
+        "status": checkpoint["status"],
+        "processed": len(results),
+        "pending": len(checkpoint["pending"]),
+        "failed": [
+            result["custom_id"] or result["page_id"]
+            for result in results
+            if result["status_code"] >= 400
+        ],
+        "total_seconds": round(sum(result["seconds"] for result in results), 2),
+    }
+
+
+def lambda_handler(event, context):
+    """데이터베이스 전체(또는 조건에 맞는 포스트)를 다시 게시
+
+    event:
+        statuses: 동기화할 포스트 상태 목록 (예: ["Uploaded"])
+        edited_after: 이 시간 이후 수정된 포스트만 (ISO 8601)
+        force: 블록 캐시를 무시하고 전체 다시 변환
+        sync_id: 이전 실행의 checkpoint에서 이어서 실행
+    """
+    event = event or {}
+    missing = check_config()
+    if missing:
+        raise RuntimeError(f"Missing configuration: {', '.join(missing)}")
+
+    request_stats.reset()
+    start_trace(correlation_id(event, context))
+    try:
+        if event.get("sync_id"):
+            checkpoint = load_checkpoint(event["sync_id"], S3_BUCKET_NAME)
+            if not checkpoint:
+                raise ValueError(f"No sync checkpoint found: {event['sync_id']}")
+            pages = {}
+        else:
+            params = {
+                "statuses": event.get("statuses"),
+                "edited_after": event.get("edited_after"),
+                "force": bool(event.get("force", False)),
+            }
+            pages = select_pages(params["statuses"], params["edited_after"])
+            checkpoint = new_checkpoint(pages, params)
+            print(f"Sync {checkpoint['sync_id']} selected {len(pages)} posts")
+            save_checkpoint(checkpoint, S3_BUCKET_NAME)
+
+        if context:
+            time_left = lambda: context.get_remaining_time_in_millis() / 1000
+        else:
+            time_left = lambda: float("inf")
+
+        checkpoint = run_sync(
+            checkpoint,
+            pages,
+            S3_BUCKET_NAME,
+            time_left,
+            force=checkpoint["params"].get("force", False),
+        )
+        summary = summarize(checkpoint)
+        print(f"Sync summary: {json.dumps(summary)}")
+        return summary
+    finally:
+        flush_invalidations()
+        emit_metrics("bulk_sync", {"Notion": request_stats.snapshot()})
@@ -0,0 +1,88 @@
+import os
+import threading
+import uuid
+from urllib.parse import quote
+
+from botocore.exceptions import BotoCoreError, ClientError
+from config import get_client
+from metrics import current_trace, incr
+
+# 게시한 포스트를 서비스하는 CloudFront 배포 (없으면 무효화하지 않음)
+CLOUDFRONT_DISTRIBUTION_ID = os.getenv("CLOUDFRONT_DISTRIBUTION_ID")
+# 무효화 한 번에 넣는 최대 경로 수 (넘으면 상위 폴더 wildcard로 합침, 비용 상한)
+CDN_MAX_PATHS = int(os.getenv("CDN_MAX_PATHS", "20"))
+
+# 이번 호출에서 바뀐 경로 (flush_invalidations에서 한 번에 무효화)
+_pending = set()
+_lock = threading.Lock()
+
+
+def invalidate(*keys):
+    """바뀐 S3 키를 무효화 대상에 추가 (경로 끝의 *는 prefix 전체)"""
+    with _lock:
+        _pending.update("/" + quote(key.lstrip("/"), safe="/*") for key in keys)
+
+
+def collapse_paths(paths, limit=None):
+    """경로가 limit개를 넘으면 같은 폴더끼리 wildcard로 합치기
+
+    한 단계씩 상위 폴더로 올라가며 합치고, 그래도 많으면 전체("/*")로 무효화한다.
+    예: ["/posts/web/1/a", "/posts/web/1/b"] -> ["/posts/web/1/*"]
+    """
+    limit = limit or CDN_MAX_PATHS
+    paths = sorted(set(paths))
+    depth = max((path.count("/") for path in paths), default=0)
+    while len(paths) > limit and depth > 1:
+        depth -= 1
+        collapsed = set()
+        for path in paths:
+            parts = path.split("/")
+            if len(parts) > depth + 1:
+                path = "/".join(parts[: depth + 1]) + "/*"
+            collapsed.add(path)
+        # 상위 wildcard에 포함되는 경로 제거
+        prefixes = [path[:-1] for path in collapsed if path.endswith("/*")]
+        paths = sorted(
+            path
+            for path in collapsed
+            if not any(
+                path != prefix + "*" and path.startswith(prefix) for prefix in prefixes
+            )
+        )
+    if len(paths) > limit:
+        return ["/*"]
+    return paths
+
+
+def flush_invalidations():
+    """모아 둔 경로를 CloudFront 무효화 한 번으로 요청
+
+    CallerReference는 요청마다 새로 만든다. 같은 값을 다시 쓰면 CloudFront가
+    예전 무효화를 돌려주고 새로 바뀐 객체를 무효화하지 않는다.
+
+    Returns:
+        요청한 경로 목록 (요청하지 않았으면 빈 목록)
+    """
+    with _lock:
+        paths = sorted(_pending)
+        _pending.clear()
+    if not paths or not CLOUDFRONT_DISTRIBUTION_ID:
+        return []
+
+    paths = collapse_paths(paths)
+    reference = f"{current_trace().correlation_id}-{uuid.uuid4().hex}"
+    try:
+        get_client("cloudfront").create_invalidation(
+            DistributionId=CLOUDFRONT_DISTRIBUTION_ID,
+            InvalidationBatch={
+                "Paths": {"Quantity": len(paths), "Items": paths},
+                "CallerReference": reference,
+            },
+        )
+        print(f"Invalidated CloudFront paths: {', '.join(paths)}")
+        incr("cdn_invalidated_paths", len(paths))
+    except (BotoCoreError, ClientError) as e:
+        # 무효화에 실패해도 게시는 그대로 (캐시는 TTL이 지나면 갱신됨)
+        print(f"Error invalidating CloudFront paths: {e}")
+        return []
+    return paths
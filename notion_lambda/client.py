@@ -1,62 +1,151 @@
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import urllib3
-from converter import get_block_content
-from utils import download_thumbnail, generate_metadata, get_secret
+from config import get_secret
+from converter import ConversionContext, get_block_content, resolve_image_links
+from manifest import block_hash, cover_key
+from metrics import incr, span
+from ratelimit import RequestStats, TokenBucket, backoff_delay
+from s3_uploader import store_image, store_thumbnail
+from search_index import page_text
+from utils import NOT_MODIFIED, DownloadPipeline, generate_metadata
 
 # Notion API 설정
-api_secret = get_secret("notion-api-key")
-NOTION_API_KEY = api_secret.get("notion-api-key")
 NOTION_API_URL = "https://api.notion.com/v1"
-HEADERS = {
-    "Authorization": f"Bearer {NOTION_API_KEY}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28",
-}
+NOTION_VERSION = "2022-06-28"
 
-http = urllib3.PoolManager()
+# Notion rate limit: 평균 3 req/s (짧은 burst 허용)
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", "5"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 연결/응답이 멈춘 요청도 연결 오류처럼 재시도되도록 제한 시간(초)을 둠
+NOTION_TIMEOUT = urllib3.Timeout(
+    connect=float(os.getenv("NOTION_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("NOTION_READ_TIMEOUT", "30")),
+)
 
+# 블록 트리 prefetch 동시 요청 수
+NOTION_MAX_WORKERS = int(os.getenv("NOTION_MAX_WORKERS", "3"))
 
-def make_request(method, url, headers=None, body=None, params=None):
-    """Notion API 요청 처리"""
+# 자식이 별도 페이지/데이터베이스인 블록은 prefetch 하지 않음
+SKIP_CHILDREN_TYPES = {"child_page", "child_database"}
+
+http = urllib3.PoolManager(maxsize=NOTION_MAX_WORKERS, timeout=NOTION_TIMEOUT)
+rate_limiter = TokenBucket(NOTION_RATE_LIMIT)
+request_stats = RequestStats()
+
+
+class NotionAPIError(Exception):
+    """재시도 후에도 실패한 Notion API 요청"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def notion_headers():
+    """Notion API 요청 헤더 (API 키는 처음 요청할 때 가져와 캐시)"""
+    secret = get_secret() or {}
+    api_key = secret.get("notion-api-key")
+    if not api_key:
+        raise NotionAPIError("Notion API key is not available")
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Notion-Version": NOTION_VERSION,
+    }
+
+
+def get_retry_after(response):
+    """Retry-After 헤더(초)를 float로 반환, 없으면 None"""
+    value = response.headers.get("Retry-After")
     try:
-        response = http.request(
-            method,
-            url,
-            headers=headers or {},
-            body=json.dumps(body) if body else None,
-            fields=params,
-        )
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def make_request(method, url, headers=None, body=None, params=None):
+    """Notion API 요청 처리
+
+    모든 요청은 rate limiter를 거치고, 429/5xx/연결 오류(제한 시간 초과 포함)는
+    Retry-After 또는 jitter가 적용된 지수 백오프로 재시도한다. 실패 시 NotionAPIError 발생.
+    """
+    error = None
+    for attempt in range(NOTION_MAX_RETRIES + 1):
+        if attempt:
+            request_stats.record_retry()
+            incr("notion_retries")
+            time.sleep(delay)
+
+        rate_limiter.acquire()
+        incr("notion_requests")
+        started = time.monotonic()
+        try:
+            response = http.request(
+                method,
+                url,
+                headers=headers or {},
+                body=json.dumps(body) if body else None,
+                fields=params,
+                retries=False,
+                timeout=NOTION_TIMEOUT,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            request_stats.record(time.monotonic() - started)
+            print(f"Request error ({method} {url}): {e}")
+            error = NotionAPIError(f"Request error: {e}")
+            delay = backoff_delay(attempt)
+            continue
+
+        request_stats.record(time.monotonic() - started, response.status)
+        incr("notion_bytes", len(response.data))
+        if response.status == 429:
+            incr("notion_throttled")
         if response.status >= 200 and response.status < 300:
             return json.loads(response.data.decode("utf-8"))
         elif response.status == 401:
-            raise Exception("Invalid Notion API key")
+            raise NotionAPIError("Invalid Notion API key", response.status)
         elif response.status == 404:
-            raise Exception("Notion resource not found")
-        elif response.status == 429:
-            raise Exception("Notion API rate limit exceeded")
+            raise NotionAPIError("Notion resource not found", response.status)
+        elif response.status in RETRY_STATUSES:
+            print(f"Retryable error ({method} {url}): {response.status}")
+            error = NotionAPIError(
+                f"Notion API error: {response.status}", response.status
+            )
+            retry_after = get_retry_after(response)
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if response.status == 429:
+                # 다른 스레드의 요청도 함께 멈춤
+                rate_limiter.pause(delay)
         else:
-            print(f"Error: {response.status}, {response.data}")
-            return None
-    except Exception as e:
-        print(f"Request error: {e}")
-        return None
+            raise NotionAPIError(
+                f"Error: {response.status}, {response.data}", response.status
+            )
+
+    raise error
 
 
-def fetch_database_pages(database_id):
-    """데이터베이스 내 페이지 가져오기"""
+def fetch_database_pages(database_id, filter=None):
+    """데이터베이스 내 페이지 가져오기
+
+    Args:
+        database_id: Notion 데이터베이스 ID
+        filter: Notion database query filter (없으면 전체 페이지)
+    """
     results = []
     next_cursor = None
 
     while True:
         url = f"{NOTION_API_URL}/databases/{database_id}/query"
         payload = {"start_cursor": next_cursor} if next_cursor else {}
+        if filter:
+            payload["filter"] = filter
 
-        data = make_request("POST", url, headers=HEADERS, body=payload)
-        if not data:
-            break
-
+        data = make_request("POST", url, headers=notion_headers(), body=payload)
         results.extend(data.get("results", []))
         next_cursor = data.get("next_cursor")
         if not next_cursor:
@@ -65,6 +154,12 @@ def fetch_database_pages(database_id):
     return results
 
 
+def fetch_page(page_id):
+    """페이지 객체 하나 가져오기"""
+    url = f"{NOTION_API_URL}/pages/{page_id}"
+    return make_request("GET", url, headers=notion_headers())
+
+
 def fetch_page_content(page_id):
     """페이지의 모든 블록을 페이지네이션으로 가져오기"""
     url = f"{NOTION_API_URL}/blocks/{page_id}/children"
@@ -75,9 +170,9 @@ def fetch_page_content(page_id):
         params = {"page_size": 100}
         if start_cursor:
             params["start_cursor"] = start_cursor
-        data = make_request("GET", url, headers=HEADERS, body=None, params=params)
-        if not data:
-            break
+        data = make_request(
+            "GET", url, headers=notion_headers(), body=None, params=params
+        )
         all_results.extend(data.get("results", []))
         if not data.get("has_more"):
             break
@@ -89,38 +184,179 @@ def fetch_page_content(page_id):
     }
 
 
-def page_to_markdown(page, page_title, category, page_id):
-    """페이지 데이터를 MDX 형식으로 변환"""
-    try:
-        # 메타데이터 생성
-        metadata = generate_metadata(page, page_title)
+def fetch_block_tree(block_id, max_workers=None):
+    """블록 트리 전체를 미리 가져오기
+
+    같은 깊이의 has_children 블록들의 자식을 스레드 풀로 동시에 가져와
+    각 블록의 "children"에 채운다. 변환 단계에서는 추가 요청이 없다.
+    (테이블의 행도 이때 다른 블록의 자식과 함께 가져온다)
+    """
+    root_blocks = fetch_page_content(block_id).get("results", [])
+
+    def needs_children(block):
+        return (
+            block.get("has_children") and block.get("type") not in SKIP_CHILDREN_TYPES
+        )
+
+    def fetch_children(block):
+        if block.get("type") == "table":
+            return fetch_table_rows(block["id"])
+        return fetch_page_content(block["id"]).get("results", [])
+
+    level = [block for block in root_blocks if needs_children(block)]
+    with ThreadPoolExecutor(max_workers=max_workers or NOTION_MAX_WORKERS) as executor:
+        while level:
+            next_level = []
+            for block, children in zip(level, executor.map(fetch_children, level)):
+                block["children"] = children
+                next_level.extend(child for child in children if needs_children(child))
+            level = next_level
+
+    return {
+        "object": "list",
+        "results": root_blocks,
+    }
+
+
+def render_page(
+    page, page_title, category, page_id, bucket_name, manifest=None, version=None
+):
+    """페이지를 MDX로 변환하고 증분 게시에 필요한 정보를 함께 반환
+
+    이미지와 썸네일은 변환과 병렬로 내려받아 바로 S3에 업로드된다.
+    (썸네일은 version이 주어지면 해당 버전 폴더에 업로드)
+    manifest(이전 게시 결과와 블록 캐시)가 주어지면 해시가 같은 최상위 블록은 이전
+    변환 결과를 재사용하고(이미지 재다운로드 없음), 커버가 같으면 썸네일도 재사용한다.
+    (Notion에 올린 커버는 요청 없이, 외부 커버는 조건부 GET으로 바뀌었는지만 확인)
 
-        # thumbnail 다운로드
-        thumbnail_path = download_thumbnail(page, page_id)
+    Returns:
+        markdown: 최종 MDX
+        blocks: 최상위 블록별 {"hash", "markdown", "list_counter"}
+        cover: 커버 식별자
+        cover_validators: 커버 조건부 GET용 {"etag", "last_modified"} (없으면 None)
+        thumbnail: 썸네일 파일명 (없으면 None)
+        og_image: OG 카드 파일명 (없으면 None)
+        cover_files: {썸네일/OG 카드 파일명: 이번에 올린 내용 해시 (재사용 시 None)}
+        text: 검색 색인용 본문 텍스트
+    """
+    manifest = manifest or {}
+    cached_blocks = {entry["hash"]: entry for entry in manifest.get("blocks", [])}
+    cover = cover_key(page)
+    same_cover = bool(
+        cover and cover == manifest.get("cover") and manifest.get("thumbnail")
+    )
+    previous_cover = {
+        "thumbnail": manifest.get("thumbnail"),
+        "og_image": manifest.get("og_image"),
+        "cover_validators": manifest.get("cover_validators"),
+        "cover_files": {
+            name: None
+            for name in (manifest.get("thumbnail"), manifest.get("og_image"))
+            if name
+        },
+    }
+    cover_result = {
+        "thumbnail": None,
+        "og_image": None,
+        "cover_validators": None,
+        "cover_files": {},
+    }
+    # 메타데이터 생성
+    metadata = generate_metadata(page, page_title)
+
+    with DownloadPipeline(lambda url: store_image(url, bucket_name)) as downloads:
+        # thumbnail 다운로드 (블록 트리를 가져오는 동안 병렬로 진행)
+        thumbnail_future = None
+        cover_type = (page.get("cover") or {}).get("type")
+        if same_cover and (
+            cover_type == "file" or not previous_cover["cover_validators"]
+        ):
+            # Notion에 올린 파일은 경로가 같으면 내용도 같음
+            cover_result = previous_cover
+        else:
+            thumbnail_future = downloads.submit(
+                store_thumbnail,
+                page,
+                page_id,
+                category,
+                bucket_name,
+                version,
+                previous_cover["cover_validators"] if same_cover else None,
+            )
+
+        # 페이지 콘텐츠 변환 (블록 트리를 먼저 모두 가져온 뒤 I/O 없이 변환)
+        with span("fetch_blocks"):
+            page_content = fetch_block_tree(page["id"])
+        blocks = []
+        new_blocks = []
+        context = ConversionContext(page_id, category, downloads)
+
+        with span("convert"):
+            for block in page_content.get("results", []):
+                counter = 0
+                if block.get("type") == "numbered_list_item":
+                    counter = context.number(0)
+                digest = block_hash(block, counter)
+
+                cached = cached_blocks.get(digest)
+                if cached:
+                    # 변경 없는 블록은 이전 결과 재사용 (번호 상태도 복원)
+                    context.set_number(0, cached["list_counter"])
+                    blocks.append(cached)
+                    continue
 
-        # 페이지 콘텐츠 변환
-        page_content = fetch_page_content(page["id"])
-        md_content = []
+                entry = {
+                    "hash": digest,
+                    "markdown": get_block_content(block, context),
+                    "list_counter": context.number(0),
+                }
+                blocks.append(entry)
+                new_blocks.append(entry)
 
-        for block in page_content.get("results", []):
-            content = get_block_content(block, page_id, category)
-            if content.strip():
-                md_content.append(content)
+        # 이미지 업로드 결과로 새로 변환한 블록의 링크 치환
+        with span("wait_downloads"):
+            results = downloads.wait()
+        for entry in new_blocks:
+            entry["markdown"] = resolve_image_links(entry["markdown"], results)
 
-        # 최종 콘텐츠 결합
-        return metadata + "\n\n" + "\n\n".join(md_content)
+        if thumbnail_future:
+            stored = thumbnail_future.result()
+            if stored is NOT_MODIFIED:
+                cover_result = previous_cover
+            elif stored:
+                cover_result = {
+                    "thumbnail": stored.thumbnail,
+                    "og_image": stored.card,
+                    "cover_validators": stored.validators,
+                    "cover_files": stored.hashes,
+                }
+
+    # 최종 콘텐츠 결합
+    md_content = [entry["markdown"] for entry in blocks if entry["markdown"].strip()]
+    return {
+        "markdown": metadata + "\n\n" + "\n\n".join(md_content),
+        "blocks": blocks,
+        "cover": cover,
+        **cover_result,
+        "text": page_text(page_content.get("results", [])),
+    }
+
+
+def page_to_markdown(page, page_title, category, page_id, bucket_name):
+    """페이지 데이터를 MDX 형식으로 변환"""
+    try:
+        return render_page(page, page_title, category, page_id, bucket_name)["markdown"]
+    except NotionAPIError:
+        # 일부만 가져온 상태로 게시되지 않도록 호출자에게 전달
+        raise
     except Exception as e:
         print(f"Error processing page {page['id']}: {e}")
         return ""
 
 
 def fetch_table_rows(block_id):
-    """Notion API를 통해 테이블 행 데이터 가져오기"""
-    url = f"https://api.notion.com/v1/blocks/{block_id}/children"
-    response = make_request("GET", url, headers=HEADERS)  # Notion API 요청
-    if response:
-        return response.get("results", [])
-    return []
+    """테이블의 모든 행(table_row 블록)을 페이지네이션으로 가져오기"""
+    return fetch_page_content(block_id).get("results", [])
 
 
 def update_post_status(post_id, status):
@@ -128,7 +364,7 @@ def update_post_status(post_id, status):
     url = f"{NOTION_API_URL}/pages/{post_id}"
     payload = {"properties": {"status": {"status": {"name": status}}}}
     try:
-        result = make_request("PATCH", url, headers=HEADERS, body=payload)
+        result = make_request("PATCH", url, headers=notion_headers(), body=payload)
         if result is not None:
             print("Post status updated successfully.")
         else:
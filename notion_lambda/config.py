@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+
+# Notion API 키와 API 인증 토큰이 들어 있는 Secrets Manager 비밀
+SECRET_NAME = os.getenv("SECRET_NAME", "notion-api-key")
+# 비밀 캐시 유지 시간 (회전된 비밀도 이 시간 안에 반영)
+SECRET_TTL_SECONDS = float(os.getenv("SECRET_TTL_SECONDS", "300"))
+
+# 서비스별 boto3 client 설정
+CLIENT_CONFIGS = {
+    # 업로드 스레드 풀과 이미지 파이프라인이 함께 쓰는 커넥션 풀
+    "s3": Config(max_pool_connections=32),
+}
+
+_clients = {}
+_secrets = {}
+_lock = threading.Lock()
+
+
+def get_client(service_name):
+    """서비스별 boto3 client (처음 사용할 때 한 번만 만들어 컨테이너 안에서 공유)"""
+    client = _clients.get(service_name)
+    if client is None:
+        # boto3 기본 세션은 스레드 안전하지 않으므로 생성은 lock 안에서
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = boto3.client(
+                    service_name, config=CLIENT_CONFIGS.get(service_name)
+                )
+                _clients[service_name] = client
+    return client
+
+
+def get_secret(secret_name=SECRET_NAME):
+    """Secrets Manager에서 비밀을 가져오기 (SECRET_TTL_SECONDS 동안 캐시)
+
+    갱신에 실패하면 만료된 값이라도 있으면 그대로 사용한다.
+
+    Returns:
+        비밀 dict (가져올 수 없으면 None)
+    """
+    now = time.monotonic()
+    cached = _secrets.get(secret_name)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    try:
+        response = get_client("secretsmanager").get_secret_value(SecretId=secret_name)
+        secret = json.loads(response.get("SecretString") or "null")
+    except Exception as e:
+        print(f"Error fetching secret {secret_name}: {e}")
+        return cached[1] if cached else None
+
+    if secret:
+        _secrets[secret_name] = (now + SECRET_TTL_SECONDS, secret)
+    return secret
+
+
+def clear_cache():
+    """캐시한 client와 비밀을 모두 비움"""
+    with _lock:
+        _clients.clear()
+        _secrets.clear()
@@ -1,14 +1,37 @@
-import os
+import html
+import re
+from functools import partial
+from operator import itemgetter
 
-from utils import download_image
+from utils import ASSET_PREFIX
 
-list_counter = {"numbered": 0}
 
+class ConversionContext:
+    """문서 하나를 변환하는 동안의 상태
 
-def reset_list_counter():
-    """리스트 번호를 리셋"""
-    global list_counter
-    list_counter["numbered"] = 0
+    문서마다 새로 만들어 넘기므로 여러 페이지를 스레드/프로세스에서 동시에 변환해도
+    상태가 섞이지 않는다. numbered list 번호는 들여쓰기 레벨마다 따로 센다.
+    """
+
+    def __init__(self, page_dir, category, downloads=None):
+        self.page_dir = page_dir
+        self.category = category
+        self.downloads = downloads
+        # 들여쓰기 레벨별 numbered list 번호
+        self.numbers = [0]
+
+    def number(self, indent_level):
+        """indent_level의 현재 numbered list 번호"""
+        if indent_level < len(self.numbers):
+            return self.numbers[indent_level]
+        return 0
+
+    def set_number(self, indent_level, number):
+        """indent_level의 numbered list 번호 설정 (깊은 레벨은 새로 시작)"""
+        del self.numbers[indent_level + 1 :]
+        while len(self.numbers) <= indent_level:
+            self.numbers.append(0)
+        self.numbers[indent_level] = number
 
 
 def get_number_format(number):
@@ -22,42 +45,171 @@ def get_number_format(number):
     return str(number)  # 1, 2, 3, ...
 
 
-def extract_text_with_annotations(rich_text):
-    """Notion rich_text 데이터를 Markdown 스타일로 변환"""
-    if not rich_text or not isinstance(rich_text, list):
-        return ""
+# Markdown/MDX에서 의미가 있어 본문에서 이스케이프하는 문자 ({, <는 MDX 표현식/JSX)
+MARKDOWN_SPECIAL = re.compile(r"[\\`*_\[\]<>{}~|]")
+MARKDOWN_ESCAPES = str.maketrans({char: "\\" + char for char in "\\`*_[]<>{}~|"})
+# 줄 맨 앞에 오면 블록 문법(제목, 인용, 목록, 구분선/setext 제목)이 되는 표시
+# (>는 escape_markdown에서 이미 이스케이프됨)
+BLOCK_START = re.compile(
+    r"^( {0,3})(#{1,6}(?=[ \t]|$)|[-+](?=[ \t]|$)|[-=](?=[-= \t]*$)"
+    r"|\d{1,9}(?=[.)](?:[ \t]|$)))",
+    re.MULTILINE,
+)
+# inline code 안의 연속된 백틱
+BACKTICK_RUN = re.compile(r"`+")
+# 링크 URL에서 괄호와 공백은 링크 문법을 깨뜨리므로 인코딩
+URL_ESCAPES = str.maketrans({" ": "%20", "(": "%28", ")": "%29"})
+
+# 안쪽부터 감싸는 순서 (code는 별도 처리)
+ANNOTATION_MARKERS = (
+    ("**", "**"),  # bold
+    ("*", "*"),  # italic
+    ("<s>", "</s>"),  # strikethrough
+    ("<u>", "</u>"),  # underline (Markdown에는 표준 밑줄이 없으므로 HTML 사용)
+)
+
+
+def escape_markdown(text):
+    """Markdown/MDX 특수 문자를 백슬래시로 이스케이프"""
+    # 대부분의 텍스트에는 특수 문자가 없으므로 검색만 하고 그대로 반환
+    if MARKDOWN_SPECIAL.search(text) is None:
+        return text
+    return text.translate(MARKDOWN_ESCAPES)
+
+
+def _escape_marker(match):
+    indent, marker = match.groups()
+    if marker[0].isdigit():
+        # 1. -> 1\. (번호 뒤의 점/괄호를 이스케이프)
+        return f"{indent}{marker}\\"
+    return f"{indent}\\{marker}"
+
+
+def escape_block_start(text):
+    """줄 맨 앞의 블록 문법 표시를 이스케이프 (본문 텍스트가 제목/목록 등이 되지 않도록)"""
+    return BLOCK_START.sub(_escape_marker, text)
+
+
+_STYLE_KEYS = ("bold", "italic", "strikethrough", "underline", "code")
+_get_style = itemgetter(*_STYLE_KEYS)
+# 서식 없는 span (강조/code 없음)
+PLAIN_STYLE = (False, False, False, False, False)
+# (스타일, 링크 URL)별 (여는 문자열, 닫는 문자열) 캐시
+_wrappers = {}
+_EMPTY = {}
+
+
+def _span_style(annotations):
+    """일부 annotations 키가 빠진 span의 (bold, italic, strikethrough, underline, code)
+
+    API 응답은 항상 모든 키를 포함하므로 테스트 데이터 등에서만 사용된다.
+    """
+    annotations = annotations or {}
+    return tuple(bool(annotations.get(key)) for key in _STYLE_KEYS)
+
+
+def _wrapper(style, url):
+    """강조 기호와 링크를 합친 (여는 문자열, 닫는 문자열)"""
+    wrapper = _wrappers.get((style, url))
+    if wrapper is None:
+        opening = closing = ""
+        for enabled, (start, end) in zip(style, ANNOTATION_MARKERS):
+            if enabled:
+                opening = start + opening
+                closing += end
+        if url:
+            opening = "[" + opening
+            closing += f"]({url.translate(URL_ESCAPES)})"
+        wrapper = _wrappers[(style, url)] = (opening, closing)
+    return wrapper
+
+
+def _render_run(text, style, url, in_table=False):
+    """같은 스타일로 합친 텍스트 하나를 Markdown으로 변환
+
+    in_table이면 표 칸이 나뉘지 않도록 code와 링크 URL의 |도 이스케이프한다.
+    (본문 텍스트의 |는 escape_markdown에서 항상 이스케이프됨)
+    """
+    if in_table and url:
+        url = url.replace("|", "%7C")
+    if style[4]:
+        # 내용의 가장 긴 백틱 연속보다 긴 fence 사용 (code 안은 이스케이프하지 않음)
+        longest = max(map(len, BACKTICK_RUN.findall(text)), default=0)
+        fence = "`" * (longest + 1)
+        if in_table:
+            # GFM 표는 칸을 나눈 뒤 \|를 |로 되돌리므로 code 안에서도 이스케이프
+            text = text.replace("|", "\\|")
+        pad = " " if text.startswith("`") or text.endswith("`") else ""
+        text = f"{fence}{pad}{text}{pad}{fence}"
+        lead = trail = ""
+    else:
+        text = escape_markdown(text)
+        if style == PLAIN_STYLE and not url:
+            return text
+        # 강조 기호가 공백에 붙으면 강조로 인식되지 않으므로 공백은 바깥으로
+        stripped = text.strip()
+        if not stripped:
+            return text
+        if len(stripped) == len(text):
+            lead = trail = ""
+        else:
+            lead = text[: len(text) - len(text.lstrip())]
+            trail = text[len(text.rstrip()) :]
+            text = stripped
+
+    opening, closing = _wrapper(style, url)
+    return f"{lead}{opening}{text}{closing}{trail}"
 
-    md_text = ""
-    for text_obj in rich_text:
-        text = text_obj.get("plain_text", "")
-        annotations = text_obj.get("annotations", {})
-        link = text_obj.get("text", {}).get("link", {})
 
-        # Markdown 스타일 적용
-        if annotations.get("bold"):
-            text = f"**{text}**"
-        if annotations.get("italic"):
-            text = f"*{text}*"
-        if annotations.get("strikethrough"):
-            text = f"<s>{text}</s>"  # 취소선
-        if annotations.get("underline"):
-            text = f"<u>{text}</u>"  # Markdown에는 표준 밑줄이 없으므로 HTML 사용
-        if annotations.get("code"):
-            text = f"`{text}`"
+def extract_text_with_annotations(rich_text, in_table=False):
+    """Notion rich_text 데이터를 Markdown 스타일로 변환
 
-        if link:
-            url = link.get("url", "")
-            if url:
-                text = f"[{text}]({url})"
+    스타일(강조, code, 링크)이 같은 인접 span은 하나로 합쳐 한 번만 감싸고
+    (`**a****b**` 대신 `**ab**`), 결과는 리스트에 모아 마지막에 한 번 합친다.
 
-        md_text += text
+    Args:
+        in_table: GFM 표 칸 안의 텍스트인지 (code 안의 |도 이스케이프)
+    """
+    if not rich_text or not isinstance(rich_text, list):
+        return ""
 
-    return md_text or ""
+    runs = []
+    current = url = texts = None
+    for text_obj in rich_text:
+        try:
+            style = _get_style(text_obj["annotations"])
+        except (KeyError, TypeError):
+            style = _span_style(text_obj.get("annotations"))
+        link = (text_obj.get("text") or _EMPTY).get("link")
+        href = (link.get("url") or None) if link else None
+        if style != current or href != url or texts is None:
+            current, url, texts = style, href, []
+            runs.append((style, href, texts))
+        texts.append(text_obj.get("plain_text", ""))
+
+    return "".join(
+        [
+            _render_run("".join(texts), style, href, in_table)
+            for style, href, texts in runs
+        ]
+    )
+
+
+def extract_block_text(rich_text):
+    """문단/목록/인용 등 블록 본문용 변환 (줄 맨 앞의 블록 문법 표시 이스케이프)"""
+    return escape_block_start(extract_text_with_annotations(rich_text))
+
+
+def extract_plain_text(rich_text):
+    """rich_text의 텍스트만 그대로 이어 붙이기 (code block 등 서식 없는 내용)"""
+    if not rich_text or not isinstance(rich_text, list):
+        return ""
+    return "".join(text_obj.get("plain_text", "") for text_obj in rich_text)
 
 
 def handle_paragraph(block_data):
     """Markdown 변환: Paragraph"""
-    return extract_text_with_annotations(block_data.get("rich_text", [])) or ""
+    return extract_block_text(block_data.get("rich_text", [])) or ""
 
 
 def handle_heading(block_data, level):
@@ -73,7 +225,7 @@ def handle_list_item(block_data, prefix_type, counter=None, indent_level=0):
     - counter: numbered list를 위한 현재 번호
     - indent_level: 들여쓰기 레벨
     """
-    text = extract_text_with_annotations(block_data.get("rich_text", []))
+    text = extract_block_text(block_data.get("rich_text", []))
 
     if prefix_type == "-":
         return f"- {text}"
@@ -86,143 +238,311 @@ def handle_list_item(block_data, prefix_type, counter=None, indent_level=0):
 
 def handle_quote(block_data):
     """Markdown 변환: Quote"""
-    text = extract_text_with_annotations(block_data.get("rich_text", []))
+    text = extract_block_text(block_data.get("rich_text", []))
     return f"> {text}" if text else "> "
 
 
 def handle_code(block_data):
-    """Markdown 변환: Code Block"""
-    text = extract_text_with_annotations(block_data.get("rich_text", []))
+    """Markdown 변환: Code Block (내용은 서식/이스케이프 없이 그대로)"""
+    text = extract_plain_text(block_data.get("rich_text", []))
     language = block_data.get("language", "plaintext")
     return f"```{language}\n{text}\n```" if text else f"```{language}\n\n```"
 
 
-def handle_image(block_data, category, page_dir):
-    """Markdown 변환: Image"""
+def handle_image(block_data, category, page_dir, downloads=None):
+    """Markdown 변환: Image
+
+    downloads(DownloadPipeline)가 주어지면 다운로드를 예약하고 placeholder를 반환,
+    링크는 변환 후 resolve_image_links에서 채워진다. 없으면 원본 URL을 그대로 사용.
+    """
     image_url = block_data.get("file", {}).get("url", "")
     caption = extract_text_with_annotations(block_data.get("caption", []))
 
+    if image_url and downloads is not None:
+        return f"![{caption}]({downloads.add_image(image_url)})"
     if image_url:
-        # 이미지 다운로드
-        local_image_path = download_image(image_url, page_dir)
-        if local_image_path:
-            # 같은 폴더 안에서 이미지 파일 이름만 사용
-            image_filename = os.path.basename(local_image_path)
-            return f"![{caption}](/posts/{category}/{page_dir}/{image_filename})"
-        else:
-            return f"![{caption}]({image_url})"
+        return f"![{caption}]({image_url})"
     return "![Image]"
 
 
+# handle_image가 넣은 이미지 (caption, placeholder)
+# caption은 여러 줄일 수 있고 이스케이프된 문자와 링크([...])를 포함할 수 있으므로
+# .*? 대신 괄호 짝을 맞춰 다른 이미지나 줄을 넘어 잘못 매칭되지 않게 한다
+IMAGE_PLACEHOLDER = re.compile(
+    r"!\[((?:[^\[\]\\]|\\.|\[(?:[^\[\]\\]|\\.)*\])*)\]\((notion-image://[^)\s]+)\)",
+    re.DOTALL,
+)
+# alt 속성에 넣기 전에 caption에서 지우는 Markdown 서식
+CAPTION_MARKUP = re.compile(r"\\(.)|</?[su]>|[*`]")
+
+
+def render_image(caption, stored):
+    """assets에 올린 이미지를 Markdown 이미지로
+
+    WebP 사본이 있으면 크기와 srcset을 포함한 <img>로 바꿔 레이아웃 이동 없이
+    lazy loading 할 수 있게 한다. (원본은 사본이 없을 때만 사용)
+    """
+    if not stored.variants:
+        return f"![{caption}](/{ASSET_PREFIX}/{stored.filename})"
+
+    srcset = [f"/{ASSET_PREFIX}/{name} {width}w" for name, width in stored.variants]
+    alt = html.escape(CAPTION_MARKUP.sub(lambda m: m.group(1) or "", caption))
+    attributes = [
+        f'src="/{ASSET_PREFIX}/{stored.variants[-1][0]}"',
+        f'srcSet="{", ".join(srcset)}"',
+        f'sizes="(max-width: {stored.width}px) 100vw, {stored.width}px"',
+        f'alt="{alt}"',
+        f"width={{{stored.width}}}",
+        f"height={{{stored.height}}}",
+        'loading="lazy"',
+        'decoding="async"',
+    ]
+    if stored.placeholder:
+        # 이미지가 로드되기 전까지 흐린 미리보기를 배경으로 표시
+        attributes.append(
+            f'style={{{{ backgroundImage: "url({stored.placeholder})", '
+            'backgroundSize: "cover" }}'
+        )
+    return f"<img {' '.join(attributes)} />"
+
+
+def resolve_image_links(markdown, results):
+    """다운로드가 끝난 이미지의 placeholder를 실제 이미지로 치환
+
+    Args:
+        results: DownloadPipeline.wait()의 결과
+            다운로드에 실패한 이미지는 원본 URL을 그대로 사용
+    """
+
+    def replace(match):
+        caption, placeholder = match.groups()
+        if placeholder not in results:
+            return match.group(0)
+        image_url, stored = results[placeholder]
+        if not stored:
+            return f"![{caption}]({image_url})"
+        return render_image(caption, stored)
+
+    return IMAGE_PLACEHOLDER.sub(replace, markdown)
+
+
 def handle_callout(block_data):
     """Markdown 변환: Callout"""
-    text = extract_text_with_annotations(block_data.get("rich_text", []))
+    text = extract_block_text(block_data.get("rich_text", []))
     icon = block_data.get("icon", {}).get("emoji", "")  # 이모지 아이콘 추출
     return f"> {icon} {text}" if icon else f"> {text}"
 
 
 def handle_to_do(block_data):
     """Markdown 변환: To Do"""
-    text = extract_text_with_annotations(block_data.get("rich_text", []))
+    text = extract_block_text(block_data.get("rich_text", []))
     checked = block_data.get("checked", False)
     checkbox = "[x]" if checked else "[ ]"
     return f"{checkbox} {text}"
 
 
-def handle_toggle(block_data, page_dir):
-    """Markdown 변환: Toggle TODO"""
-    pass
+def handle_divider(block_data):
+    """Markdown 변환: Divider"""
+    return "---"
+
+
+def handle_bookmark(block_data):
+    """Markdown 변환: Bookmark, Embed (캡션이 없으면 URL을 링크 텍스트로)"""
+    url = block_data.get("url", "")
+    if not url:
+        return ""
+    caption = extract_text_with_annotations(block_data.get("caption", []))
+    return f"[{caption or escape_markdown(url)}]({url.translate(URL_ESCAPES)})"
 
 
-def handle_table(block_data, block_id):
-    """Markdown 변환: Table TODO"""
-    pass
+def handle_equation(block_data):
+    """Markdown 변환: Equation (KaTeX 블록 수식)"""
+    expression = block_data.get("expression", "")
+    return f"$$\n{expression}\n$$" if expression else ""
 
 
-def handle_divider(block_data):
-    """Markdown 변환: Divider"""
-    return "---"
+def handle_table(block_data, rows):
+    """Markdown 변환: Table (GFM 표)
 
+    Args:
+        rows: table_row 블록 목록
+            has_column_header가 없으면 빈 헤더 행을 넣는다 (GFM은 헤더가 필수)
+            has_row_header면 각 행의 첫 칸을 굵게 표시
+    """
+    width = block_data.get("table_width") or max(
+        (len(row.get("table_row", {}).get("cells", [])) for row in rows), default=0
+    )
+    if not width:
+        return ""
+
+    row_header = block_data.get("has_row_header", False)
+    lines = []
+    for row in rows:
+        cells = row.get("table_row", {}).get("cells", [])
+        texts = [
+            extract_text_with_annotations(cell, in_table=True).replace("\n", "<br />")
+            for cell in cells[:width]
+        ]
+        texts += [""] * (width - len(texts))
+        if row_header and texts[0]:
+            texts[0] = f"**{texts[0]}**"
+        lines.append("| " + " | ".join(texts) + " |")
+
+    separator = "|" + "|".join(["---"] * width) + "|"
+    if block_data.get("has_column_header") and lines:
+        return "\n".join([lines[0], separator] + lines[1:])
+    return "\n".join(["|" + "|".join(["   "] * width) + "|", separator] + lines)
+
+
+def child_blocks(block):
+    """블록의 자식 목록 (fetch_block_tree로 미리 가져오지 않았으면 요청)"""
+    if "children" in block:
+        return block["children"]
+    if not block.get("has_children"):
+        return []
+    from client import fetch_page_content
 
-def handle_child_block(block_data, page_dir, category, indent_level=0):
+    return (fetch_page_content(block["id"]) or {}).get("results", [])
+
+
+def handle_child_block(block_data, context, indent_level=0, indent="    "):
     """자식 블록 처리
 
     Args:
         block_data: 부모 블록 데이터
-        page_dir: 페이지 디렉토리
+        context: 변환 중인 문서의 ConversionContext
         indent_level: 현재 들여쓰기 레벨
+        indent: 자식 블록의 각 줄 앞에 붙일 문자열
     """
-    from client import fetch_page_content
-
-    child_blocks = fetch_page_content(block_data["id"])
-    if not child_blocks or "results" not in child_blocks:
+    children = child_blocks(block_data)
+    if not children:
         return ""
 
-    reset_list_counter()
+    # 자식 목록의 번호는 1부터 (부모 레벨의 번호는 그대로 유지)
+    context.set_number(indent_level + 1, 0)
     child_contents = []
 
-    for child_block in child_blocks["results"]:
-        child_content = get_block_content(
-            child_block, page_dir, category, indent_level + 1
-        )
+    for child_block in children:
+        child_content = get_block_content(child_block, context, indent_level + 1)
         if child_content.strip():
-            # 각 줄을 4칸 들여쓰기
-            indented_content = "\n".join(
-                "    " + line for line in child_content.split("\n")
-            )
-            child_contents.append(indented_content)
+            if indent:
+                child_content = "\n".join(
+                    indent + line for line in child_content.split("\n")
+                )
+            child_contents.append(child_content)
 
-    # 각 child block 사이에 <br />\n 추가
-    return f"\n".join(child_contents) if child_contents else ""
+    return ("\n" if indent else "\n\n").join(child_contents)
 
 
-def get_block_content(block, page_dir, category, indent_level=0):
+# 블록 타입별 변환 함수: {type: (handler, renders_children)}
+BLOCK_HANDLERS = {}
+
+
+def register_handler(block_type, handler, renders_children=False):
+    """블록 타입의 변환 함수 등록 (같은 타입이면 교체)
+
+    Args:
+        handler: handler(block_data, block, context, indent_level) -> Markdown 문자열
+        renders_children: True면 handler가 자식 블록까지 변환 (아니면 자식 블록을
+            들여써서 뒤에 붙인다)
+    """
+    BLOCK_HANDLERS[block_type] = (handler, renders_children)
+
+
+def _render_toggle(block_data, block, context, indent_level):
+    summary = extract_text_with_annotations(block_data.get("rich_text", []))
+    children = handle_child_block(block, context, indent_level, indent="")
+    return f"<details>\n<summary>{summary}</summary>\n\n{children}\n\n</details>"
+
+
+def _render_table(block_data, block, context, indent_level):
+    if "children" in block:
+        rows = block["children"]
+    else:
+        from client import fetch_table_rows
+
+        rows = fetch_table_rows(block["id"])
+    return handle_table(block_data, rows)
+
+
+def _render_columns(block_data, block, context, indent_level):
+    # Markdown에는 단 나누기가 없으므로 column을 순서대로 이어 붙임
+    return handle_child_block(block, context, indent_level, indent="")
+
+
+def _data_handler(handler):
+    """block_data만 받는 handle_* 함수를 registry 형식으로 감싸기"""
+
+    def render(block_data, block, context, indent_level):
+        return handler(block_data)
+
+    return render
+
+
+for _block_type, _handler in {
+    "paragraph": handle_paragraph,
+    "heading_1": partial(handle_heading, level=1),
+    "heading_2": partial(handle_heading, level=2),
+    "heading_3": partial(handle_heading, level=3),
+    "bulleted_list_item": partial(handle_list_item, prefix_type="-"),
+    "quote": handle_quote,
+    "code": handle_code,
+    "callout": handle_callout,
+    "to_do": handle_to_do,
+    "divider": handle_divider,
+    "bookmark": handle_bookmark,
+    "embed": handle_bookmark,
+    "equation": handle_equation,
+}.items():
+    register_handler(_block_type, _data_handler(_handler))
+register_handler(
+    "numbered_list_item",
+    lambda block_data, block, context, indent_level: handle_list_item(
+        block_data, "numbered", context.number(indent_level), indent_level
+    ),
+)
+register_handler(
+    "image",
+    lambda block_data, block, context, indent_level: handle_image(
+        block_data, context.category, context.page_dir, context.downloads
+    ),
+)
+register_handler("toggle", _render_toggle, renders_children=True)
+register_handler("table", _render_table, renders_children=True)
+register_handler("column_list", _render_columns, renders_children=True)
+register_handler("column", _render_columns, renders_children=True)
+
+
+def get_block_content(block, context, indent_level=0):
     """블록 데이터를 Markdown 형식으로 변환
 
     Args:
         block: Notion block 데이터
-        page_dir: 페이지 디렉토리
+        context: 변환 중인 문서의 ConversionContext (같은 문서의 블록은 같은 context로
+            순서대로 변환해야 numbered list 번호가 이어진다)
         indent_level: 현재 들여쓰기 레벨 (기본값: 0)
     """
     block_type = block.get("type")
     block_data = block.get(block_type, {})
 
     if block_type == "numbered_list_item":
-        list_counter["numbered"] += 1
-    else:
-        reset_list_counter()
-
-    # 핸들러 매핑
-    handlers = {
-        "paragraph": lambda: handle_paragraph(block_data) or "",
-        "heading_1": lambda: handle_heading(block_data, 1) or "",
-        "heading_2": lambda: handle_heading(block_data, 2) or "",
-        "heading_3": lambda: handle_heading(block_data, 3) or "",
-        "bulleted_list_item": lambda: handle_list_item(block_data, "-", None),
-        "numbered_list_item": lambda: handle_list_item(
-            block_data, "numbered", list_counter["numbered"], indent_level
-        ),
-        "quote": lambda: handle_quote(block_data),
-        "code": lambda: handle_code(block_data),
-        "image": lambda: handle_image(block_data, category, page_dir),
-        "callout": lambda: handle_callout(block_data),
-        "to_do": lambda: handle_to_do(block_data),
-        "divider": lambda: handle_divider(block_data),
-        # "toggle": lambda: handle_toggle(block_data, page_dir),
-        # "table": lambda: handle_table(block_data, block.get("id")) or "",
-    }
-
-    handler = handlers.get(block_type)
-    if handler:
-        try:
-            content = handler()
-            # child blocks 처리
-            if block.get("has_children", False):
-                content += handle_child_block(block, page_dir, category, indent_level)
-            # 블록 간 구분을 위해 항상 <br />로 개행 추가
-            return content
-        except Exception as e:
-            print(f"Error processing block of type '{block_type}': {e}")
-            return f"[{block_type.upper()} BLOCK ERROR]<br />\n"
+        context.set_number(indent_level, context.number(indent_level) + 1)
     else:
+        context.set_number(indent_level, 0)
+
+    entry = BLOCK_HANDLERS.get(block_type)
+    if entry is None:
         return f"[{block_type.upper()} BLOCK NOT SUPPORTED]<br />\n"
+
+    handler, renders_children = entry
+    try:
+        content = handler(block_data, block, context, indent_level) or ""
+        # child blocks 처리 (부모 블록 다음 줄부터 들여써서 이어 붙임)
+        if block.get("has_children", False) and not renders_children:
+            children = handle_child_block(block, context, indent_level)
+            if children:
+                content = f"{content}\n{children}" if content else children
+        return content
+    except Exception as e:
+        print(f"Error processing block of type '{block_type}': {e}")
+        return f"[{block_type.upper()} BLOCK ERROR]<br />\n"
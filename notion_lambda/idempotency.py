@@ -0,0 +1,223 @@
+import json
+import os
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+from config import get_client
+
+# 중복 요청 기록 테이블 (없으면 중복 확인 없이 매번 처리)
+IDEMPOTENCY_TABLE = os.getenv("IDEMPOTENCY_TABLE")
+# 처리 중 기록이 남아 있는 최대 시간 (TTL 속성으로 정리)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+# 완료한 요청의 응답을 재사용하는 시간
+# last_edited_time은 분 단위라 같은 분 안의 새 수정도 같은 키가 되므로, 그 분(60초)과
+# 게시 큐의 전달 지연(5초)이 지나면 같은 키라도 다시 처리한다.
+IDEMPOTENCY_REPLAY_SECONDS = int(os.getenv("IDEMPOTENCY_REPLAY_SECONDS", "65"))
+# 처리 중 기록의 유효 시간 (Lambda 최대 실행 시간, 지나면 중단된 것으로 보고 다시 처리)
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "900"))
+
+# 요청 기록 상태
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class DynamoDBStore:
+    """DynamoDB 테이블에 요청 기록 저장 (조건부 쓰기로 한 요청만 처리 권한을 얻음)
+
+    항목: {"key", "status", "response", "lease_until", "expires_at"(TTL 속성)}
+    """
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+
+    def claim(self, key, now=None):
+        """처리 권한 얻기
+
+        Returns:
+            (True, None) 또는 이미 기록이 있으면 (False, 기록 dict)
+        """
+        now = int(now or time.time())
+        try:
+            get_client("dynamodb").put_item(
+                TableName=self.table_name,
+                Item={
+                    "key": {"S": key},
+                    "status": {"S": IN_PROGRESS},
+                    "lease_until": {"N": str(now + IDEMPOTENCY_LEASE_SECONDS)},
+                    "expires_at": {"N": str(now + IDEMPOTENCY_TTL_SECONDS)},
+                },
+                # TTL 삭제는 늦게 일어나므로 만료 시간도 직접 비교
+                ConditionExpression=(
+                    "attribute_not_exists(#key) OR expires_at < :now"
+                    " OR (#status = :in_progress AND lease_until < :now)"
+                ),
+                ExpressionAttributeNames={"#key": "key", "#status": "status"},
+                ExpressionAttributeValues={
+                    ":now": {"N": str(now)},
+                    ":in_progress": {"S": IN_PROGRESS},
+                },
+            )
+            return True, None
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != (
+                "ConditionalCheckFailedException"
+            ):
+                raise
+
+        response = get_client("dynamodb").get_item(
+            TableName=self.table_name, Key={"key": {"S": key}}, ConsistentRead=True
+        )
+        item = response.get("Item")
+        if not item:
+            # 그 사이 기록이 지워졌으면 다시 시도
+            return self.claim(key, now)
+        return False, {
+            "status": item["status"]["S"],
+            "response": (
+                json.loads(item["response"]["S"]) if "response" in item else None
+            ),
+        }
+
+    def complete(self, key, response, now=None):
+        """처리 결과 기록 (IDEMPOTENCY_REPLAY_SECONDS 동안 같은 요청에 그대로 반환)"""
+        now = int(now or time.time())
+        get_client("dynamodb").put_item(
+            TableName=self.table_name,
+            Item={
+                "key": {"S": key},
+                "status": {"S": COMPLETED},
+                "response": {"S": json.dumps(response, ensure_ascii=False)},
+                "expires_at": {"N": str(now + IDEMPOTENCY_REPLAY_SECONDS)},
+            },
+        )
+
+    def release(self, key):
+        """처리 권한 반납 (실패한 요청은 다시 시도할 수 있도록 기록 삭제)"""
+        get_client("dynamodb").delete_item(
+            TableName=self.table_name, Key={"key": {"S": key}}
+        )
+
+
+class MemoryStore:
+    """DynamoDBStore와 같은 동작을 메모리에서 흉내 내는 저장소 (로컬 실행/테스트용)"""
+
+    def __init__(self):
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, now=None):
+        now = int(now or time.time())
+        with self._lock:
+            item = self.items.get(key)
+            if (
+                item is None
+                or item["expires_at"] < now
+                or (item["status"] == IN_PROGRESS and item["lease_until"] < now)
+            ):
+                self.items[key] = {
+                    "status": IN_PROGRESS,
+                    "response": None,
+                    "lease_until": now + IDEMPOTENCY_LEASE_SECONDS,
+                    "expires_at": now + IDEMPOTENCY_TTL_SECONDS,
+                }
+                return True, None
+            return False, {"status": item["status"], "response": item["response"]}
+
+    def complete(self, key, response, now=None):
+        now = int(now or time.time())
+        with self._lock:
+            self.items[key] = {
+                "status": COMPLETED,
+                "response": json.loads(json.dumps(response)),
+                "lease_until": 0,
+                "expires_at": now + IDEMPOTENCY_REPLAY_SECONDS,
+            }
+
+    def release(self, key):
+        with self._lock:
+            self.items.pop(key, None)
+
+
+_store = None
+
+
+def get_store():
+    """요청 기록 저장소 (IDEMPOTENCY_TABLE이 없으면 None)"""
+    global _store
+    if _store is None and IDEMPOTENCY_TABLE:
+        _store = DynamoDBStore(IDEMPOTENCY_TABLE)
+    return _store
+
+
+def set_store(store):
+    """저장소 교체 (MemoryStore 등, None이면 환경 변수 설정으로 되돌림)"""
+    global _store
+    _store = store
+
+
+def request_key(action, custom_id, last_edited_time, *extra):
+    """요청 식별 키 (Notion 페이지의 수정 시각을 모르면 None)
+
+    같은 포스트의 같은 수정본에 대한 요청은 같은 키를 가진다.
+    """
+    if not custom_id or not last_edited_time:
+        return None
+    return ":".join([action, str(custom_id), last_edited_time, *map(str, extra)])
+
+
+def run_once(key, handler):
+    """같은 키의 요청은 한 번만 처리하고 나머지는 기록된 응답을 반환
+
+    처리 중인 요청과 겹치면 202로 바로 응답하고, 5xx 응답이나 예외로 끝난 요청은
+    기록을 지워 다시 시도할 수 있게 한다. 저장소 오류 시에는 중복 확인 없이 처리한다.
+
+    Args:
+        key: request_key로 만든 키 (None이면 바로 처리)
+        handler: API 응답 dict를 반환하는 함수
+    """
+    store = get_store()
+    if not store or not key:
+        return handler()
+
+    try:
+        claimed, record = store.claim(key)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error checking idempotency key {key}: {e}")
+        return handler()
+
+    if not claimed:
+        print(f"Duplicate request {key} ({record['status']})")
+        if record["status"] == COMPLETED and record["response"]:
+            response = dict(record["response"])
+            response["headers"] = dict(
+                response.get("headers") or {}, **{"Idempotent-Replayed": "true"}
+            )
+            return response
+        return {
+            "statusCode": 202,
+            "headers": {"Idempotent-Replayed": "true"},
+            "body": json.dumps({"message": "Request already in progress"}),
+        }
+
+    try:
+        response = handler()
+    except BaseException:
+        _release(store, key)
+        raise
+
+    if response.get("statusCode", 500) >= 500:
+        _release(store, key)
+        return response
+    try:
+        store.complete(key, response)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error saving idempotency key {key}: {e}")
+    return response
+
+
+def _release(store, key):
+    try:
+        store.release(key)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error releasing idempotency key {key}: {e}")
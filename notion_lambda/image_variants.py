@@ -0,0 +1,139 @@
+import base64
+import io
+import os
+
+from utils import ASSET_HASH_LENGTH
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow가 없으면 (Lambda layer 미설치) 원본만 사용
+    Image = None
+
+# WebP 사본을 만들 너비 (원본보다 큰 너비는 원본 너비로)
+IMAGE_VARIANT_WIDTHS = tuple(
+    int(width)
+    for width in os.getenv("IMAGE_VARIANT_WIDTHS", "640,1280").split(",")
+    if width.strip()
+)
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+# 레이아웃이 잡히기 전에 보여 줄 흐린 미리보기 너비 (data URI로 MDX에 포함)
+PLACEHOLDER_WIDTH = 16
+# 이 크기(픽셀 수)를 넘는 이미지는 디코딩하지 않음 (decompression bomb 방지)
+IMAGE_MAX_PIXELS = 50_000_000
+
+# 소셜 미리보기(Open Graph) 카드 크기와 파일명 (포스트 버전 폴더에 저장)
+OG_CARD_SIZE = (1200, 630)
+OG_CARD_FILENAME = "og.jpg"
+
+# 다시 인코딩하지 않는 형식 (애니메이션/벡터는 원본 그대로)
+SKIP_CONTENT_TYPES = {"image/gif", "image/svg+xml"}
+
+
+def variants_enabled():
+    """Pillow가 설치돼 있고 IMAGE_VARIANTS가 꺼져 있지 않은지"""
+    return Image is not None and os.getenv("IMAGE_VARIANTS", "on") != "off"
+
+
+def variant_filename(digest, width):
+    """원본 내용 해시 기반 사본 파일명 (같은 원본이면 항상 같은 이름)"""
+    return f"{digest[:ASSET_HASH_LENGTH]}-{width}w.webp"
+
+
+def _encode(image, width, quality):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    resized.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def make_variants(image, exists=None):
+    """내려받은 이미지(DownloadedImage)의 WebP 사본과 흐린 미리보기 생성
+
+    Args:
+        exists: 사본 파일명을 받아 이미 저장돼 있으면 True를 반환하는 함수
+            (이미 있는 사본은 다시 인코딩하지 않음)
+
+    Returns:
+        {"width", "height": 가장 큰 사본의 크기,
+        "variants": [(파일명, 너비, bytes 또는 None)],
+        "placeholder": data URI} 또는 만들 수 없으면 None
+        (이미지의 fileobj는 처음 위치로 되돌려 둔다)
+    """
+    if not variants_enabled() or image.content_type in SKIP_CONTENT_TYPES:
+        return None
+
+    try:
+        image.fileobj.seek(0)
+        with Image.open(image.fileobj) as source:
+            if source.width * source.height > IMAGE_MAX_PIXELS:
+                return None
+            # 카메라 사진의 회전 정보 반영
+            source = ImageOps.exif_transpose(source)
+            if source.mode not in ("RGB", "RGBA"):
+                source = source.convert(
+                    "RGBA" if "transparency" in source.info else "RGB"
+                )
+
+            # 원본보다 작은 너비는 그대로, 큰 너비는 원본 너비로 (원본도 WebP로 재압축)
+            widths = sorted(
+                {min(width, source.width) for width in IMAGE_VARIANT_WIDTHS}
+            )
+            variants = []
+            for width in widths:
+                filename = variant_filename(image.digest, width)
+                if exists and exists(filename):
+                    variants.append((filename, width, None))
+                else:
+                    data = _encode(source, width, IMAGE_VARIANT_QUALITY)
+                    variants.append((filename, width, data))
+
+            preview = _encode(source, min(PLACEHOLDER_WIDTH, source.width), 30)
+            # 표시 크기는 가장 큰 사본 기준 (비율은 원본과 같음)
+            width = widths[-1]
+            return {
+                "width": width,
+                "height": max(1, round(source.height * width / source.width)),
+                "variants": variants,
+                "placeholder": "data:image/webp;base64,"
+                + base64.b64encode(preview).decode("ascii"),
+            }
+    except Exception as e:
+        print(f"Error creating image variants for {image.filename}: {e}")
+        return None
+    finally:
+        if not image.fileobj.closed:
+            image.fileobj.seek(0)
+
+
+def make_card(image):
+    """커버 이미지(DownloadedImage)를 가운데 기준으로 잘라 OG 카드 JPEG 생성
+
+    Returns:
+        JPEG bytes (Pillow가 없거나 만들 수 없으면 None)
+    """
+    if not variants_enabled() or image.content_type == "image/svg+xml":
+        return None
+
+    try:
+        image.fileobj.seek(0)
+        with Image.open(image.fileobj) as source:
+            if source.width * source.height > IMAGE_MAX_PIXELS:
+                return None
+            source = ImageOps.exif_transpose(source)
+            if source.mode in ("RGBA", "LA", "P"):
+                # JPEG에는 투명도가 없으므로 흰 배경에 합성
+                source = source.convert("RGBA")
+                background = Image.new("RGB", source.size, (255, 255, 255))
+                background.paste(source, mask=source.getchannel("A"))
+                source = background
+            card = ImageOps.fit(source.convert("RGB"), OG_CARD_SIZE, Image.LANCZOS)
+            buffer = io.BytesIO()
+            card.save(buffer, "JPEG", quality=85, optimize=True, progressive=True)
+            return buffer.getvalue()
+    except Exception as e:
+        print(f"Error creating OG card for {image.filename}: {e}")
+        return None
+    finally:
+        if not image.fileobj.closed:
+            image.fileobj.seek(0)
@@ -0,0 +1,88 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from botocore.exceptions import BotoCoreError, ClientError
+from config import get_client
+
+# 게시 작업 FIFO 큐 (없으면 /upload 요청을 바로 처리)
+# 연속 클릭을 모으기 위한 전달 지연은 큐 설정(delivery delay)으로 지정
+PUBLISH_QUEUE_URL = os.getenv("PUBLISH_QUEUE_URL")
+# 작업 상태 저장 위치 (포스트 버킷, 수명 주기 규칙으로 만료)
+JOB_PREFIX = "jobs"
+
+# 작업 상태
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def job_key(job_id):
+    return f"{JOB_PREFIX}/{job_id}.json"
+
+
+def save_job(job, bucket_name):
+    """작업 상태를 S3에 기록"""
+    job = dict(job, updated_at=_now())
+    try:
+        get_client("s3").put_object(
+            Bucket=bucket_name,
+            Key=job_key(job["job_id"]),
+            Body=json.dumps(job, ensure_ascii=False).encode("utf-8"),
+            ContentType="application/json; charset=utf-8",
+            CacheControl="no-cache",
+        )
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error saving job {job['job_id']}: {e}")
+    return job
+
+
+def get_job(job_id, bucket_name):
+    """작업 상태 조회 (없으면 None)"""
+    try:
+        response = get_client("s3").get_object(Bucket=bucket_name, Key=job_key(job_id))
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+            print(f"Error loading job {job_id}: {e}")
+        return None
+
+
+def update_job(job, bucket_name, status, **fields):
+    """작업 상태 변경 후 저장한 작업 반환"""
+    return save_job(dict(job, status=status, **fields), bucket_name)
+
+
+def enqueue_publish(custom_id, force, bucket_name):
+    """게시 작업을 만들어 큐에 넣고 작업 반환
+
+    메시지 그룹이 custom_id이므로 같은 포스트의 작업은 한 번에 하나씩만 처리되고,
+    앞 작업을 처리하는 동안 쌓인 메시지는 worker가 다음 배치에서 하나로 합친다.
+    (같은 내용의 재전송은 큐의 content-based deduplication으로 한 번만 전달)
+    """
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "custom_id": str(custom_id),
+        "force": force,
+        "status": QUEUED,
+        "created_at": _now(),
+    }
+    job = save_job(job, bucket_name)
+    try:
+        get_client("sqs").send_message(
+            QueueUrl=PUBLISH_QUEUE_URL,
+            MessageBody=json.dumps(
+                {"job_id": job["job_id"], "custom_id": job["custom_id"], "force": force}
+            ),
+            MessageGroupId=job["custom_id"],
+        )
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error enqueueing job {job['job_id']}: {e}")
+        job = update_job(job, bucket_name, FAILED, error=str(e))
+    return job
@@ -0,0 +1,106 @@
+import os
+
+from s3_uploader import ConditionalWriteUnsupported, update_json_object
+
+# 포스트 버전 폴더에 함께 올리는 포스트 정보 파일
+META_FILENAME = "meta.json"
+# 전체(posts/index.json)와 카테고리별(posts/{category}/index.json) 포스트 목록
+LISTING_FILENAME = "index.json"
+# 목록은 게시/삭제 때마다 바뀌므로 짧게 캐시
+LISTING_CACHE_CONTROL = os.getenv("LISTING_CACHE_CONTROL", "public, max-age=60")
+
+
+def listing_key(category=None):
+    """포스트 목록 키 (category가 없으면 전체 목록)"""
+    if category:
+        return f"posts/{category}/{LISTING_FILENAME}"
+    return f"posts/{LISTING_FILENAME}"
+
+
+def post_meta(metadata, category, custom_id, version, thumbnail=None, og_image=None):
+    """meta.json과 목록 항목에 쓰는 포스트 정보
+
+    Args:
+        metadata: utils.page_metadata 결과
+        version: 게시한 버전 폴더 이름 (v{n})
+        thumbnail, og_image: 버전 폴더 안의 파일명 (없으면 None)
+    """
+    path = f"/posts/{category}/{custom_id}/{version}"
+    return {
+        "id": str(custom_id),
+        "category": category,
+        "title": metadata["title"],
+        "date": metadata["date"],
+        "description": metadata["description"],
+        "tags": metadata["tags"],
+        "author": metadata["author"],
+        "thumbnail": f"{path}/{thumbnail}" if thumbnail else None,
+        "og_image": f"{path}/{og_image}" if og_image else None,
+        "path": f"{path}/page.mdx",
+    }
+
+
+def _sort_key(entry):
+    # 최신 글이 먼저 (날짜가 같으면 ID 역순)
+    return (entry.get("date") or "", int(entry["id"]) if entry["id"].isdigit() else 0)
+
+
+def _update_listing(s3_key, custom_id, entry, bucket_name):
+    """목록 하나에서 custom_id 항목을 바꾸거나(entry가 None이면) 제거
+
+    Returns:
+        바뀌기 전 항목 (없었으면 None)
+    """
+    previous = {}
+
+    def update(data):
+        posts = (data or {}).get("posts", [])
+        kept = [post for post in posts if post["id"] != custom_id]
+        previous["entry"] = next((p for p in posts if p["id"] == custom_id), None)
+        if entry is None and len(kept) == len(posts):
+            return None
+        if entry is not None:
+            if previous["entry"] == entry:
+                return None
+            kept.append(entry)
+        kept.sort(key=_sort_key, reverse=True)
+        return {"posts": kept}
+
+    update_json_object(s3_key, bucket_name, update, LISTING_CACHE_CONTROL)
+    return previous.get("entry")
+
+
+def update_listing(meta, bucket_name):
+    """게시한 포스트를 전체 목록과 카테고리 목록에 반영 (조건부 쓰기)
+
+    카테고리가 바뀐 포스트는 이전 카테고리 목록에서 뺀다.
+    실패해도 게시는 그대로 두고 다음 게시나 reconcile에서 다시 맞춘다.
+    """
+    custom_id = meta["id"]
+    try:
+        previous = _update_listing(listing_key(), custom_id, meta, bucket_name)
+        _update_listing(listing_key(meta["category"]), custom_id, meta, bucket_name)
+        if previous and previous["category"] != meta["category"]:
+            _update_listing(
+                listing_key(previous["category"]), custom_id, None, bucket_name
+            )
+    except ConditionalWriteUnsupported:
+        raise
+    except Exception as e:
+        print(f"Error updating post listing for {custom_id}: {e}")
+
+
+def remove_from_listing(custom_id, category, bucket_name):
+    """삭제한 포스트를 전체 목록과 카테고리 목록에서 제거"""
+    custom_id = str(custom_id)
+    try:
+        previous = _update_listing(listing_key(), custom_id, None, bucket_name)
+        categories = {category}
+        if previous:
+            categories.add(previous["category"])
+        for name in sorted(c for c in categories if c):
+            _update_listing(listing_key(name), custom_id, None, bucket_name)
+    except ConditionalWriteUnsupported:
+        raise
+    except Exception as e:
+        print(f"Error removing {custom_id} from post listing: {e}")
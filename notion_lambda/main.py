@@ -1,59 +1,177 @@
 import json
 import os
+import time
 
-from client import fetch_database_pages, page_to_markdown, update_post_status
-from s3_uploader import delete_post_from_s3, save_markdown_to_s3, upload_assets_to_s3
-from utils import get_secret
+from cdn import flush_invalidations, invalidate
+from client import (
+    NotionAPIError,
+    fetch_database_pages,
+    fetch_page,
+    render_page,
+    request_stats,
+    update_post_status,
+)
+from config import get_secret
+from idempotency import request_key, run_once
+from jobs import FAILED, PUBLISH_QUEUE_URL, enqueue_publish, get_job
+from listing import META_FILENAME, post_meta, remove_from_listing, update_listing
+from manifest import (
+    BLOCK_CACHE_FILENAME,
+    MANIFEST_FILENAME,
+    ManifestConflict,
+    current_version,
+    is_compatible,
+    is_up_to_date,
+    load_block_cache,
+    load_manifest,
+    new_version,
+    save_manifest,
+)
+from metrics import correlation_id, emit_metrics, span, start_trace, timed
+from page_index import lookup_page, remove_from_page_index, update_page_index
+from s3_uploader import (
+    CONDITIONAL_WRITE_REQUIREMENT,
+    content_hash,
+    delete_keys,
+    delete_post_from_s3,
+    list_keys,
+    supports_conditional_writes,
+    upload_version,
+)
+from search_index import remove_from_search_index, update_search_index
+from utils import page_metadata
+from version_gc import schedule_gc
 
 # 환경 변수에서 설정 가져오기
 DATABASE_ID = os.getenv("DATABASE_ID", "your-database-id")
 S3_BUCKET_NAME = os.getenv("POST_BUCKET", "your-s3-bucket-name")
+# manifest 기반 증분 게시 (false면 매번 전체 다시 변환)
+INCREMENTAL_PUBLISH = os.getenv("INCREMENTAL_PUBLISH", "true").lower() == "true"
+# 동시 게시로 manifest 전환에 실패했을 때 다시 게시하는 횟수
+PUBLISH_CONFLICT_RETRIES = int(os.getenv("PUBLISH_CONFLICT_RETRIES", "1"))
 
-assert DATABASE_ID != "your-database-id", "DATABASE_ID 환경 변수를 설정하세요"
-assert S3_BUCKET_NAME != "your-s3-bucket-name", "S3_BUCKET_NAME 환경 변수를 설정하세요"
 
-secret = get_secret("notion-api-key")
-FIXED_TOKEN = secret.get("auth-token", None)
+def get_auth_token():
+    """API 요청 인증 토큰 (비밀은 처음 요청할 때 가져와 캐시)"""
+    secret = get_secret() or {}
+    return secret.get("auth-token")
 
-assert FIXED_TOKEN, "auth token를 가져올 수 없습니다"
+
+def check_config(conditional_writes=True):
+    """필수 환경 변수와 런타임 의존성 확인 (빠진 항목 이름 목록 반환)
+
+    Args:
+        conditional_writes: S3 조건부 쓰기 지원도 확인할지 (읽기만 하는 요청은 False)
+    """
+    missing = []
+    if DATABASE_ID == "your-database-id":
+        missing.append("DATABASE_ID")
+    if S3_BUCKET_NAME == "your-s3-bucket-name":
+        missing.append("POST_BUCKET")
+    if conditional_writes and not supports_conditional_writes():
+        # 목록/색인/manifest를 조건부 쓰기 없이 덮어쓰지 않도록 요청을 받지 않음
+        missing.append(CONDITIONAL_WRITE_REQUIREMENT)
+    return missing
 
 
 def lambda_handler(event, context):
+    # API Gateway Proxy 통합이면 resource, 아니면 path 사용
+    path = event.get("resource") or event.get("path", "")
+    # /status는 작업 상태를 읽기만 하므로 조건부 쓰기 없이도 응답
+    missing = check_config(conditional_writes=not path.endswith("/status"))
+    if missing:
+        print(f"Missing configuration: {', '.join(missing)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": "Server is not configured"}),
+        }
+
+    fixed_token = get_auth_token()
+    if not fixed_token:
+        print("auth token를 가져올 수 없습니다")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"message": "Server is not configured"}),
+        }
+
     headers = event.get("headers", {})
     auth_token = headers.get("Authorization", None)
 
-    if not auth_token or auth_token != FIXED_TOKEN:
+    if not auth_token or auth_token != fixed_token:
         return {
             "statusCode": 403,
             "body": json.dumps({"message": "Unauthorized"}),
         }
 
+    request_stats.reset()
+    start_trace(correlation_id(event, context))
+
     # 경로에 따라 업로드/삭제 분기
-    path = event.get("resource") or event.get("path", "")
-    # API Gateway Proxy 통합이면 resource, 아니면 path 사용
-    if path.endswith("/upload"):
-        return handle_upload_request(event)
-    elif path.endswith("/delete"):
-        return handle_delete_request(event)
-    else:
+    try:
+        if path.endswith("/upload"):
+            return handle_upload_request(event)
+        elif path.endswith("/delete"):
+            return handle_delete_request(event)
+        elif path.endswith("/status"):
+            return handle_status_request(event)
+        else:
+            return {
+                "statusCode": 404,
+                "body": json.dumps({"message": "Invalid endpoint"}),
+            }
+    except NotionAPIError as e:
+        # 재시도 후에도 Notion 요청이 실패하면 S3를 건드리지 않고 실패 응답
+        print(f"Notion API error: {e}")
         return {
-            "statusCode": 404,
-            "body": json.dumps({"message": "Invalid endpoint"}),
+            "statusCode": 502,
+            "body": json.dumps({"message": f"Notion API request failed: {e}"}),
         }
+    finally:
+        flush_invalidations()
+        emit_metrics("api", {"Path": path, "Notion": request_stats.snapshot()})
+
+
+def get_custom_id(page):
+    """page 객체의 ID(unique_id) 속성 값을 문자열로 반환"""
+    value = page.get("properties", {}).get("ID", {})
+    if value.get("type") != "unique_id":
+        return None
+    number = value.get("unique_id", {}).get("number")
+    return str(number) if number is not None else None
 
 
+@timed("find_page")
 def find_page_by_custom_id(database_id, custom_id):
-    """custom_id로 Notion page 객체 찾기"""
-    pages = fetch_database_pages(database_id)
-    for page in pages:
+    """custom_id로 Notion page 객체 찾기
+
+    인덱스에 page_id가 있으면 페이지를 바로 조회하고,
+    없으면 unique_id 필터로 데이터베이스를 한 번만 쿼리한다.
+    """
+    entry = lookup_page(custom_id, S3_BUCKET_NAME)
+    if entry:
         try:
-            for key, value in page.get("properties", {}).items():
-                if key == "ID" and value.get("type") == "unique_id":
-                    uid = value.get("unique_id", {})
-                    if str(uid.get("number", "")) == str(custom_id):
-                        return page
-        except Exception:
-            continue
+            page = fetch_page(entry["page_id"])
+        except NotionAPIError as e:
+            if e.status != 404:
+                raise
+            page = None
+        if page and not page.get("archived") and get_custom_id(page) == str(custom_id):
+            return page
+        # 인덱스가 오래된 경우 제거 후 쿼리로 재조회
+        remove_from_page_index(custom_id, S3_BUCKET_NAME)
+
+    try:
+        number = int(custom_id)
+    except (TypeError, ValueError):
+        return None
+
+    pages = fetch_database_pages(
+        database_id,
+        filter={"property": "ID", "unique_id": {"equals": number}},
+    )
+    for page in pages:
+        if get_custom_id(page) == str(custom_id):
+            return page
     return None
 
 
@@ -68,6 +186,7 @@ def handle_delete_request(event):
         }
     try:
         body_data = json.loads(body)
+        last_edited_time = body_data.get("data", {}).get("last_edited_time")
         target_custom_id = (
             body_data.get("data", {})
             .get("properties", {})
@@ -88,26 +207,44 @@ def handle_delete_request(event):
             "statusCode": 400,
             "body": json.dumps({"message": "custom_id is required in request body"}),
         }
-    # Notion page 객체 찾기
-    page = find_page_by_custom_id(DATABASE_ID, target_custom_id)
-    if not page:
-        return {
-            "statusCode": 404,
-            "body": json.dumps(
-                {"message": f"No post found with custom ID: {target_custom_id}"}
-            ),
-        }
-    category = "web"
-    try:
-        for key, value in page.get("properties", {}).items():
-            if value.get("type") == "select":
-                category = value.get("select", {}).get("name", "web")
-    except Exception as e:
-        print(f"Error parsing category: {e}")
+
+    key = request_key("delete", target_custom_id, last_edited_time)
+    return run_once(key, lambda: delete_post(target_custom_id))
+
+
+def delete_post(target_custom_id):
+    """게시된 포스트를 S3에서 삭제하고 Notion 상태를 되돌림"""
+    # 인덱스에 업로드 위치가 있고 그 위치에 게시돼 있으면 Notion 조회 없이 바로 삭제
+    entry = lookup_page(target_custom_id, S3_BUCKET_NAME)
+    if entry and not load_manifest(entry["category"], target_custom_id, S3_BUCKET_NAME):
+        # 다른 컨테이너가 카테고리를 바꿨거나 인덱스가 오래됨
+        print(f"Stale page index entry for {target_custom_id}: {entry}")
+        remove_from_page_index(target_custom_id, S3_BUCKET_NAME)
+        entry = None
+    if entry:
+        page_id = entry["page_id"]
+        category = entry["category"]
+    else:
+        # Notion page 객체 찾기
+        page = find_page_by_custom_id(DATABASE_ID, target_custom_id)
+        if not page:
+            return {
+                "statusCode": 404,
+                "body": json.dumps(
+                    {"message": f"No post found with custom ID: {target_custom_id}"}
+                ),
+            }
+        page_id = page["id"]
+        _, category = get_page_properties(page)
     # S3에서 파일 삭제
-    success = delete_post_from_s3(target_custom_id, category, S3_BUCKET_NAME)
-    if success:
-        update_post_status(page["id"], "Not Uploaded")
+    results = delete_post_from_s3(target_custom_id, category, S3_BUCKET_NAME)
+    failed = [result.key for result in results if not result.ok]
+    if not failed:
+        remove_from_page_index(target_custom_id, S3_BUCKET_NAME)
+        remove_from_search_index(target_custom_id, S3_BUCKET_NAME)
+        remove_from_listing(target_custom_id, category, S3_BUCKET_NAME)
+        invalidate(f"posts/{category}/{target_custom_id}/*")
+        update_post_status(page_id, "Not Uploaded")
         return {
             "statusCode": 200,
             "body": json.dumps(
@@ -118,18 +255,222 @@ def handle_delete_request(event):
         return {
             "statusCode": 500,
             "body": json.dumps(
-                {"message": f"Failed to delete post {target_custom_id}"}
+                {
+                    "message": f"Failed to delete post {target_custom_id}",
+                    "failed": failed,
+                }
             ),
         }
 
 
+def version_objects(rendered, metadata, category, custom_id, version):
+    """버전 폴더에 올릴 (meta.json 내용, {파일명: bytes})"""
+    meta = post_meta(
+        metadata,
+        category,
+        custom_id,
+        version,
+        rendered["thumbnail"],
+        rendered["og_image"],
+    )
+    objects = {
+        "page.mdx": rendered["markdown"].encode("utf-8"),
+        META_FILENAME: json.dumps(meta, ensure_ascii=False).encode("utf-8"),
+        BLOCK_CACHE_FILENAME: json.dumps(rendered["blocks"], ensure_ascii=False).encode(
+            "utf-8"
+        ),
+    }
+    return meta, objects
+
+
+def is_unchanged(rendered, metadata, manifest, category, custom_id):
+    """변환 결과가 현재 게시 버전과 같은지 (블록 해시와 객체 해시 비교)"""
+    if any(rendered["cover_files"].values()):
+        return False
+    if (rendered["thumbnail"], rendered["og_image"]) != (
+        manifest.get("thumbnail"),
+        manifest.get("og_image"),
+    ):
+        return False
+    _, objects = version_objects(
+        rendered, metadata, category, custom_id, current_version(manifest)
+    )
+    published = manifest.get("objects", {})
+    return all(
+        published.get(name) == content_hash(body) for name, body in objects.items()
+    )
+
+
+def discard_version(category, custom_id, version):
+    """게시하지 못한 버전 폴더 삭제 (남은 것은 다음 GC에서 정리)"""
+    prefix = f"posts/{category}/{custom_id}/{version}/"
+    try:
+        delete_keys(list_keys(prefix, S3_BUCKET_NAME), S3_BUCKET_NAME)
+    except Exception as e:
+        print(f"Error discarding {prefix}: {e}")
+
+
+def publish_post(page, page_title, category, custom_id, force=False):
+    """포스트를 새 버전 폴더(v{n}-{접미사}/)에 기록한 뒤 manifest를 바꿔 한 번에 게시
+
+    manifest의 블록 캐시와 비교해 바뀐 블록만 변환하고, 내용이 같은 객체는
+    이전 버전에서 복사한다. 이전 버전은 manifest 전환 후 비동기로 정리되므로
+    게시 중에도 읽는 쪽에는 항상 완성된 한 버전만 보인다.
+    force이면 블록 캐시를 무시하고 전체를 다시 변환한다.
+
+    같은 포스트를 동시에 게시해 다른 게시가 먼저 manifest를 바꿨으면, 이번 버전
+    폴더를 지우고 페이지를 다시 가져와 새 manifest 기준으로 한 번 더 게시한다.
+
+    Returns:
+        {"changed": 변경 여부, "failed": 업로드에 실패한 S3 키 목록}
+    """
+    for attempt in range(PUBLISH_CONFLICT_RETRIES + 1):
+        if attempt:
+            page = fetch_page(page["id"])
+        try:
+            return _publish_version(page, page_title, category, custom_id, force)
+        except ManifestConflict as e:
+            print(f"Post {custom_id} was published concurrently: {e}")
+    return {
+        "changed": True,
+        "failed": [f"posts/{category}/{custom_id}/{MANIFEST_FILENAME}"],
+    }
+
+
+def _publish_version(page, page_title, category, custom_id, force):
+    manifest = load_manifest(category, custom_id, S3_BUCKET_NAME)
+    if not force and is_up_to_date(manifest, page):
+        print(f"Post {custom_id} is up to date, skipping")
+        return {"changed": False, "failed": []}
+
+    previous_version = current_version(manifest)
+    revision = (manifest.get("revision") or 0) + 1 if manifest else 1
+    version = new_version(revision)
+
+    cache = None
+    if not force and is_compatible(manifest) and previous_version:
+        cache = dict(
+            manifest,
+            blocks=load_block_cache(manifest, category, custom_id, S3_BUCKET_NAME),
+        )
+
+    # 이 시각 이후의 수정은 이번 게시에 반영되지 않았을 수 있음 (is_up_to_date 참고)
+    synced_at = time.time()
+    # 본문 이미지는 공용 assets에, 썸네일과 OG 카드는 새 버전 폴더에 변환 중 바로 업로드됨
+    with span("render"):
+        rendered = render_page(
+            page, page_title, category, custom_id, S3_BUCKET_NAME, cache, version
+        )
+
+    metadata = page_metadata(page, page_title)
+    if cache and is_unchanged(rendered, metadata, manifest, category, custom_id):
+        # 내용이 그대로면(상태 속성만 바뀐 경우 등) 새 버전 없이 확인 시각만 기록
+        try:
+            save_manifest(
+                dict(
+                    manifest,
+                    last_edited_time=page.get("last_edited_time"),
+                    synced_at=synced_at,
+                    cover_validators=rendered["cover_validators"],
+                ),
+                category,
+                custom_id,
+                S3_BUCKET_NAME,
+                base=manifest,
+            )
+        except ManifestConflict:
+            # 다른 게시가 이미 새 버전으로 전환함
+            pass
+        print(f"Post {custom_id} content is unchanged, skipping")
+        return {"changed": False, "failed": []}
+
+    meta, objects = version_objects(rendered, metadata, category, custom_id, version)
+    for name, digest in rendered["cover_files"].items():
+        if digest is None:
+            # 커버가 그대로면 이전 버전의 썸네일과 OG 카드를 복사
+            objects[name] = None
+    with span("upload_version"):
+        hashes, results = upload_version(
+            objects,
+            custom_id,
+            category,
+            S3_BUCKET_NAME,
+            version,
+            {
+                "version": previous_version,
+                "objects": manifest.get("objects", {}) if manifest else {},
+            },
+        )
+    for name, digest in rendered["cover_files"].items():
+        if digest:
+            hashes[name] = digest
+    failed = [result.key for result in results if not result.ok]
+    for name in rendered["cover_files"]:
+        if name not in hashes:
+            failed.append(f"posts/{category}/{custom_id}/{version}/{name}")
+    if failed:
+        # manifest를 바꾸지 않았으므로 이전 버전이 그대로 게시됨
+        discard_version(category, custom_id, version)
+        return {"changed": True, "failed": failed}
+
+    # manifest 전환 (이 시점부터 새 버전이 게시됨)
+    try:
+        saved = save_manifest(
+            {
+                "revision": revision,
+                "folder": version,
+                "last_edited_time": page.get("last_edited_time"),
+                "synced_at": synced_at,
+                "cover": rendered["cover"],
+                "cover_validators": rendered["cover_validators"],
+                "thumbnail": rendered["thumbnail"],
+                "og_image": rendered["og_image"],
+                "objects": hashes,
+            },
+            category,
+            custom_id,
+            S3_BUCKET_NAME,
+            base=manifest,
+        )
+    except ManifestConflict:
+        discard_version(category, custom_id, version)
+        raise
+    if not saved:
+        discard_version(category, custom_id, version)
+        return {
+            "changed": True,
+            "failed": [f"posts/{category}/{custom_id}/manifest.json"],
+        }
+
+    # 버전 폴더의 객체는 새 키이고 manifest는 CloudFront로 서비스하지 않으므로
+    # 무효화할 것은 아래 목록과 검색 색인뿐
+    schedule_gc(category, custom_id, S3_BUCKET_NAME)
+    # 목록은 항목 하나만, 검색 색인은 바뀐 토큰의 샤드만 갱신
+    update_listing(meta, S3_BUCKET_NAME)
+    update_search_index(
+        custom_id,
+        {
+            name: meta[name]
+            for name in ("title", "category", "date", "tags", "description")
+        },
+        rendered["text"],
+        S3_BUCKET_NAME,
+    )
+    return {"changed": True, "failed": []}
+
+
 def handle_upload_request(event):
     # custom_id는 필수
     target_custom_id = None
+    last_edited_time = None
+    force = False
     body = event.get("body", None)
     if body:
         try:
             body_data = json.loads(body)
+            # force: manifest를 무시하고 전체 다시 변환
+            force = bool(body_data.get("force", False))
+            last_edited_time = body_data.get("data", {}).get("last_edited_time")
             target_custom_id = (
                 body_data.get("data", {})
                 .get("properties", {})
@@ -151,6 +492,33 @@ def handle_upload_request(event):
             "body": json.dumps({"message": "custom_id is required in request body"}),
         }
 
+    # 같은 수정본에 대한 반복 요청은 처음 요청의 결과(작업 ID)를 그대로 반환
+    key = request_key("upload", target_custom_id, last_edited_time, force)
+    return run_once(key, lambda: upload_post(target_custom_id, force))
+
+
+def upload_post(target_custom_id, force=False):
+    """게시 작업을 큐에 넣거나 (큐가 없으면) 바로 게시"""
+    if PUBLISH_QUEUE_URL:
+        # 변환은 worker가 처리하고 작업 ID만 바로 반환
+        job = enqueue_publish(target_custom_id, force, S3_BUCKET_NAME)
+        if job["status"] == FAILED:
+            return {
+                "statusCode": 500,
+                "body": json.dumps(
+                    {"message": "Failed to queue upload", "job_id": job["job_id"]}
+                ),
+            }
+        return {
+            "statusCode": 202,
+            "body": json.dumps({"message": "Upload queued", "job_id": job["job_id"]}),
+        }
+
+    return publish_by_custom_id(target_custom_id, force)
+
+
+def publish_by_custom_id(target_custom_id, force=False):
+    """custom_id의 포스트를 찾아 게시하고 API 응답 형식으로 결과 반환"""
     page = find_page_by_custom_id(DATABASE_ID, target_custom_id)
     if not page:
         return {
@@ -160,9 +528,13 @@ def handle_upload_request(event):
             ),
         }
 
+    return publish_page(page, target_custom_id, force)
+
+
+def get_page_properties(page):
+    """page 객체에서 (제목, 카테고리) 추출"""
     page_title = "Untitled"
     category = "web"
-    custom_id = target_custom_id
     try:
         for key, value in page.get("properties", {}).items():
             if value.get("type") == "title":
@@ -173,11 +545,28 @@ def handle_upload_request(event):
                 category = value.get("select", {}).get("name", "web")
     except Exception as e:
         print(f"Error parsing properties: {e}")
+    return page_title, category
+
 
-    page_markdown = page_to_markdown(page, page_title, category, custom_id)
-    delete_post_from_s3(custom_id, category, S3_BUCKET_NAME)
-    save_markdown_to_s3(page_markdown, category, custom_id, S3_BUCKET_NAME)
-    upload_assets_to_s3(custom_id, category, S3_BUCKET_NAME)
+def publish_page(page, custom_id, force=False):
+    """찾은 page 객체를 게시하고 API 응답 형식으로 결과 반환"""
+    page_title, category = get_page_properties(page)
+    result = publish_post(
+        page, page_title, category, custom_id, force or not INCREMENTAL_PUBLISH
+    )
+    if result["failed"]:
+        return {
+            "statusCode": 500,
+            "body": json.dumps(
+                {"message": "Upload partially failed", "failed": result["failed"]}
+            ),
+        }
+    if not result["changed"]:
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"message": "No changes since last upload"}),
+        }
+    update_page_index(custom_id, page["id"], category, S3_BUCKET_NAME)
     update_post_status(page["id"], "Uploaded")
 
     return {
@@ -186,5 +575,26 @@ def handle_upload_request(event):
     }
 
 
+def handle_status_request(event):
+    """게시 작업 진행 상태 조회 (GET /status?job_id=...)"""
+    params = event.get("queryStringParameters") or {}
+    job_id = params.get("job_id")
+    if not job_id:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"message": "job_id query parameter is required"}),
+        }
+    job = get_job(job_id, S3_BUCKET_NAME)
+    if not job:
+        return {
+            "statusCode": 404,
+            "body": json.dumps({"message": f"No job found with ID: {job_id}"}),
+        }
+    return {
+        "statusCode": 200,
+        "body": json.dumps(job, ensure_ascii=False),
+    }
+
+
 if __name__ == "__main__":
     lambda_handler(None, None)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+
+from botocore.exceptions import ClientError
+from config import get_client
+from s3_uploader import update_json_object
+
+# 변환 결과 형식이 바뀌면 올려서 기존 manifest의 블록 캐시를 무효화
+MANIFEST_VERSION = 12
+# Notion의 last_edited_time은 분 단위로 내림되므로 같은 분 안의 수정은 구분되지 않음
+EDIT_TIME_RESOLUTION_SECONDS = 60
+# 현재 게시 버전을 가리키는 포인터 (posts/{category}/{id}/manifest.json)
+MANIFEST_FILENAME = "manifest.json"
+# 버전 폴더에 함께 저장하는 블록 변환 캐시
+BLOCK_CACHE_FILENAME = "blocks.json"
+
+# 내용과 무관하게 매번 바뀌는 필드 (서명 URL 만료 시간, 편집자 정보 등)
+VOLATILE_KEYS = {
+    "created_by",
+    "created_time",
+    "expiry_time",
+    "last_edited_by",
+    "last_edited_time",
+    "request_id",
+}
+
+
+def strip_signed_query(url):
+    """S3 서명 URL의 query string 제거 (서명은 요청마다 바뀜)"""
+    if "X-Amz-" not in url:
+        return url
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+def normalize_block(value):
+    """해시 계산을 위해 블록에서 변동성 있는 값을 제거"""
+    if isinstance(value, dict):
+        return {
+            key: normalize_block(item)
+            for key, item in value.items()
+            if key not in VOLATILE_KEYS
+        }
+    if isinstance(value, list):
+        return [normalize_block(item) for item in value]
+    if isinstance(value, str) and value.startswith("http"):
+        return strip_signed_query(value)
+    return value
+
+
+def block_hash(block, list_counter=0):
+    """블록(자식 포함)의 내용 해시
+
+    numbered list 번호는 앞 블록에 따라 달라지므로 변환 직전 번호도 포함
+    """
+    payload = json.dumps(
+        [normalize_block(block), list_counter], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cover_key(page):
+    """썸네일 재다운로드 여부 판단용 커버 식별자 (없으면 None)"""
+    cover = page.get("cover") or {}
+    url = cover.get(cover.get("type", ""), {}).get("url", "")
+    return strip_signed_query(url) if url else None
+
+
+def load_manifest(category, page_id, bucket_name):
+    """현재 게시 버전을 가리키는 manifest 읽기 (없으면 None)
+
+    형식이 다른 manifest도 revision 번호를 이어가기 위해 그대로 반환하며,
+    블록 캐시 재사용 여부는 is_compatible로 판단한다.
+    """
+    s3_key = f"posts/{category}/{page_id}/{MANIFEST_FILENAME}"
+    try:
+        response = get_client("s3").get_object(Bucket=bucket_name, Key=s3_key)
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+            print(f"Error loading manifest {s3_key}: {e}")
+        return None
+    except Exception as e:
+        print(f"Error loading manifest {s3_key}: {e}")
+        return None
+
+
+def is_compatible(manifest):
+    """현재 변환기와 같은 형식의 manifest인지 확인"""
+    return bool(manifest) and manifest.get("version") == MANIFEST_VERSION
+
+
+class ManifestConflict(Exception):
+    """다른 게시가 먼저 manifest를 바꿔 이번 버전으로 전환하지 못함"""
+
+
+def new_version(revision):
+    """새 버전 폴더 이름 (v{n}-{uuid 8자리})
+
+    같은 revision을 동시에 게시해도 서로의 폴더를 덮어쓰지 않도록 임의 접미사를 붙인다.
+    """
+    return f"v{revision}-{uuid.uuid4().hex[:8]}"
+
+
+def current_version(manifest):
+    """manifest가 가리키는 버전 폴더 이름 (버전 이전 manifest면 None)
+
+    접미사 없는 v{n} 폴더를 쓰던 이전 manifest는 folder 필드가 없다.
+    """
+    if not manifest:
+        return None
+    revision = manifest.get("revision")
+    return manifest.get("folder") or (f"v{revision}" if revision else None)
+
+
+def load_block_cache(manifest, category, page_id, bucket_name):
+    """manifest가 가리키는 버전의 블록 변환 캐시 (blocks.json) 읽기"""
+    version = current_version(manifest)
+    if not version or not is_compatible(manifest):
+        return []
+    if BLOCK_CACHE_FILENAME not in manifest.get("objects", {}):
+        return []
+    s3_key = f"posts/{category}/{page_id}/{version}/{BLOCK_CACHE_FILENAME}"
+    try:
+        response = get_client("s3").get_object(Bucket=bucket_name, Key=s3_key)
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except Exception as e:
+        print(f"Error loading block cache {s3_key}: {e}")
+        return []
+
+
+def save_manifest(manifest, category, page_id, bucket_name, base=None):
+    """manifest를 저장해 현재 게시 버전을 전환 (조건부 쓰기)
+
+    저장된 manifest가 base(이번 게시가 기준으로 읽은 manifest)가 가리키던 버전을
+    그대로 가리킬 때만 쓴다. 그 사이 다른 게시가 먼저 전환했으면 ManifestConflict.
+
+    Args:
+        base: 게시를 시작할 때 읽은 manifest (없었으면 None)
+
+    Returns:
+        저장 성공 여부
+    """
+    s3_key = f"posts/{category}/{page_id}/{MANIFEST_FILENAME}"
+    manifest = dict(manifest, version=MANIFEST_VERSION)
+    expected = current_version(base)
+
+    def update(current):
+        if current_version(current) != expected:
+            raise ManifestConflict(
+                f"{s3_key} now points to {current_version(current)}, not {expected}"
+            )
+        return manifest
+
+    try:
+        # CloudFront 무효화는 게시가 끝난 뒤 호출하는 쪽에서 요청
+        update_json_object(s3_key, bucket_name, update, "no-cache", cdn=False)
+        return True
+    except (ClientError, RuntimeError) as e:
+        print(f"Error saving manifest {s3_key}: {e}")
+        return False
+
+
+def parse_edit_time(value):
+    """Notion 시각 문자열(ISO 8601)을 epoch 초로 변환 (형식이 다르면 None)"""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def is_up_to_date(manifest, page):
+    """페이지가 마지막 게시 이후 수정되지 않았는지 확인
+
+    last_edited_time이 같아도 게시할 때 내용을 가져온 시각(synced_at)이 그 분이
+    끝나기 전이면 같은 분 안의 이후 수정이 빠졌을 수 있으므로 False를 반환한다.
+    (이때는 블록 해시 비교로 실제 변경 여부를 확인)
+    """
+    if not is_compatible(manifest):
+        return False
+    edited = page.get("last_edited_time")
+    if not edited or manifest.get("last_edited_time") != edited:
+        return False
+    edited_at = parse_edit_time(edited)
+    synced_at = manifest.get("synced_at")
+    if edited_at is None or synced_at is None:
+        return False
+    return synced_at >= edited_at + EDIT_TIME_RESOLUTION_SECONDS
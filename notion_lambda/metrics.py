@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+# CloudWatch 메트릭 namespace (Embedded Metric Format 로그에서 자동 추출)
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "ContentsPlatform/PostUpload")
+# off면 메트릭 로그를 남기지 않음 (집계는 그대로)
+METRICS_ENABLED = os.getenv("METRICS", "on") != "off"
+
+
+class Trace:
+    """호출 하나 동안의 단계별 소요 시간과 카운터 (스레드 안전)
+
+    다운로드/업로드 스레드도 같은 Trace에 기록한다.
+    """
+
+    def __init__(self, correlation_id=None):
+        self.correlation_id = correlation_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        # {단계: [횟수, 합계(초), 최대(초)]}
+        self.spans = {}
+        # {이름: 값} (이름이 _bytes로 끝나면 바이트 수)
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = [1, seconds, seconds]
+            else:
+                span[0] += 1
+                span[1] += seconds
+                if seconds > span[2]:
+                    span[2] = seconds
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """{"spans": {단계: {"count", "total_ms", "max_ms"}}, "counters": {...}}"""
+        with self._lock:
+            return {
+                "spans": {
+                    name: {
+                        "count": count,
+                        "total_ms": round(total * 1000, 1),
+                        "max_ms": round(longest * 1000, 1),
+                    }
+                    for name, (count, total, longest) in self.spans.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+_trace = Trace()
+
+
+def current_trace():
+    return _trace
+
+
+def start_trace(correlation_id=None):
+    """새 호출의 Trace 시작 (이전 호출의 집계는 버림)"""
+    global _trace
+    _trace = Trace(correlation_id)
+    return _trace
+
+
+def correlation_id(event=None, context=None):
+    """요청 헤더의 X-Correlation-Id, 없으면 Lambda request ID"""
+    headers = (event or {}).get("headers") or {}
+    for name, value in headers.items():
+        if name.lower() == "x-correlation-id" and value:
+            return value
+    return getattr(context, "aws_request_id", None)
+
+
+@contextmanager
+def span(name):
+    """with 블록의 소요 시간을 name 단계로 기록"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace.record(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """함수 실행 시간을 name 단계로 기록하는 decorator"""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _trace.record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def incr(name, value=1):
+    """현재 Trace의 카운터 증가 (예: 요청 수, 바이트 수)"""
+    _trace.incr(name, value)
+
+
+def build_emf(operation, properties=None, trace=None, timestamp=None):
+    """Trace를 CloudWatch Embedded Metric Format 로그 한 줄(dict)로 변환
+
+    단계별 합계 시간은 {단계}_ms(Milliseconds), 카운터는 Count/Bytes 메트릭이 되고,
+    단계별 횟수/최대 시간과 properties는 검색용 속성으로만 남는다.
+    """
+    trace = trace or _trace
+    data = trace.snapshot()
+    record = {
+        "Operation": operation,
+        "CorrelationId": trace.correlation_id,
+        "duration_ms": round((time.perf_counter() - trace.started) * 1000, 1),
+    }
+    metrics = [{"Name": "duration_ms", "Unit": "Milliseconds"}]
+    for name, span_data in sorted(data["spans"].items()):
+        record[f"{name}_ms"] = span_data["total_ms"]
+        metrics.append({"Name": f"{name}_ms", "Unit": "Milliseconds"})
+    for name, value in sorted(data["counters"].items()):
+        record[name] = value
+        unit = "Bytes" if name.endswith("_bytes") else "Count"
+        metrics.append({"Name": name, "Unit": unit})
+
+    record["spans"] = data["spans"]
+    record.update(properties or {})
+    record["_aws"] = {
+        "Timestamp": int((timestamp or time.time()) * 1000),
+        "CloudWatchMetrics": [
+            {
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["Operation"]],
+                "Metrics": metrics,
+            }
+        ],
+    }
+    return record
+
+
+def emit_metrics(operation, properties=None):
+    """현재 Trace를 EMF JSON 한 줄로 출력 (CloudWatch Logs가 메트릭으로 추출)"""
+    if not METRICS_ENABLED:
+        return None
+    record = build_emf(operation, properties)
+    print(json.dumps(record, ensure_ascii=False, default=str))
+    return record
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+
+from botocore.exceptions import ClientError
+from config import get_client
+from s3_uploader import ConditionalWriteUnsupported, update_json_object
+
+# custom_id -> {page_id, category} 인덱스 저장 위치
+# - "tmp": 컨테이너의 /tmp에 저장 (warm invocation에서 재사용)
+# - "s3": 포스트 버킷에 저장 (모든 컨테이너가 공유)
+# - "off": 인덱스 사용 안 함
+PAGE_INDEX_STORE = os.getenv("PAGE_INDEX_STORE", "tmp")
+PAGE_INDEX_LOCAL_PATH = "/tmp/page-index.json"
+PAGE_INDEX_S3_KEY = "meta/page-index.json"
+
+_page_index = None
+# 여러 포스트를 동시에 게시할 때 인덱스 갱신을 직렬화
+_lock = threading.Lock()
+
+
+def _load_page_index(bucket_name):
+    """저장소에서 인덱스를 읽어 메모리에 캐시"""
+    global _page_index
+    if _page_index is not None:
+        return _page_index
+
+    _page_index = {}
+    try:
+        if PAGE_INDEX_STORE == "s3":
+            response = get_client("s3").get_object(
+                Bucket=bucket_name, Key=PAGE_INDEX_S3_KEY
+            )
+            _page_index = json.loads(response["Body"].read().decode("utf-8"))
+        elif PAGE_INDEX_STORE == "tmp" and os.path.exists(PAGE_INDEX_LOCAL_PATH):
+            with open(PAGE_INDEX_LOCAL_PATH, "r", encoding="utf-8") as f:
+                _page_index = json.load(f)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+            print(f"Error loading page index: {e}")
+    except Exception as e:
+        print(f"Error loading page index: {e}")
+    return _page_index
+
+
+def _save_page_index(bucket_name):
+    """메모리의 인덱스를 /tmp에 기록 (s3 저장소는 _modify_page_index에서 조건부 쓰기)"""
+    body = json.dumps(_page_index, ensure_ascii=False)
+    try:
+        with open(PAGE_INDEX_LOCAL_PATH, "w", encoding="utf-8") as f:
+            f.write(body)
+    except Exception as e:
+        print(f"Error saving page index: {e}")
+
+
+def _modify_page_index(bucket_name, change):
+    """인덱스를 change(index)로 고쳐 저장 (change는 바뀌었으면 True 반환)
+
+    s3 저장소는 다른 Lambda가 쓴 항목을 덮어쓰지 않도록 매번 다시 읽고
+    조건부 쓰기로 저장한 뒤, 읽은 최신 내용으로 메모리 캐시를 바꾼다.
+    """
+    global _page_index
+    with _lock:
+        if PAGE_INDEX_STORE != "s3":
+            if change(_load_page_index(bucket_name)):
+                _save_page_index(bucket_name)
+            return
+
+        latest = {}
+
+        def update(data):
+            latest["index"] = dict(data or {})
+            return latest["index"] if change(latest["index"]) else None
+
+        try:
+            update_json_object(
+                PAGE_INDEX_S3_KEY, bucket_name, update, "no-cache", cdn=False
+            )
+        except ConditionalWriteUnsupported:
+            raise
+        except Exception as e:
+            print(f"Error saving page index: {e}")
+            return
+        _page_index = latest.get("index", _page_index)
+
+
+def lookup_page(custom_id, bucket_name):
+    """인덱스에서 custom_id에 해당하는 {page_id, category} 조회"""
+    if PAGE_INDEX_STORE == "off":
+        return None
+    return _load_page_index(bucket_name).get(str(custom_id))
+
+
+def update_page_index(custom_id, page_id, category, bucket_name):
+    """업로드 후 인덱스 갱신"""
+    if PAGE_INDEX_STORE == "off":
+        return
+    entry = {"page_id": page_id, "category": category}
+
+    def change(index):
+        if index.get(str(custom_id)) == entry:
+            return False
+        index[str(custom_id)] = entry
+        return True
+
+    _modify_page_index(bucket_name, change)
+
+
+def remove_from_page_index(custom_id, bucket_name):
+    """삭제 후 인덱스에서 제거"""
+    if PAGE_INDEX_STORE == "off":
+        return
+    _modify_page_index(
+        bucket_name, lambda index: index.pop(str(custom_id), None) is not None
+    )
@@ -0,0 +1,101 @@
+import json
+
+from cdn import flush_invalidations
+from client import NotionAPIError, request_stats
+from jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, get_job, update_job
+from main import S3_BUCKET_NAME, check_config, publish_by_custom_id
+from metrics import correlation_id, emit_metrics, start_trace
+
+
+def group_messages(records):
+    """SQS 레코드를 custom_id별로 묶기 (같은 포스트의 연속 요청은 한 번만 게시)
+
+    Returns:
+        {custom_id: [(messageId, 메시지), ...]} (받은 순서 유지)
+    """
+    groups = {}
+    for record in records:
+        try:
+            message = json.loads(record["body"])
+            custom_id = str(message["custom_id"])
+        except (KeyError, TypeError, ValueError) as e:
+            # 다시 시도해도 처리할 수 없는 메시지는 버림
+            print(f"Dropping malformed message {record.get('messageId')}: {e}")
+            continue
+        groups.setdefault(custom_id, []).append((record["messageId"], message))
+    return groups
+
+
+def load_jobs(messages):
+    """메시지에 해당하는 작업 상태 (저장된 상태가 없으면 메시지로 생성)"""
+    jobs = []
+    for _, message in messages:
+        job = get_job(message["job_id"], S3_BUCKET_NAME) or {
+            "job_id": message["job_id"],
+            "custom_id": message["custom_id"],
+            "force": message.get("force", False),
+        }
+        jobs.append(job)
+    return jobs
+
+
+def process_group(custom_id, messages):
+    """같은 포스트의 작업을 한 번의 게시로 처리
+
+    Returns:
+        재시도가 필요하면 False
+    """
+    jobs = load_jobs(messages)
+    force = any(message.get("force") for _, message in messages)
+    job_ids = [job["job_id"] for job in jobs]
+    if len(jobs) > 1:
+        print(f"Coalesced {len(jobs)} jobs for post {custom_id}: {job_ids}")
+    jobs = [update_job(job, S3_BUCKET_NAME, RUNNING, coalesced=job_ids) for job in jobs]
+
+    try:
+        response = publish_by_custom_id(custom_id, force)
+    except NotionAPIError as e:
+        print(f"Notion API error while publishing {custom_id}: {e}")
+        for job in jobs:
+            update_job(job, S3_BUCKET_NAME, QUEUED, error=str(e))
+        return False
+
+    status_code = response["statusCode"]
+    body = json.loads(response["body"])
+    # 부분 업로드 실패 등 서버 오류는 큐에서 다시 시도
+    retry = status_code >= 500
+    status = SUCCEEDED if status_code < 400 else (QUEUED if retry else FAILED)
+    for job in jobs:
+        update_job(job, S3_BUCKET_NAME, status, result=body, status_code=status_code)
+    return not retry
+
+
+def lambda_handler(event, context):
+    """SQS 배치로 받은 게시 작업 처리 (실패한 메시지만 다시 큐로)"""
+    missing = check_config()
+    if missing:
+        # 배치 전체를 다시 큐로 (계속 실패하면 DLQ로 이동)
+        raise RuntimeError(f"Missing configuration: {', '.join(missing)}")
+    request_stats.reset()
+    start_trace(correlation_id(event, context))
+    failures = []
+    try:
+        for custom_id, messages in group_messages(event.get("Records", [])).items():
+            try:
+                ok = process_group(custom_id, messages)
+            except Exception as e:
+                print(f"Error publishing post {custom_id}: {e}")
+                ok = False
+            if not ok:
+                failures.extend(message_id for message_id, _ in messages)
+    finally:
+        flush_invalidations()
+        emit_metrics(
+            "publish",
+            {
+                "Messages": len(event.get("Records", [])),
+                "Failures": len(failures),
+                "Notion": request_stats.snapshot(),
+            },
+        )
+    return {"batchItemFailures": [{"itemIdentifier": mid} for mid in failures]}
@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """스레드 안전한 토큰 버킷 rate limiter
+
+    Args:
+        rate: 초당 채워지는 토큰 수 (평균 요청 속도)
+        capacity: 버킷 크기 (순간적으로 허용되는 burst)
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 하나를 얻을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                else:
+                    elapsed = now - self._updated
+                    self._tokens = min(
+                        self.capacity, self._tokens + elapsed * self.rate
+                    )
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Retry-After 등으로 지정된 시간 동안 모든 요청을 멈춤"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._updated = self._blocked_until
+            self._tokens = 0
+
+
+def backoff_delay(attempt, base=0.5, max_delay=30.0):
+    """지수 백오프 대기 시간 (full jitter)"""
+    return random.uniform(0, min(max_delay, base * (2**attempt)))
+
+
+class RequestStats:
+    """요청 수, 재시도 수, 지연 시간 집계 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+            self.throttled = 0
+            self.errors = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+
+    def record(self, latency, status=None):
+        """요청 한 번의 결과 기록 (status가 None이면 연결 오류)"""
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            if status == 429:
+                self.throttled += 1
+            elif status is None or status >= 400:
+                self.errors += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self):
+        """현재까지의 집계를 dict로 반환"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "total_latency_ms": round(self.total_latency * 1000, 1),
+                "avg_latency_ms": round(
+                    self.total_latency * 1000 / self.requests if self.requests else 0,
+                    1,
+                ),
+                "max_latency_ms": round(self.max_latency * 1000, 1),
+            }
@@ -0,0 +1,216 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from bulk_sync import SYNC_MAX_WORKERS, sync_one
+from cdn import flush_invalidations, invalidate
+from client import fetch_database_pages, request_stats, update_post_status
+from listing import remove_from_listing
+from main import (
+    DATABASE_ID,
+    S3_BUCKET_NAME,
+    check_config,
+    get_custom_id,
+    get_page_properties,
+)
+from manifest import MANIFEST_FILENAME
+from metrics import correlation_id, emit_metrics, start_trace
+from page_index import remove_from_page_index
+from s3_uploader import delete_keys, list_objects
+from search_index import remove_from_search_index
+
+UPLOADED = "Uploaded"
+# manifest 없는 폴더는 게시 중일 수 있으므로 이 시간이 지난 뒤에만 정리
+RECONCILE_GRACE_SECONDS = int(os.getenv("RECONCILE_GRACE_SECONDS", "3600"))
+
+
+def get_status(page):
+    """page 객체의 status 속성 값"""
+    value = page.get("properties", {}).get("status", {})
+    return (value.get("status") or {}).get("name")
+
+
+def scan_posts(bucket_name):
+    """posts/ 전체를 한 번 나열해 포스트 폴더별로 묶기
+
+    Returns:
+        {(category, custom_id): {"keys", "manifest", "last_modified"}}
+    """
+    posts = {}
+    for obj in list_objects("posts/", bucket_name):
+        parts = obj["Key"].split("/", 3)
+        if len(parts) < 4:
+            continue
+        post = posts.setdefault(
+            (parts[1], parts[2]),
+            {"keys": [], "manifest": False, "last_modified": None},
+        )
+        post["keys"].append(obj["Key"])
+        if parts[3] == MANIFEST_FILENAME:
+            post["manifest"] = True
+        modified = obj.get("LastModified")
+        if modified and (not post["last_modified"] or modified > post["last_modified"]):
+            post["last_modified"] = modified
+    return posts
+
+
+def diff_state(pages, posts, now=None):
+    """Notion 페이지 목록과 S3 포스트 폴더를 비교 (API 호출 없이 메모리에서 계산)
+
+    Returns:
+        missing: Uploaded 상태지만 게시된 manifest가 없는 포스트
+        moved: 카테고리가 바뀌어 이전 카테고리 폴더가 남은 포스트
+        orphaned: 데이터베이스에 없는 포스트의 폴더, 오래된 미완성 폴더
+        unmarked: 게시돼 있지만 상태가 Uploaded가 아닌 포스트
+    """
+    now = now or datetime.now(timezone.utc)
+
+    def is_stale(post):
+        modified = post["last_modified"]
+        return (
+            not modified or (now - modified).total_seconds() > RECONCILE_GRACE_SECONDS
+        )
+
+    expected = {}
+    for page in pages:
+        custom_id = get_custom_id(page)
+        if custom_id and not page.get("archived"):
+            expected[custom_id] = page
+
+    categories_by_id = {}
+    for category, custom_id in posts:
+        categories_by_id.setdefault(custom_id, []).append(category)
+
+    report = {"missing": [], "moved": [], "orphaned": [], "unmarked": []}
+    for custom_id, page in expected.items():
+        _, category = get_page_properties(page)
+        status = get_status(page)
+        post = posts.get((category, custom_id))
+        published = bool(post and post["manifest"])
+        entry = {"custom_id": custom_id, "page_id": page["id"], "category": category}
+
+        others = [c for c in categories_by_id.get(custom_id, []) if c != category]
+        if others:
+            report["moved"].append(dict(entry, previous=sorted(others)))
+        if status == UPLOADED and not published:
+            report["missing"].append(entry)
+        elif status != UPLOADED and published:
+            report["unmarked"].append(entry)
+        elif post and not published and status != UPLOADED and is_stale(post):
+            report["orphaned"].append({"category": category, "custom_id": custom_id})
+
+    for (category, custom_id), post in posts.items():
+        if custom_id not in expected and (post["manifest"] or is_stale(post)):
+            report["orphaned"].append({"category": category, "custom_id": custom_id})
+    return report
+
+
+def repair(report, pages, posts, bucket_name):
+    """비교 결과를 일괄 복구
+
+    빠진 포스트와 카테고리가 바뀐 포스트를 worker pool로 다시 게시한 뒤,
+    남은 폴더는 모아서 1,000개 단위 delete_objects로 한 번에 지운다.
+    (manifest를 먼저 지워 읽는 쪽에는 포스트가 한 번에 사라진 것으로 보임)
+    """
+    pages_by_id = {page["id"]: page for page in pages}
+    published = {}
+
+    to_publish = {entry["page_id"] for entry in report["missing"]}
+    for entry in report["moved"]:
+        if get_status(pages_by_id[entry["page_id"]]) == UPLOADED:
+            to_publish.add(entry["page_id"])
+    if to_publish:
+        with ThreadPoolExecutor(max_workers=SYNC_MAX_WORKERS) as executor:
+            results = executor.map(
+                lambda page_id: sync_one(page_id, pages_by_id[page_id], False),
+                sorted(to_publish),
+            )
+            for result in results:
+                published[result["page_id"]] = result
+                print(
+                    f"Republished post {result['custom_id']}: "
+                    f"{result['status_code']} {result['message']}"
+                )
+
+    # 새 카테고리에 게시된 포스트만 이전 폴더 삭제
+    prefixes = [(entry["category"], entry["custom_id"]) for entry in report["orphaned"]]
+    for entry in report["moved"]:
+        result = published.get(entry["page_id"])
+        if result and result["status_code"] < 400:
+            prefixes.extend(
+                (category, entry["custom_id"]) for category in entry["previous"]
+            )
+
+    manifests = [
+        key
+        for prefix in prefixes
+        for key in posts[prefix]["keys"]
+        if key.endswith(f"/{MANIFEST_FILENAME}")
+    ]
+    results = delete_keys(manifests, bucket_name)
+    invalidate(*(f"posts/{category}/{custom_id}/*" for category, custom_id in prefixes))
+    # manifest를 지우지 못한 폴더는 게시 상태를 유지하도록 나머지도 남김
+    kept = {tuple(result.key.split("/")[1:3]) for result in results if not result.ok}
+    results += delete_keys(
+        [
+            key
+            for prefix in prefixes
+            if prefix not in kept
+            for key in posts[prefix]["keys"]
+            if not key.endswith(f"/{MANIFEST_FILENAME}")
+        ],
+        bucket_name,
+    )
+
+    expected_ids = {get_custom_id(page) for page in pages}
+    for entry in report["orphaned"]:
+        if entry["custom_id"] not in expected_ids:
+            remove_from_page_index(entry["custom_id"], bucket_name)
+            remove_from_search_index(entry["custom_id"], bucket_name)
+            remove_from_listing(entry["custom_id"], entry["category"], bucket_name)
+
+    for entry in report["unmarked"]:
+        update_post_status(entry["page_id"], UPLOADED)
+
+    return {
+        "published": [
+            r["custom_id"] for r in published.values() if r["status_code"] < 400
+        ],
+        "publish_failed": [
+            r["custom_id"] for r in published.values() if r["status_code"] >= 400
+        ],
+        "deleted": sum(1 for result in results if result.ok),
+        "delete_failed": [result.key for result in results if not result.ok],
+        "status_updated": [entry["custom_id"] for entry in report["unmarked"]],
+    }
+
+
+def lambda_handler(event, context):
+    """Notion 상태와 S3 게시 상태를 비교해 어긋난 포스트를 복구
+
+    event:
+        dry_run: true면 비교 결과만 반환
+    """
+    event = event or {}
+    missing = check_config()
+    if missing:
+        raise RuntimeError(f"Missing configuration: {', '.join(missing)}")
+
+    request_stats.reset()
+    start_trace(correlation_id(event, context))
+    try:
+        pages = fetch_database_pages(DATABASE_ID)
+        posts = scan_posts(S3_BUCKET_NAME)
+        report = diff_state(pages, posts)
+        print(
+            f"Reconcile: {len(pages)} pages, {len(posts)} post folders, "
+            + ", ".join(f"{name}={len(items)}" for name, items in report.items())
+        )
+        if not event.get("dry_run"):
+            report["repaired"] = repair(report, pages, posts, S3_BUCKET_NAME)
+        print(f"Reconcile report: {json.dumps(report, ensure_ascii=False)}")
+        return report
+    finally:
+        flush_invalidations()
+        emit_metrics("reconcile", {"Notion": request_stats.snapshot()})
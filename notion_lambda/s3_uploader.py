@@ -1,79 +1,509 @@
+import hashlib
+import io
+import json
+import mimetypes
 import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-import boto3
-from botocore.exceptions import ClientError
+import botocore
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+from botocore.session import get_session
+from cdn import invalidate
+from config import get_client
+from image_variants import OG_CARD_FILENAME, make_card, make_variants
+from metrics import incr, span
+from ratelimit import backoff_delay
+from utils import (
+    ASSET_PREFIX,
+    NOT_MODIFIED,
+    StoredImage,
+    download_image,
+    download_thumbnail,
+)
 
-s3_client = boto3.client("s3")
+# 동시 업로드 수 (이미지 다운로드 풀과 함께 하나의 커넥션 풀을 공유)
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "8"))
+
+# 내용 해시 이름의 asset은 내용이 바뀌지 않으므로 영구 캐시
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 같은 키로 다시 올라가는 포스트 객체 (버전 폴더 밖의 객체)
+POST_CACHE_CONTROL = os.getenv("POST_CACHE_CONTROL", "public, max-age=60")
+# 버전 폴더(v{n}/)의 객체는 한 번 쓰이면 바뀌지 않으므로 asset과 같이 영구 캐시
+VERSION_CACHE_CONTROL = ASSET_CACHE_CONTROL
+
+# 8MB 이상은 multipart 업로드
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+# delete_objects 한 번에 지울 수 있는 최대 키 수
+DELETE_BATCH_SIZE = 1000
+# 공유 JSON 객체(검색 색인 등)를 동시에 고칠 때 조건부 쓰기 재시도 횟수
+JSON_UPDATE_RETRIES = int(os.getenv("JSON_UPDATE_RETRIES", "5"))
+# 조건부 쓰기가 다른 쓰기와 겹쳐 실패했을 때의 오류 코드
+CONDITION_FAILED_CODES = {"PreconditionFailed", "ConditionalRequestConflict"}
+# PutObject의 IfMatch/IfNoneMatch를 지원하는 boto3 (botocore 1.35.68부터)
+# Lambda 런타임 기본 boto3는 이보다 오래될 수 있으므로 layer로 함께 배포
+CONDITIONAL_WRITE_REQUIREMENT = "boto3>=1.35.68"
+
+mimetypes.add_type("text/markdown", ".md")
+mimetypes.add_type("text/markdown", ".mdx")
+
+# 객체별 처리 결과 (error는 실패 시 메시지)
+S3Result = namedtuple("S3Result", "key ok error")
+# 업로드한 썸네일과 OG 카드 (hashes: {파일명: 내용 해시}, validators: 커버 조건부 GET용)
+StoredThumbnail = namedtuple("StoredThumbnail", "thumbnail card hashes validators")
+
+# 이 컨테이너에서 존재를 확인한 asset 키 (warm invocation에서 HEAD 생략)
+_known_assets = set()
+# 설치된 botocore가 조건부 PutObject를 지원하는지 (처음 확인할 때 캐시)
+_conditional_writes = None
+
+
+class ConditionalWriteUnsupported(Exception):
+    """설치된 boto3가 조건부 PutObject를 지원하지 않음 (덮어쓰기로 대신하지 않음)"""
+
+
+def supports_conditional_writes():
+    """설치된 botocore의 PutObject 모델에 IfMatch/IfNoneMatch가 있는지"""
+    global _conditional_writes
+    if _conditional_writes is None:
+        model = get_session().get_service_model("s3").operation_model("PutObject")
+        members = model.input_shape.members
+        _conditional_writes = "IfMatch" in members and "IfNoneMatch" in members
+    return _conditional_writes
+
+
+def guess_content_type(name):
+    """파일명으로 ContentType 추정 (텍스트는 utf-8)"""
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/json":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _body_size(body):
+    """업로드할 file 객체의 남은 크기 (읽기 위치는 그대로 둠)"""
+    position = body.tell()
+    size = body.seek(0, io.SEEK_END) - position
+    body.seek(position)
+    return size
+
+
+def put_object(s3_key, body, bucket_name, content_type=None, cache_control=None):
+    """bytes 또는 file 객체를 S3에 업로드 (큰 파일은 multipart)
+
+    ContentType은 키의 확장자로, Cache-Control은 지정하지 않으면 assets 여부로 결정
+    """
+    if isinstance(body, bytes):
+        body = io.BytesIO(body)
+    if not cache_control:
+        cache_control = (
+            ASSET_CACHE_CONTROL
+            if s3_key.startswith(f"{ASSET_PREFIX}/")
+            else POST_CACHE_CONTROL
+        )
+    incr("s3_put_bytes", _body_size(body))
+    with span("s3_put"):
+        get_client("s3").upload_fileobj(
+            body,
+            bucket_name,
+            s3_key,
+            ExtraArgs={
+                "ContentType": content_type or guess_content_type(s3_key),
+                "CacheControl": cache_control,
+            },
+            Config=TRANSFER_CONFIG,
+        )
+    # 객체마다 로그를 남기지 않고 호출 단위 메트릭(EMF)으로 집계
+    incr("s3_puts")
+
+
+def upload_objects(objects, bucket_name, max_workers=None, cache_control=None):
+    """여러 객체를 스레드 풀로 동시에 업로드
+
+    Args:
+        objects: {S3 키: bytes 또는 file 객체}
+
+    Returns:
+        객체별 S3Result 목록
+    """
+
+    def upload(item):
+        s3_key, body = item
+        try:
+            put_object(s3_key, body, bucket_name, cache_control=cache_control)
+            return S3Result(s3_key, True, None)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Error uploading {s3_key} to S3: {e}")
+            return S3Result(s3_key, False, str(e))
+
+    if not objects:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or S3_MAX_WORKERS) as executor:
+        return list(executor.map(upload, objects.items()))
+
+
+def copy_objects(copies, bucket_name, max_workers=None):
+    """같은 버킷 안에서 객체를 서버 측 복사 (ContentType 등 메타데이터 유지)
+
+    Args:
+        copies: {대상 키: 원본 키}
+
+    Returns:
+        대상 키별 S3Result 목록
+    """
+
+    def copy(item):
+        s3_key, source_key = item
+        try:
+            with span("s3_copy"):
+                get_client("s3").copy_object(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    CopySource={"Bucket": bucket_name, "Key": source_key},
+                )
+            incr("s3_copies")
+            return S3Result(s3_key, True, None)
+        except (BotoCoreError, ClientError) as e:
+            print(f"Error copying {source_key} to {s3_key}: {e}")
+            return S3Result(s3_key, False, str(e))
+
+    if not copies:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or S3_MAX_WORKERS) as executor:
+        return list(executor.map(copy, copies.items()))
+
+
+def update_json_object(s3_key, bucket_name, update, cache_control=None, cdn=True):
+    """JSON 객체를 읽어 update로 고친 뒤 조건부 쓰기로 저장
+
+    읽은 ETag와 같을 때만(없던 객체면 여전히 없을 때만) 쓰므로, 여러 Lambda가
+    같은 객체를 동시에 고쳐도 변경이 사라지지 않는다. 다른 쓰기와 겹치면 다시
+    읽어서 update를 다시 적용한다.
+
+    Args:
+        update: 현재 내용(dict, 객체가 없으면 None)을 받아 저장할 dict를 반환하는 함수
+            (None을 반환하면 저장하지 않음)
+        cdn: 저장 후 CloudFront 무효화 대상에 추가할지 (공개하지 않는 객체는 False)
+
+    Returns:
+        저장한 내용 (저장하지 않았으면 None)
+
+    Raises:
+        ConditionalWriteUnsupported: boto3가 조건부 쓰기를 지원하지 않음
+            (조건 없이 덮어쓰면 동시 변경이 사라지므로 쓰지 않음)
+    """
+    if not supports_conditional_writes():
+        raise ConditionalWriteUnsupported(
+            f"Conditional PutObject requires {CONDITIONAL_WRITE_REQUIREMENT} "
+            f"(found botocore {botocore.__version__})"
+        )
+    s3 = get_client("s3")
+    for attempt in range(JSON_UPDATE_RETRIES):
+        try:
+            response = s3.get_object(Bucket=bucket_name, Key=s3_key)
+            current = json.loads(response["Body"].read().decode("utf-8"))
+            condition = {"IfMatch": response["ETag"]}
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+                raise
+            current = None
+            condition = {"IfNoneMatch": "*"}
+
+        data = update(current)
+        if data is None:
+            return None
+        try:
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=s3_key,
+                Body=json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+                    "utf-8"
+                ),
+                ContentType=guess_content_type(s3_key),
+                CacheControl=cache_control or POST_CACHE_CONTROL,
+                **condition,
+            )
+            if cdn:
+                invalidate(s3_key)
+            return data
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in CONDITION_FAILED_CODES:
+                raise
+            print(f"Concurrent update of {s3_key}, retrying")
+            time.sleep(backoff_delay(attempt, base=0.1, max_delay=2.0))
+    raise RuntimeError(f"Too many concurrent updates of {s3_key}")
+
+
+def list_objects(prefix, bucket_name):
+    """prefix 아래의 모든 객체 정보 (1,000개 넘는 경우 continuation token으로 계속)"""
+    paginator = get_client("s3").get_paginator("list_objects_v2")
+    for response in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        yield from response.get("Contents", [])
+
+
+def list_keys(prefix, bucket_name):
+    """prefix 아래의 모든 객체 키"""
+    return [obj["Key"] for obj in list_objects(prefix, bucket_name)]
+
+
+def delete_keys(keys, bucket_name):
+    """키 목록을 1,000개씩 나눠 삭제
+
+    Returns:
+        객체별 S3Result 목록
+    """
+    results = []
+    keys = list(keys)
+    for i in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[i : i + DELETE_BATCH_SIZE]
+        try:
+            response = get_client("s3").delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+        except (BotoCoreError, ClientError) as e:
+            print(f"Error deleting {len(batch)} objects from S3: {e}")
+            results.extend(S3Result(key, False, str(e)) for key in batch)
+            continue
+
+        errors = {
+            error["Key"]: error.get("Message", error.get("Code"))
+            for error in response.get("Errors", [])
+        }
+        results.extend(
+            S3Result(key, key not in errors, errors.get(key)) for key in batch
+        )
+    return results
 
 
 def save_markdown_to_s3(content, category, page_id, bucket_name):
-    """Markdown 콘텐츠를 S3에 저장"""
+    """Markdown 콘텐츠를 S3에 저장 (/tmp를 거치지 않고 메모리에서 바로 업로드)"""
     s3_key = f"posts/{category}/{page_id}/page.mdx"
-    markdown_local_path = "/tmp/page.md"
+    try:
+        put_object(s3_key, content.encode("utf-8"), bucket_name)
+        return f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
+    except ClientError as e:
+        print(f"Error uploading to S3: {e}")
+        return None
 
-    # Markdown 파일을 /tmp에 저장
-    with open(markdown_local_path, "w", encoding="utf-8") as f:
-        f.write(content)
 
+def asset_exists(s3_key, bucket_name):
+    """asset이 이미 S3에 있는지 HEAD로 확인 (확인된 키는 캐시)"""
+    if s3_key in _known_assets:
+        return True
     try:
-        # S3에 업로드
-        s3_client.upload_file(markdown_local_path, bucket_name, s3_key)
-        s3_url = f"https://{bucket_name}.s3.amazonaws.com/{s3_key}"
-        print(f"Uploaded to S3: {s3_url}")
-        return s3_url
+        get_client("s3").head_object(Bucket=bucket_name, Key=s3_key)
     except ClientError as e:
-        print(f"Error uploading to S3: {e}")
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+    _known_assets.add(s3_key)
+    return True
+
+
+def upload_asset(image, bucket_name):
+    """내려받은 이미지(DownloadedImage)를 공용 assets 폴더에 업로드
+
+    같은 내용은 항상 같은 키를 가지므로 이미 있으면 업로드하지 않는다.
+    """
+    s3_key = f"{ASSET_PREFIX}/{image.filename}"
+    try:
+        if not asset_exists(s3_key, bucket_name):
+            put_object(s3_key, image.fileobj, bucket_name, image.content_type)
+            _known_assets.add(s3_key)
+        return S3Result(s3_key, True, None)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error uploading asset {s3_key} to S3: {e}")
+        return S3Result(s3_key, False, str(e))
+
+
+def upload_variants(image, info, bucket_name):
+    """make_variants로 만든 WebP 사본을 assets 폴더에 올리고 StoredImage 반환
+
+    사본이 없거나 업로드에 실패하면 원본 파일명만 담아 반환한다.
+    """
+    stored = StoredImage(image.filename)
+    if not info:
+        return stored
+    variants = []
+    try:
+        for filename, width, data in info["variants"]:
+            if data is not None:
+                s3_key = f"{ASSET_PREFIX}/{filename}"
+                put_object(s3_key, data, bucket_name, "image/webp")
+                _known_assets.add(s3_key)
+            variants.append((filename, width))
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error uploading image variants of {image.filename} to S3: {e}")
+        return stored
+    return stored._replace(
+        width=info["width"],
+        height=info["height"],
+        variants=tuple(variants),
+        placeholder=info["placeholder"],
+    )
+
+
+def store_image(image_url, bucket_name):
+    """이미지를 받아 바로 공용 assets 폴더에 업로드 (WebP 사본도 함께)
+
+    Returns:
+        StoredImage (실패 시 None)
+    """
+    image = download_image(image_url)
+    if not image:
         return None
+    try:
+        # 업로드가 끝나면 파일 객체가 닫히므로 사본을 먼저 만든다
+        info = make_variants(
+            image, lambda name: asset_exists(f"{ASSET_PREFIX}/{name}", bucket_name)
+        )
+        if not upload_asset(image, bucket_name).ok:
+            return None
+        return upload_variants(image, info, bucket_name)
+    finally:
+        image.close()
 
 
-def upload_assets_to_s3(page_id, category, bucket_name):
-    """필요한 assets을 S3에 업로드"""
-    s3_key = f"posts/{category}/{page_id}"
-    assets_local_path = f"/tmp/assets/{page_id}"
+def store_thumbnail(
+    page, page_id, category, bucket_name, version=None, validators=None
+):
+    """커버를 받아 포스트 폴더(version이 있으면 해당 버전 폴더)에 업로드
 
+    thumbnail{ext}(응답의 Content-Type 기준 확장자)와 1200x630 OG 카드(og.jpg,
+    Pillow가 있을 때만)를 함께 올린다.
+
+    Args:
+        validators: 이전에 받은 커버의 {"etag", "last_modified"}
+            주어지면 조건부 GET으로 요청하고 커버가 그대로면 아무것도 올리지 않는다
+
+    Returns:
+        StoredThumbnail (커버가 그대로면 NOT_MODIFIED, 커버가 없거나 실패 시 None)
+    """
+    image = download_thumbnail(page, validators)
+    if image is NOT_MODIFIED or not image:
+        return image
     try:
-        # assets 파일들 하나씩 S3에 업로드
-        for root, _, files in os.walk(assets_local_path):
-            for file in files:
-                local_file = os.path.join(root, file)
-                s3_file = os.path.relpath(local_file, assets_local_path)
-                s3_client.upload_file(local_file, bucket_name, f"{s3_key}/{s3_file}")
-                print(f"Uploaded to S3: {s3_key}/{s3_file}")
-    except ClientError as e:
-        print(f"Error uploading assets to S3: {e}")
+        # 업로드가 끝나면 파일 객체가 닫히므로 카드를 먼저 만든다
+        card = make_card(image)
+        if version:
+            prefix = f"posts/{category}/{page_id}/{version}"
+            cache_control = VERSION_CACHE_CONTROL
+        else:
+            prefix = f"posts/{category}/{page_id}"
+            cache_control = None
+        put_object(
+            f"{prefix}/{image.filename}",
+            image.fileobj,
+            bucket_name,
+            image.content_type,
+            cache_control,
+        )
+        hashes = {image.filename: image.digest}
+        if card:
+            put_object(
+                f"{prefix}/{OG_CARD_FILENAME}",
+                card,
+                bucket_name,
+                "image/jpeg",
+                cache_control,
+            )
+            hashes[OG_CARD_FILENAME] = content_hash(card)
+        return StoredThumbnail(
+            image.filename,
+            OG_CARD_FILENAME if card else None,
+            hashes,
+            image.validators,
+        )
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error uploading thumbnail to S3: {e}")
+        return None
+    finally:
+        image.close()
 
 
 def delete_post_from_s3(custom_id, category, bucket_name):
-    """S3에서 특정 포스트의 모든 파일을 삭제"""
+    """S3에서 특정 포스트의 모든 파일을 삭제
+
+    manifest를 먼저 지워 읽는 쪽에는 포스트가 한 번에 사라진 것으로 보이게 한다.
+
+    Returns:
+        객체별 S3Result 목록 (목록 조회 자체가 실패하면 prefix에 대한 실패 결과)
+    """
+    # 삭제할 포스트의 키
+    target_key = f"posts/{category}/{custom_id}/"
     try:
-        # 삭제할 포스트의 키
-        target_key = f"posts/{category}/{custom_id}/"
-        try:
-            # assets 폴더의 모든 객체 리스트
-            response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=target_key)
-
-            if "Contents" in response:
-                # 모든 객체 삭제
-                objects_to_delete = [
-                    {"Key": obj["Key"]} for obj in response["Contents"]
-                ]
-                if objects_to_delete:
-                    s3_client.delete_objects(
-                        Bucket=bucket_name, Delete={"Objects": objects_to_delete}
-                    )
-                    print(
-                        f"Deleted {len(objects_to_delete)} asset files from {target_key}"
-                    )
-                else:
-                    print(f"No asset files found in {target_key}")
-            else:
-                print(f"No assets folder found: {target_key}")
-
-        except Exception as e:
-            print(f"Error deleting assets from {target_key}: {e}")
+        keys = list_keys(target_key, bucket_name)
+    except (BotoCoreError, ClientError) as e:
+        print(f"Error listing {target_key}: {e}")
+        return [S3Result(target_key, False, str(e))]
 
-        return True
+    if not keys:
+        print(f"No files found in {target_key}")
+        return []
+
+    manifest_key = f"{target_key}manifest.json"
+    results = []
+    if manifest_key in keys:
+        results = delete_keys([manifest_key], bucket_name)
+        if not results[0].ok:
+            # 포인터가 남아 있으면 버전 폴더도 지우지 않음
+            return results
+        keys.remove(manifest_key)
+
+    results += delete_keys(keys, bucket_name)
+    deleted = sum(1 for result in results if result.ok)
+    print(f"Deleted {deleted}/{len(results)} files from {target_key}")
+    return results
+
+
+def content_hash(value):
+    """bytes의 sha256 해시"""
+    return hashlib.sha256(value).hexdigest()
+
+
+def upload_version(objects, page_id, category, bucket_name, version, previous=None):
+    """포스트 객체를 새 버전 폴더(posts/{category}/{id}/{version}/)에 기록
+
+    이전 버전과 내용 해시가 같은 객체는 다시 올리지 않고 S3 안에서 복사한다.
+
+    Args:
+        objects: {파일명: bytes 또는 None}, None이면 이전 버전의 객체를 그대로 복사
+        previous: 이전 버전 정보 {"version": "v{n}", "objects": {파일명: 해시}}
+
+    Returns:
+        ({파일명: 해시}, 객체별 S3Result 목록)
+    """
+    previous = previous or {}
+    previous_version = previous.get("version")
+    previous_hashes = previous.get("objects", {})
+    target_key = f"posts/{category}/{page_id}/{version}/"
+
+    hashes = {}
+    uploads = {}
+    copies = {}
+    for name, value in objects.items():
+        hashes[name] = (
+            previous_hashes.get(name) if value is None else content_hash(value)
+        )
+        if previous_version and (
+            value is None or previous_hashes.get(name) == hashes[name]
+        ):
+            copies[f"{target_key}{name}"] = (
+                f"posts/{category}/{page_id}/{previous_version}/{name}"
+            )
+        elif value is not None:
+            uploads[f"{target_key}{name}"] = value
+        else:
+            hashes.pop(name)
 
-    except Exception as e:
-        print(f"Error in delete_post_from_s3: {e}")
-        return False
+    results = upload_objects(uploads, bucket_name, cache_control=VERSION_CACHE_CONTROL)
+    results += copy_objects(copies, bucket_name)
+    return hashes, results
@@ -0,0 +1,211 @@
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from config import get_client
+from converter import extract_plain_text
+from s3_uploader import (
+    S3_MAX_WORKERS,
+    ConditionalWriteUnsupported,
+    put_object,
+    update_json_object,
+)
+
+# 검색 색인 저장 위치 (포스트 버킷)
+# - docs.json: {"shards": 샤드 수, "docs": {custom_id: 표시용 정보}}
+# - shards/{nn}.json: {토큰: {custom_id: 가중치}}
+# - posts/{custom_id}.json: 포스트 하나의 {토큰: 가중치} (증분 갱신 시 이전 토큰 확인용)
+SEARCH_PREFIX = "search"
+# 토큰을 나눠 담는 샤드 수 (바꾸면 색인을 다시 만들어야 함)
+SEARCH_SHARDS = int(os.getenv("SEARCH_SHARDS", "16"))
+# 제목/태그에 나온 토큰의 가중치 (본문은 출현 횟수)
+TITLE_BOOST = 10
+TAG_BOOST = 5
+# 본문 출현 횟수 상한 (반복되는 단어가 점수를 독차지하지 않도록)
+BODY_MAX_COUNT = 20
+# 이보다 긴 영문/숫자 토큰은 색인하지 않음 (URL, 해시 등)
+TOKEN_MAX_LENGTH = 30
+
+# 검색 색인 파일은 게시할 때마다 바뀌므로 짧게 캐시
+SEARCH_CACHE_CONTROL = os.getenv("SEARCH_CACHE_CONTROL", "public, max-age=60")
+
+WORD = re.compile(r"\w+")
+# 한글 음절 연속 구간과 그 외 문자 구간
+SCRIPT_RUN = re.compile(r"[가-힣]+|[^가-힣]+")
+
+
+def tokenize(text):
+    """검색 토큰 목록 (같은 토큰이 여러 번 나올 수 있음)
+
+    한글은 조사가 붙어 있어도 찾을 수 있도록 음절 bigram으로 나누고
+    (한 글자 단어는 그대로), 영문/숫자는 소문자 단어 단위로 자른다.
+    예: "검색을 Search" -> ["검색", "색을", "search"]
+    """
+    tokens = []
+    for word in WORD.findall(text.lower()):
+        for run in SCRIPT_RUN.findall(word):
+            if "가" <= run[0] <= "힣":
+                if len(run) == 1:
+                    tokens.append(run)
+                else:
+                    tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+            else:
+                run = run.strip("_")
+                if run and len(run) <= TOKEN_MAX_LENGTH:
+                    tokens.append(run)
+    return tokens
+
+
+def shard_of(token, shards=SEARCH_SHARDS):
+    """토큰이 들어가는 샤드 번호
+
+    브라우저에서도 같은 값을 계산할 수 있도록 UTF-16 코드 단위의 FNV-1a (32비트)를 사용
+    """
+    value = 0x811C9DC5
+    encoded = token.encode("utf-16-le")
+    for i in range(0, len(encoded), 2):
+        value ^= encoded[i] | (encoded[i + 1] << 8)
+        value = (value * 0x01000193) & 0xFFFFFFFF
+    return value % shards
+
+
+def shard_key(shard):
+    return f"{SEARCH_PREFIX}/shards/{shard:02d}.json"
+
+
+def post_key(custom_id):
+    return f"{SEARCH_PREFIX}/posts/{custom_id}.json"
+
+
+def docs_key():
+    return f"{SEARCH_PREFIX}/docs.json"
+
+
+def page_text(blocks):
+    """블록 트리의 텍스트만 이어 붙이기 (fetch_block_tree로 가져온 트리 기준)"""
+    parts = []
+    stack = list(reversed(blocks))
+    while stack:
+        block = stack.pop()
+        data = block.get(block.get("type"), {})
+        if isinstance(data, dict):
+            parts.append(extract_plain_text(data.get("rich_text")))
+            parts.append(extract_plain_text(data.get("caption")))
+            for cell in data.get("cells", []):
+                parts.append(extract_plain_text(cell))
+        stack.extend(reversed(block.get("children", [])))
+    return "\n".join(part for part in parts if part)
+
+
+def build_postings(title, tags, text):
+    """포스트 하나의 {토큰: 가중치}"""
+    counts = Counter(tokenize(text))
+    postings = {token: min(count, BODY_MAX_COUNT) for token, count in counts.items()}
+    for token in set(tokenize(title)):
+        postings[token] = postings.get(token, 0) + TITLE_BOOST
+    for token in set(tokenize(" ".join(tags))):
+        postings[token] = postings.get(token, 0) + TAG_BOOST
+    return postings
+
+
+def _load_postings(custom_id, bucket_name):
+    try:
+        response = get_client("s3").get_object(
+            Bucket=bucket_name, Key=post_key(custom_id)
+        )
+        return json.loads(response["Body"].read().decode("utf-8"))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "NoSuchKey":
+            raise
+        return {}
+
+
+def _apply(custom_id, previous, postings, bucket_name):
+    """바뀐 토큰이 들어 있는 샤드만 조건부 쓰기로 갱신"""
+    changed = {}
+    for token in set(previous) | set(postings):
+        if previous.get(token) != postings.get(token):
+            changed.setdefault(shard_of(token), []).append(token)
+
+    def update_shard(item):
+        shard, tokens = item
+
+        def update(data):
+            data = data or {}
+            for token in tokens:
+                entry = data.setdefault(token, {})
+                if token in postings:
+                    entry[custom_id] = postings[token]
+                else:
+                    entry.pop(custom_id, None)
+                if not entry:
+                    del data[token]
+            return data
+
+        update_json_object(shard_key(shard), bucket_name, update, SEARCH_CACHE_CONTROL)
+
+    with ThreadPoolExecutor(max_workers=S3_MAX_WORKERS) as executor:
+        list(executor.map(update_shard, changed.items()))
+    return len(changed)
+
+
+def _update_docs(custom_id, doc, bucket_name):
+    def update(data):
+        data = data or {"shards": SEARCH_SHARDS, "docs": {}}
+        if doc:
+            if data["docs"].get(custom_id) == doc:
+                return None
+            data["docs"][custom_id] = doc
+        elif data["docs"].pop(custom_id, None) is None:
+            return None
+        return data
+
+    update_json_object(docs_key(), bucket_name, update, SEARCH_CACHE_CONTROL)
+
+
+def update_search_index(custom_id, doc, text, bucket_name):
+    """게시한 포스트의 검색 색인 갱신
+
+    이전에 색인한 토큰과 비교해 바뀐 샤드만 다시 쓰고, 포스트별 토큰 파일은
+    샤드를 모두 고친 뒤에 저장한다. (중간에 실패해도 다음 게시에서 다시 맞춰짐)
+
+    Args:
+        doc: 검색 결과에 보여 줄 정보 {"title", "category", "date", "tags", ...}
+        text: 본문 텍스트 (page_text)
+    """
+    custom_id = str(custom_id)
+    try:
+        postings = build_postings(doc.get("title", ""), doc.get("tags", []), text)
+        previous = _load_postings(custom_id, bucket_name)
+        shards = _apply(custom_id, previous, postings, bucket_name)
+        _update_docs(custom_id, doc, bucket_name)
+        put_object(
+            post_key(custom_id),
+            json.dumps(postings, ensure_ascii=False, separators=(",", ":")).encode(
+                "utf-8"
+            ),
+            bucket_name,
+            cache_control="no-cache",
+        )
+        print(f"Updated search index for {custom_id}: {shards} shards")
+    except ConditionalWriteUnsupported:
+        raise
+    except Exception as e:
+        print(f"Error updating search index for {custom_id}: {e}")
+
+
+def remove_from_search_index(custom_id, bucket_name):
+    """삭제한 포스트를 검색 색인에서 제거"""
+    custom_id = str(custom_id)
+    try:
+        previous = _load_postings(custom_id, bucket_name)
+        _apply(custom_id, previous, {}, bucket_name)
+        _update_docs(custom_id, None, bucket_name)
+        get_client("s3").delete_object(Bucket=bucket_name, Key=post_key(custom_id))
+    except ConditionalWriteUnsupported:
+        raise
+    except Exception as e:
+        print(f"Error removing {custom_id} from search index: {e}")
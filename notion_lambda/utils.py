@@ -1,59 +1,156 @@
+import hashlib
 import json
 import mimetypes
 import os
 import re
+import tempfile
 import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import boto3
 import urllib3
+from metrics import incr, timed
 
-http = urllib3.PoolManager()
+# 내용 해시로 이름 붙인 asset을 여러 포스트가 공유하는 S3 폴더
+ASSET_PREFIX = "assets"
+# asset 파일명에 사용하는 내용 해시 길이 (hex)
+ASSET_HASH_LENGTH = 16
 
+# 이 크기를 넘는 이미지만 메모리 대신 임시 파일에 버퍼링
+IMAGE_SPOOL_MAX_BYTES = 8 * 1024 * 1024
 
-def get_secret(secret_name):
-    """AWS Secrets Manager에서 비밀을 가져오기"""
-    client = boto3.client("secretsmanager")
-    try:
-        response = client.get_secret_value(SecretId=secret_name)
-        secret = response.get("SecretString", None)
-        if secret:
-            return json.loads(secret)
-    except Exception as e:
-        print(f"Error fetching secret {secret_name}: {e}")
-        return None
+# 이미지/썸네일 동시 다운로드 수
+IMAGE_DOWNLOAD_WORKERS = int(os.getenv("IMAGE_DOWNLOAD_WORKERS", "8"))
+
+# 멈춘 다운로드 하나가 DownloadPipeline.wait()와 게시 전체를 붙잡지 않도록 제한 시간(초)
+IMAGE_TIMEOUT = urllib3.Timeout(
+    connect=float(os.getenv("IMAGE_CONNECT_TIMEOUT", "5")),
+    read=float(os.getenv("IMAGE_READ_TIMEOUT", "30")),
+)
+
+http = urllib3.PoolManager(maxsize=IMAGE_DOWNLOAD_WORKERS, timeout=IMAGE_TIMEOUT)
 
 
 def sanitize_filename(filename):
-    """파일 이름에서 특수 문자를 제거 후 랜덤 문자열 추가"""
-    sanitized = re.sub(r"[^\w\-_\.]", "_", filename)
-    file_name, extension = os.path.splitext(sanitized)
-    return f"{file_name}_{uuid.uuid4().hex[:8]}{extension}"
+    """파일 이름에서 특수 문자를 제거"""
+    return re.sub(r"[^\w\-_\.]", "_", filename)
 
 
-def download_image(image_url, page_dir):
-    """임시 Notion Image URL을 통해 다운로드"""
-    original_name = image_url.split("/")[-1].split("?")[0]
-    sanitized_name = sanitize_filename(original_name)
+def asset_filename(digest, extension):
+    """내용 해시 기반 asset 파일명 (같은 내용이면 항상 같은 이름)"""
+    return f"{digest[:ASSET_HASH_LENGTH]}{extension.lower()}"
+
+
+# 조건부 요청에서 이미지가 바뀌지 않았을 때 (304) 다운로드 함수가 반환하는 값
+NOT_MODIFIED = "not-modified"
+
+mimetypes.add_type("image/webp", ".webp")
+
+
+class DownloadedImage(
+    namedtuple(
+        "DownloadedImage",
+        "fileobj filename content_type digest validators",
+        defaults=(None,),
+    )
+):
+    """메모리(큰 파일은 임시 파일)에 받은 이미지와 내용 해시
+
+    validators: 다음 조건부 요청에 쓸 {"etag", "last_modified"} (응답에 없으면 None)
+    """
+
+    def close(self):
+        self.fileobj.close()
+
+
+class StoredImage(
+    namedtuple(
+        "StoredImage",
+        "filename width height variants placeholder",
+        defaults=(None, None, (), None),
+    )
+):
+    """assets 폴더에 올린 이미지
 
-    # 임시 /tmp/assets/{page_dir} 경로 생성
-    # 현재 assets 파일은 이미지뿐이므로 해당 함수에서 생성
-    tmp_dir = f"/tmp/assets/{page_dir}"
-    os.makedirs(tmp_dir, exist_ok=True)
+    variants: WebP 사본 ((파일명, 너비), ...) (작은 것부터),
+    width/height: 가장 큰 사본의 크기, placeholder: 흐린 미리보기 data URI
+    (Pillow가 없으면 filename만)
+    """
 
-    # 이미지 저장 경로
-    local_path = os.path.join(tmp_dir, sanitized_name)
 
+def conditional_headers(validators):
+    """이전 응답의 ETag/Last-Modified로 조건부 GET 헤더 생성"""
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+@timed("download")
+def download_image(image_url, validators=None):
+    """임시 Notion Image URL을 통해 다운로드
+
+    /tmp에 저장하지 않고 SpooledTemporaryFile에 받으면서 내용 해시를 계산한다.
+    파일명은 내용 해시로 정해지므로 같은 이미지는 재게시해도 같은 이름을 가진다.
+    확장자는 응답의 Content-Type을 우선하고, 알 수 없으면 URL의 확장자를 사용한다.
+
+    Args:
+        validators: 이전 다운로드의 {"etag", "last_modified"}
+            주어지면 조건부 GET으로 요청하고 바뀌지 않았으면 NOT_MODIFIED 반환
+    """
+    original_name = image_url.split("/")[-1].split("?")[0]
+    _, extension = os.path.splitext(sanitize_filename(original_name))
+
+    response = None
+    buffer = None
     try:
         # 이미지 다운로드
-        response = http.request("GET", image_url, preload_content=False)
+        response = http.request(
+            "GET",
+            image_url,
+            headers=conditional_headers(validators),
+            preload_content=False,
+            timeout=IMAGE_TIMEOUT,
+        )
 
+        if response.status == 304 and validators:
+            return NOT_MODIFIED
         if response.status >= 200 and response.status < 300:
-            # 파일 저장
-            with open(local_path, "wb") as file:
-                for chunk in response.stream(1024):  # 1KB씩 스트리밍
-                    file.write(chunk)
-            print(f"Image saved locally: {local_path}")
+            # 내용 해시를 계산하면서 버퍼에 저장 (IMAGE_SPOOL_MAX_BYTES 초과 시 디스크)
+            digest = hashlib.sha256()
+            buffer = tempfile.SpooledTemporaryFile(max_size=IMAGE_SPOOL_MAX_BYTES)
+            for chunk in response.stream(64 * 1024):
+                digest.update(chunk)
+                buffer.write(chunk)
+            incr("image_bytes", buffer.tell())
+            buffer.seek(0)
+
+            content_type = response.headers.get("Content-Type", "").split(";")[0]
+            if content_type.startswith("image/"):
+                extension = mimetypes.guess_extension(content_type) or extension
+            digest = digest.hexdigest()
+            filename = asset_filename(digest, extension)
+            content_type = (
+                mimetypes.guess_type(filename)[0]
+                or content_type
+                or "application/octet-stream"
+            )
+            validators = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+            image = DownloadedImage(
+                buffer,
+                filename,
+                content_type,
+                digest,
+                validators if any(validators.values()) else None,
+            )
+            buffer = None
+            return image
         else:
             print(
                 f"Failed to download image: {image_url}, HTTP status: {response.status}"
@@ -63,9 +160,61 @@ def download_image(image_url, page_dir):
         print(f"Error downloading image {image_url}: {e}")
         return None
     finally:
-        response.release_conn()  # 연결 해제
+        if response is not None:
+            response.release_conn()  # 연결 해제
+        if buffer is not None:
+            buffer.close()
+
 
-    return local_path
+class DownloadPipeline:
+    """이미지 다운로드(및 업로드)를 스레드 풀에서 병렬로 처리
+
+    변환 중에는 add_image로 다운로드를 예약하고 placeholder를 Markdown에 넣는다.
+    변환이 끝나면 wait로 결과를 받아 placeholder를 실제 링크로 바꾼다.
+
+    Args:
+        store: image_url을 받아 StoredImage(실패 시 None)를 반환하는 함수
+    """
+
+    def __init__(self, store, max_workers=None):
+        self.store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or IMAGE_DOWNLOAD_WORKERS
+        )
+        self._token = uuid.uuid4().hex[:8]
+        self._images = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._executor.shutdown(wait=True)
+
+    def submit(self, fn, *args):
+        """다운로드 풀에서 임의의 작업 실행 (예: 썸네일)"""
+        return self._executor.submit(fn, *args)
+
+    def add_image(self, image_url):
+        """이미지 다운로드를 예약하고 Markdown에 넣을 placeholder 반환"""
+        placeholder = f"notion-image://{self._token}/{len(self._images)}"
+        future = self._executor.submit(self.store, image_url)
+        self._images[placeholder] = (image_url, future)
+        return placeholder
+
+    def wait(self):
+        """모든 이미지 처리 완료 후 {placeholder: (image_url, StoredImage)} 반환
+
+        다운로드/업로드에 실패한 이미지는 None
+        """
+        results = {}
+        for placeholder, (image_url, future) in self._images.items():
+            try:
+                stored = future.result()
+            except Exception as e:
+                print(f"Error downloading image {image_url}: {e}")
+                stored = None
+            results[placeholder] = (image_url, stored)
+        return results
 
 
 def format_date(iso_date):
@@ -78,74 +227,99 @@ def format_date(iso_date):
         return iso_date  # 변환 실패 시 원본 반환
 
 
-def download_thumbnail(page, page_dir):
-    """페이지 커버를 썸네일로 다운로드"""
-    try:
-        cover = page.get("cover")
-        if not cover:
-            print("No cover found.")
-            return None
+def get_cover_url(page):
+    """페이지 커버 이미지 URL (없으면 None)"""
+    cover = page.get("cover")
+    if not cover:
+        return None
 
-        cover_type = cover.get("type")
-        image_url = ""
+    cover_type = cover.get("type")
+    if cover_type == "external":
+        return cover.get("external", {}).get("url", "") or None
+    elif cover_type == "file":
+        return cover.get("file", {}).get("url", "") or None
+    return None
 
-        if cover_type == "external":
-            image_url = cover.get("external", {}).get("url", "")
-        elif cover_type == "file":
-            image_url = cover.get("file", {}).get("url", "")
 
+def download_thumbnail(page, validators=None):
+    """페이지 커버를 썸네일로 다운로드
+
+    Args:
+        validators: 이전에 받은 커버의 {"etag", "last_modified"} (조건부 GET)
+
+    Returns:
+        filename이 thumbnail{ext}인 DownloadedImage
+        (바뀌지 않았으면 NOT_MODIFIED, 커버가 없거나 실패 시 None)
+    """
+    try:
+        image_url = get_cover_url(page)
         if not image_url:
-            print("Cover URL not found.")
+            print("No cover found.")
             return None
 
-        local_path = download_image(image_url, page_dir)
-        if not local_path:
+        image = download_image(image_url, validators)
+        if image is NOT_MODIFIED:
+            return image
+        if not image:
             print("Image download failed.")
             return None
 
-        _, ext = os.path.splitext(local_path)
-
-        # 확장자 확인 후 thumbnail 파일명 지정
-        thumbnail_path = os.path.join(os.path.dirname(local_path), f"thumbnail{ext}")
-        os.rename(local_path, thumbnail_path)
-        print(f"Thumbnail saved: {thumbnail_path}")
-        return thumbnail_path
+        # 응답의 Content-Type으로 정한 확장자로 thumbnail 파일명 지정
+        _, ext = os.path.splitext(image.filename)
+        return image._replace(filename=f"thumbnail{ext}")
 
     except Exception as e:
         print(f"Error fetching thumbnail image: {e}")
         return None
 
 
+def page_metadata(page, page_title):
+    """Notion 페이지 속성에서 포스트 정보 추출
+
+    Returns:
+        {"title", "date", "description", "tags", "author"}
+    """
+    properties = page.get("properties", {})
+
+    # description (rich_text)
+    desc_rich = properties.get("description", {}).get("rich_text", [])
+    description = desc_rich[0].get("plain_text", "") if desc_rich else ""
+
+    # tags (multi_select)
+    tags_raw = properties.get("tags", {}).get("multi_select", [])
+    tags = [t.get("name", "") for t in tags_raw if "name" in t]
+
+    # author (people)
+    author_raw = properties.get("author", {}).get("people", [])
+    author = author_raw[0].get("name", "Anonymous") if author_raw else "Anonymous"
+
+    return {
+        "title": page_title,
+        "date": format_date(page.get("created_time", "")),
+        "description": description,
+        "tags": tags,
+        "author": author,
+    }
+
+
+def yaml_value(value):
+    """frontmatter 값 직렬화
+
+    JSON 문자열/배열은 YAML flow scalar/sequence로도 유효하므로 json.dumps를 사용한다.
+    (제목의 콜론, 따옴표, 줄바꿈과 태그 목록이 그대로 보존됨)
+    """
+    return json.dumps(value, ensure_ascii=False)
+
+
 def generate_metadata(page, page_title):
     """Notion 페이지 데이터를 기반으로 MDX 메타데이터 생성"""
     try:
-        created_time = page.get("created_time", "")
-        date = format_date(created_time)
-
-        # description (rich_text)
-        desc_rich = (
-            page.get("properties", {}).get("description", {}).get("rich_text", [])
-        )
-        description = desc_rich[0].get("plain_text", "") if desc_rich else ""
-
-        # tags (multi_select)
-        tags_raw = page.get("properties", {}).get("tags", {}).get("multi_select", [])
-        tags = [t.get("name", "") for t in tags_raw if "name" in t]
-
-        # author (people)
-        author_raw = page.get("properties", {}).get("author", {}).get("people", [])
-        author = author_raw[0].get("name", "Anonymous") if author_raw else "Anonymous"
-
-        # MDX 메타데이터 구성
-        metadata = f"""---
-title: {page_title}
-date: {date}
-description: {description}
-tags: {tags}
-author: {author}
----
-"""
-        return metadata
+        meta = page_metadata(page, page_title)
+        lines = [
+            f"{name}: {yaml_value(meta[name])}"
+            for name in ("title", "date", "description", "tags", "author")
+        ]
+        return "---\n" + "\n".join(lines) + "\n---\n"
     except Exception as e:
         print(f"Error generating metadata for page {page.get('id', 'UNKNOWN')}: {e}")
         return ""
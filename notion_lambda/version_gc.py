@@ -0,0 +1,86 @@
+import json
+import os
+import re
+
+from botocore.exceptions import BotoCoreError, ClientError
+from config import get_client
+from manifest import MANIFEST_FILENAME, load_manifest
+from s3_uploader import delete_keys, list_keys
+
+# 현재 버전을 포함해 남겨둘 버전 수 (직전 버전을 읽는 중인 요청 보호)
+GC_KEEP_VERSIONS = int(os.getenv("GC_KEEP_VERSIONS", "2"))
+# 비동기로 호출할 GC Lambda 이름 (없으면 게시 Lambda 안에서 바로 정리)
+GC_FUNCTION_NAME = os.getenv("GC_FUNCTION_NAME")
+S3_BUCKET_NAME = os.getenv("POST_BUCKET")
+
+# v{n}/ 또는 v{n}-{접미사}/ 버전 폴더
+VERSION_PATTERN = re.compile(r"^v(\d+)(?:-[0-9a-f]+)?/")
+
+
+def find_garbage(keys, prefix, revision):
+    """포스트 폴더의 키 중 지워도 되는 키 목록
+
+    manifest와 최근 GC_KEEP_VERSIONS개 버전, 아직 게시 중인 더 높은 버전은 남기고
+    오래된 버전 폴더와 버전 이전에 포스트 폴더 바로 아래 올라간 파일을 정리한다.
+    """
+    garbage = []
+    for key in keys:
+        name = key[len(prefix) :]
+        if name == MANIFEST_FILENAME:
+            continue
+        match = VERSION_PATTERN.match(name)
+        if match and int(match.group(1)) > revision - GC_KEEP_VERSIONS:
+            continue
+        garbage.append(key)
+    return garbage
+
+
+def collect_garbage(category, page_id, bucket_name):
+    """현재 manifest 기준으로 포스트의 오래된 버전 삭제
+
+    Returns:
+        객체별 S3Result 목록
+    """
+    manifest = load_manifest(category, page_id, bucket_name)
+    revision = manifest.get("revision") if manifest else None
+    if not revision:
+        # 포인터가 없으면 무엇이 게시 중인지 알 수 없으므로 건드리지 않음
+        print(f"No versioned manifest for posts/{category}/{page_id}, skipping GC")
+        return []
+
+    prefix = f"posts/{category}/{page_id}/"
+    garbage = find_garbage(list_keys(prefix, bucket_name), prefix, revision)
+    results = delete_keys(garbage, bucket_name)
+    if results:
+        deleted = sum(1 for result in results if result.ok)
+        print(f"Deleted {deleted}/{len(results)} old files from {prefix}")
+    return results
+
+
+def schedule_gc(category, page_id, bucket_name):
+    """오래된 버전 정리를 GC Lambda에 비동기로 요청 (게시 응답을 기다리게 하지 않음)"""
+    payload = {"category": category, "page_id": page_id, "bucket": bucket_name}
+    if not GC_FUNCTION_NAME:
+        return collect_garbage(category, page_id, bucket_name)
+    try:
+        get_client("lambda").invoke(
+            FunctionName=GC_FUNCTION_NAME,
+            InvocationType="Event",
+            Payload=json.dumps(payload).encode("utf-8"),
+        )
+    except (BotoCoreError, ClientError) as e:
+        # 다음 게시 때 다시 정리되므로 실패해도 게시는 성공으로 처리
+        print(f"Error scheduling GC for posts/{category}/{page_id}: {e}")
+    return []
+
+
+def lambda_handler(event, context):
+    results = collect_garbage(
+        event["category"],
+        event["page_id"],
+        event.get("bucket") or S3_BUCKET_NAME,
+    )
+    failed = [result.key for result in results if not result.ok]
+    if failed:
+        print(f"Failed to delete: {json.dumps(failed)}")
+    return {"deleted": len(results) - len(failed), "failed": failed}
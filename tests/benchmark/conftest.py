@@ -0,0 +1,85 @@
+import statistics
+import time
+
+import client
+import config
+import main
+import page_index
+import pytest
+import s3_uploader
+from ratelimit import TokenBucket
+
+from tests.benchmark.fixtures import BUILDERS, load_recorded
+from tests.benchmark.stub_server import StubServer, StubState
+
+BUCKET = "benchmark-bucket"
+
+# 측정 결과 (세션 끝에 표로 출력)
+_results = []
+
+
+def measure(fn, rounds=5):
+    """fn을 rounds번 실행해 (최소, 중앙값) 소요 시간(초)과 마지막 결과 반환"""
+    timings = []
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings), result
+
+
+@pytest.fixture
+def record():
+    """측정값 기록: record(이름, 값, 단위)"""
+
+    def add(name, value, unit):
+        _results.append((name, value, unit))
+
+    return add
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _results:
+        return
+    terminalreporter.section("converter benchmark")
+    width = max(len(name) for name, _, _ in _results)
+    for name, value, unit in _results:
+        terminalreporter.write_line(f"{name:<{width}}  {value:>12.3f} {unit}")
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Notion과 S3를 대신하는 로컬 stub 서버에 모든 모듈을 연결"""
+    state = StubState(secret={"notion-api-key": "stub-key", "auth-token": "stub-token"})
+    with StubServer(state) as server:
+        monkeypatch.setenv("AWS_ENDPOINT_URL", server.url)
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        # stub은 aws-chunked 업로드를 해석하지 않으므로 필요할 때만 checksum 계산
+        monkeypatch.setenv("AWS_REQUEST_CHECKSUM_CALCULATION", "when_required")
+        monkeypatch.setenv("AWS_RESPONSE_CHECKSUM_VALIDATION", "when_required")
+        config.clear_cache()
+
+        monkeypatch.setattr(client, "NOTION_API_URL", f"{server.url}/v1")
+        # rate limit 대기는 측정에서 제외 (변환 자체의 비용만 측정)
+        monkeypatch.setattr(client, "rate_limiter", TokenBucket(100000))
+        monkeypatch.setattr(page_index, "PAGE_INDEX_STORE", "off")
+        monkeypatch.setattr(s3_uploader, "_known_assets", set())
+        monkeypatch.setattr(main, "DATABASE_ID", "benchmark-db")
+        monkeypatch.setattr(main, "S3_BUCKET_NAME", BUCKET)
+        monkeypatch.setattr(main, "PUBLISH_QUEUE_URL", None)
+
+        server.recorded = load_recorded("small_page", server.url)
+        yield server
+    config.clear_cache()
+
+
+@pytest.fixture(params=sorted(BUILDERS))
+def fixture_page(request, stub):
+    """small/large/nested/images/tables 페이지를 stub 서버에 올리고 (이름, fixture) 반환"""
+    fixture = BUILDERS[request.param](stub.recorded)
+    stub.state.pages[fixture["page"]["id"]] = fixture["page"]
+    stub.state.blocks.update(fixture["blocks"])
+    return request.param, fixture
@@ -0,0 +1,139 @@
+import copy
+import json
+import os
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_recorded(name, stub_url):
+    """기록해 둔 Notion 응답(page 객체와 블록 트리)을 읽어 이미지 URL을 stub 서버로 연결"""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), encoding="utf-8") as f:
+        data = f.read().replace("{STUB}", stub_url)
+    return json.loads(data)
+
+
+def _clone(block, suffix, blocks, new_blocks):
+    """블록(과 자식)을 id만 바꿔 복제"""
+    clone = copy.deepcopy(block)
+    clone["id"] = f"{block['id']}-{suffix}"
+    if block["id"] in blocks:
+        new_blocks[clone["id"]] = [
+            _clone(child, suffix, blocks, new_blocks) for child in blocks[block["id"]]
+        ]
+    return clone
+
+
+def with_page(recorded, page_id, custom_id, root_blocks, blocks):
+    page = copy.deepcopy(recorded["page"])
+    page["id"] = page_id
+    page["properties"]["ID"]["unique_id"]["number"] = custom_id
+    blocks[page_id] = root_blocks
+    return {"page": page, "blocks": blocks}
+
+
+def small_page(recorded):
+    """기록한 페이지 그대로 (15개 최상위 블록, 한 단계 중첩)"""
+    return recorded
+
+
+def large_page(recorded, copies=40):
+    """기록한 블록을 반복해 최상위 블록이 수백 개인 페이지 (children 페이지네이션 발생)"""
+    source = recorded["blocks"][recorded["page"]["id"]]
+    blocks = {}
+    root = [
+        _clone(block, str(i), recorded["blocks"], blocks)
+        for i in range(copies)
+        for block in source
+    ]
+    return with_page(recorded, "page-large", 2, root, blocks)
+
+
+def nested_page(recorded, depth=6, width=3):
+    """리스트가 depth 단계로 중첩된 페이지 (단계마다 children 요청 발생)"""
+    item = recorded["blocks"][recorded["page"]["id"]][4]  # bulleted_list_item
+    blocks = {}
+
+    def build(level, path):
+        block = copy.deepcopy(item)
+        block["id"] = f"nested-{path}"
+        block["has_children"] = level < depth
+        if level < depth:
+            blocks[block["id"]] = [
+                build(level + 1, f"{path}.{i}") for i in range(width)
+            ]
+        return block
+
+    root = [build(1, str(i)) for i in range(width)]
+    return with_page(recorded, "page-nested", 3, root, blocks)
+
+
+def image_page(recorded, images=40):
+    """서로 다른 이미지가 많은 페이지 (다운로드/업로드 파이프라인 부하)"""
+    image = next(
+        block
+        for block in recorded["blocks"][recorded["page"]["id"]]
+        if block["type"] == "image"
+    )
+    root = []
+    for i in range(images):
+        block = copy.deepcopy(image)
+        block["id"] = f"image-{i}"
+        url = block["image"]["file"]["url"]
+        block["image"]["file"]["url"] = url.replace(".png", f"-{i}.png")
+        root.append(block)
+    return with_page(recorded, "page-images", 4, root, {})
+
+
+def table_page(recorded, tables=20, rows=120, width=4):
+    """행이 많은 테이블이 여러 개인 페이지 (테이블마다 행 페이지네이션 발생)"""
+    paragraph = recorded["blocks"][recorded["page"]["id"]][1]
+    cell = paragraph["paragraph"]["rich_text"]
+    blocks = {}
+    root = []
+    for t in range(tables):
+        table_id = f"table-{t}"
+        root.append(
+            {
+                "object": "block",
+                "id": table_id,
+                "type": "table",
+                "has_children": True,
+                "table": {
+                    "table_width": width,
+                    "has_column_header": True,
+                    "has_row_header": False,
+                },
+            }
+        )
+        blocks[table_id] = [
+            {
+                "object": "block",
+                "id": f"{table_id}-row-{r}",
+                "type": "table_row",
+                "has_children": False,
+                "table_row": {"cells": [copy.deepcopy(cell) for _ in range(width)]},
+            }
+            for r in range(rows)
+        ]
+    return with_page(recorded, "page-tables", 5, root, blocks)
+
+
+BUILDERS = {
+    "small": small_page,
+    "large": large_page,
+    "nested": nested_page,
+    "images": image_page,
+    "tables": table_page,
+}
+
+
+def count_blocks(fixture):
+    """fixture의 전체 블록 수 (중첩 포함)"""
+    return sum(len(children) for children in fixture["blocks"].values())
+
+
+def expected_block_requests(fixture):
+    """블록 트리를 모두 가져오는 데 필요한 children 요청 수 (100개 단위 페이지네이션)"""
+    return sum(
+        max(1, -(-len(children) // 100)) for children in fixture["blocks"].values()
+    )
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+# Notion 블록 children API의 최대 page_size
+NOTION_PAGE_SIZE = 100
+
+# 최소한의 PNG 헤더 (확장자 판별용)
+PNG_BYTES = b"\x89PNG\r\n\x1a\n" + b"\x00" * 256
+
+
+class StubState:
+    """stub 서버가 흉내 내는 Notion 데이터베이스와 S3 버킷 상태"""
+
+    def __init__(self, pages=(), blocks=None, secret=None):
+        self.pages = {page["id"]: page for page in pages}
+        # {block_id: [자식 블록]} (페이지 id는 최상위 블록 목록)
+        self.blocks = blocks or {}
+        self.secret = secret or {}
+        self.objects = {}
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.requests[name] += 1
+
+    def reset_counts(self):
+        with self.lock:
+            self.requests.clear()
+
+    def notion_requests(self):
+        return sum(n for name, n in self.requests.items() if name.startswith("notion"))
+
+
+def edited_time(now=None):
+    """Notion처럼 분 단위로 내림한 last_edited_time"""
+    now = (now or datetime.now(timezone.utc)).replace(second=0, microsecond=0)
+    return now.strftime("%Y-%m-%dT%H:%M:00.000Z")
+
+
+def _etag(body):
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Notion API, 이미지 파일, S3(path-style), Secrets Manager를 흉내 내는 handler"""
+
+    protocol_version = "HTTP/1.1"
+    # 헤더와 본문을 따로 쓸 때 Nagle 지연이 측정에 섞이지 않도록
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        elif isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _route(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self._body()
+        if url.path.startswith("/v1/"):
+            return self._notion(url.path[len("/v1/") :], query, body)
+        if url.path.startswith("/files/"):
+            self.state.count("image")
+            # 파일마다 내용이 달라야 asset 키도 달라짐
+            return self._send(200, PNG_BYTES + url.path.encode(), "image/png")
+        if self.headers.get("X-Amz-Target", "").startswith("secretsmanager."):
+            self.state.count("secretsmanager")
+            return self._send(200, {"SecretString": json.dumps(self.state.secret)})
+        return self._s3(unquote(url.path.lstrip("/")), query, body)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_HEAD = do_DELETE = _route
+
+    # Notion API
+
+    def _notion(self, path, query, body):
+        match = re.fullmatch(r"blocks/([^/]+)/children", path)
+        if match and self.command == "GET":
+            self.state.count("notion.blocks")
+            children = self.state.blocks.get(match.group(1), [])
+            start = int(query.get("start_cursor") or 0)
+            size = min(
+                int(query.get("page_size") or NOTION_PAGE_SIZE), NOTION_PAGE_SIZE
+            )
+            end = start + size
+            return self._send(
+                200,
+                {
+                    "object": "list",
+                    "results": children[start:end],
+                    "has_more": end < len(children),
+                    "next_cursor": str(end) if end < len(children) else None,
+                },
+            )
+
+        match = re.fullmatch(r"databases/[^/]+/query", path)
+        if match:
+            self.state.count("notion.query")
+            payload = json.loads(body or b"{}")
+            pages = list(self.state.pages.values())
+            number = (
+                payload.get("filter", {}).get("unique_id", {}).get("equals")
+                if payload.get("filter", {}).get("property") == "ID"
+                else None
+            )
+            if number is not None:
+                pages = [
+                    page
+                    for page in pages
+                    if page["properties"]["ID"]["unique_id"]["number"] == number
+                ]
+            start = int(payload.get("start_cursor") or 0)
+            end = start + NOTION_PAGE_SIZE
+            return self._send(
+                200,
+                {
+                    "object": "list",
+                    "results": pages[start:end],
+                    "has_more": end < len(pages),
+                    "next_cursor": str(end) if end < len(pages) else None,
+                },
+            )
+
+        match = re.fullmatch(r"pages/([^/]+)", path)
+        if match and match.group(1) in self.state.pages:
+            page = self.state.pages[match.group(1)]
+            if self.command == "PATCH":
+                self.state.count("notion.update")
+                for name, value in json.loads(body).get("properties", {}).items():
+                    page["properties"].setdefault(name, {}).update(value)
+                # 속성만 바꿔도 Notion은 last_edited_time을 갱신함
+                page["last_edited_time"] = edited_time()
+            else:
+                self.state.count("notion.page")
+            return self._send(200, page)
+
+        self.state.count("notion.not_found")
+        return self._send(404, {"object": "error", "status": 404})
+
+    # S3 (path-style)
+
+    def _s3_error(self, status, code):
+        body = f"<Error><Code>{code}</Code><Message>{code}</Message></Error>"
+        return self._send(status, body, "application/xml")
+
+    def _s3(self, path, query, body):
+        bucket, _, key = path.partition("/")
+        objects = self.state.objects
+
+        if not key and "delete" in query and self.command == "POST":
+            self.state.count("s3.delete_objects")
+            root = ElementTree.fromstring(body)
+            deleted = []
+            for element in root.iter():
+                if element.tag.endswith("Key"):
+                    objects.pop(element.text, None)
+                    deleted.append(element.text)
+            return self._send(200, "<DeleteResult></DeleteResult>", "application/xml")
+
+        if not key and query.get("list-type") == "2":
+            self.state.count("s3.list")
+            prefix = query.get("prefix", "")
+            keys = sorted(k for k in objects if k.startswith(prefix))
+            contents = "".join(
+                f"<Contents><Key>{escape(k)}</Key>"
+                f"<LastModified>2024-01-01T00:00:00.000Z</LastModified>"
+                f"<Size>{len(objects[k]['body'])}</Size></Contents>"
+                for k in keys
+            )
+            return self._send(
+                200,
+                "<ListBucketResult><IsTruncated>false</IsTruncated>"
+                f"<KeyCount>{len(keys)}</KeyCount>{contents}</ListBucketResult>",
+                "application/xml",
+            )
+
+        if self.command == "PUT":
+            source = self.headers.get("x-amz-copy-source")
+            if source:
+                self.state.count("s3.copy")
+                source_key = unquote(source).lstrip("/").partition("/")[2]
+                if source_key not in objects:
+                    return self._s3_error(404, "NoSuchKey")
+                objects[key] = dict(objects[source_key])
+                return self._send(
+                    200,
+                    '<CopyObjectResult><ETag>"stub"</ETag></CopyObjectResult>',
+                    "application/xml",
+                )
+            self.state.count("s3.put")
+            # 조건부 쓰기 (If-Match / If-None-Match)
+            current = objects.get(key)
+            if_match = self.headers.get("If-Match")
+            if (self.headers.get("If-None-Match") == "*" and current) or (
+                if_match and (not current or _etag(current["body"]) != if_match)
+            ):
+                return self._s3_error(412, "PreconditionFailed")
+            objects[key] = {
+                "body": body,
+                "content_type": self.headers.get("Content-Type"),
+                "cache_control": self.headers.get("Cache-Control"),
+            }
+            return self._send(200, headers={"ETag": _etag(body)})
+
+        if self.command in ("GET", "HEAD"):
+            self.state.count(f"s3.{self.command.lower()}")
+            obj = objects.get(key)
+            if obj is None:
+                if self.command == "HEAD":
+                    return self._send(404)
+                return self._s3_error(404, "NoSuchKey")
+            return self._send(
+                200,
+                obj["body"],
+                obj.get("content_type") or "application/octet-stream",
+                {"ETag": _etag(obj["body"])},
+            )
+
+        return self._s3_error(400, "NotImplemented")
+
+
+class StubServer:
+    """로컬 포트에서 stub handler를 백그라운드 스레드로 실행"""
+
+    def __init__(self, state):
+        self.state = state
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = state
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
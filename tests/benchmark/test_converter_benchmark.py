@@ -0,0 +1,147 @@
+import json
+
+import client
+import main
+from converter import (
+    ConversionContext,
+    extract_text_with_annotations,
+    get_block_content,
+    handle_code,
+)
+
+from tests.benchmark.conftest import BUCKET, measure
+from tests.benchmark.fixtures import count_blocks, expected_block_requests
+
+
+def convert_tree(blocks, page_id):
+    context = ConversionContext(page_id, "ai")
+    return "\n\n".join(get_block_content(block, context) for block in blocks)
+
+
+def test_get_block_content_throughput(fixture_page, record):
+    name, fixture = fixture_page
+    page_id = fixture["page"]["id"]
+    tree = client.fetch_block_tree(page_id)["results"]
+
+    best, median, markdown = measure(lambda: convert_tree(tree, page_id), rounds=5)
+
+    assert markdown.strip()
+    record(f"get_block_content[{name}] blocks/s", count_blocks(fixture) / best, "")
+    record(f"get_block_content[{name}] median", median * 1000, "ms")
+
+
+def rich_text_span(text, **annotations):
+    return {
+        "plain_text": text,
+        "annotations": dict(
+            dict.fromkeys(
+                ("bold", "italic", "strikethrough", "underline", "code"), False
+            ),
+            color="default",
+            **annotations,
+        ),
+        "text": {"content": text, "link": None},
+    }
+
+
+def test_rich_text_throughput(record):
+    code = [rich_text_span("total = compute(a, b)  # 합계\n" * 70) for _ in range(20)]
+    paragraph = [
+        rich_text_span(f"word{i} ", bold=(i // 3) % 2 == 0) for i in range(300)
+    ]
+
+    best, _, markdown = measure(lambda: handle_code({"rich_text": code}), rounds=200)
+    assert markdown.startswith("```plaintext")
+    record("handle_code[1400 lines]", best * 1e6, "us")
+
+    best, _, markdown = measure(
+        lambda: extract_text_with_annotations(paragraph), rounds=200
+    )
+    # 같은 스타일의 인접 span은 하나로 합쳐짐
+    assert markdown.startswith("**word0 word1 word2** word3")
+    record("extract_text_with_annotations[300 spans]", best * 1e6, "us")
+
+
+def test_page_to_markdown_requests(fixture_page, stub, record):
+    name, fixture = fixture_page
+    page = fixture["page"]
+    stub.state.reset_counts()
+
+    best, _, markdown = measure(
+        lambda: client.page_to_markdown(page, "title", "ai", "1", BUCKET), rounds=1
+    )
+
+    requests = stub.state.requests
+    assert markdown.startswith("---")
+    # 블록 트리는 블록마다 한 번(100개 단위 페이지네이션)만 요청
+    assert requests["notion.blocks"] == expected_block_requests(fixture)
+    images = sum(
+        1
+        for children in fixture["blocks"].values()
+        for block in children
+        if block["type"] == "image"
+    )
+    # 본문 이미지 + 커버
+    assert requests["image"] == images + 1
+    record(f"page_to_markdown[{name}] latency", best * 1000, "ms")
+    record(
+        f"page_to_markdown[{name}] notion requests", stub.state.notion_requests(), ""
+    )
+
+
+def upload_event(custom_id):
+    return {
+        "body": json.dumps(
+            {"data": {"properties": {"ID": {"unique_id": {"number": custom_id}}}}}
+        )
+    }
+
+
+def test_handle_upload_request_end_to_end(stub, record):
+    fixture = stub.recorded
+    edited_time = fixture["page"]["last_edited_time"]
+    stub.state.pages[fixture["page"]["id"]] = fixture["page"]
+    stub.state.blocks.update(fixture["blocks"])
+
+    best, _, response = measure(lambda: main.handle_upload_request(upload_event(1)), 1)
+    assert response["statusCode"] == 200
+    assert any(key.endswith("/manifest.json") for key in stub.state.objects)
+    record("handle_upload_request first publish", best * 1000, "ms")
+
+    # 상태 PATCH로 last_edited_time만 바뀜: 블록 트리를 다시 받아 해시로 비교하고
+    # 새 버전 없이 manifest의 확인 시각만 갱신
+    page = stub.state.pages[fixture["page"]["id"]]
+    assert page["last_edited_time"] != edited_time
+    stub.state.reset_counts()
+    best, _, response = measure(lambda: main.handle_upload_request(upload_event(1)), 1)
+    assert json.loads(response["body"])["message"] == "No changes since last upload"
+    assert stub.state.requests["notion.query"] == 1
+    assert stub.state.requests["notion.blocks"] == expected_block_requests(fixture)
+    assert stub.state.requests["notion.update"] == 0
+    assert stub.state.requests["image"] == 0
+    assert stub.state.requests["s3.put"] == 1
+    record("handle_upload_request unchanged", best * 1000, "ms")
+
+    # 수정 시각이 속한 분이 지난 뒤에는 데이터베이스 쿼리 한 번과 manifest 조회만
+    manifest_key = next(
+        key for key in stub.state.objects if key.endswith("manifest.json")
+    )
+    published = json.loads(stub.state.objects[manifest_key]["body"])
+    published["synced_at"] += 60
+    stub.state.objects[manifest_key]["body"] = json.dumps(published).encode("utf-8")
+    stub.state.reset_counts()
+    best, _, response = measure(lambda: main.handle_upload_request(upload_event(1)), 1)
+    assert json.loads(response["body"])["message"] == "No changes since last upload"
+    assert stub.state.notion_requests() == 1
+    assert stub.state.requests["s3.put"] == 0
+    record("handle_upload_request up to date", best * 1000, "ms")
+
+    # 블록 하나만 수정: 이미지와 썸네일은 다시 받지 않음
+    page["last_edited_time"] = "2024-05-03T00:00:00.000Z"
+    paragraph = stub.state.blocks[page["id"]][1]
+    paragraph["paragraph"]["rich_text"][0]["plain_text"] = "Embeddings turn "
+    stub.state.reset_counts()
+    best, _, response = measure(lambda: main.handle_upload_request(upload_event(1)), 1)
+    assert response["statusCode"] == 200
+    assert stub.state.requests["image"] == 0
+    record("handle_upload_request one block edited", best * 1000, "ms")
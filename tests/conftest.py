@@ -7,3 +7,64 @@ lambda_source_path = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "notion_lambda")
 )
 sys.path.insert(0, lambda_source_path)
+
+import hashlib
+import io
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+
+class ConditionalS3:
+    """ETag 조건부 쓰기(If-Match / If-None-Match)를 지원하는 S3 client stub"""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+        # 다음 조건부 쓰기 직전에 끼어드는 다른 쓰기 {키: 내용}
+        self.interleave = {}
+
+    @staticmethod
+    def etag(body):
+        return f'"{hashlib.md5(body).hexdigest()}"'
+
+    def _error(self, code, operation):
+        return ClientError({"Error": {"Code": code, "Message": code}}, operation)
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self._error("NoSuchKey", "GetObject")
+        body = self.objects[Key]
+        return {"Body": io.BytesIO(body), "ETag": self.etag(body)}
+
+    def put_object(self, Bucket, Key, Body, IfMatch=None, IfNoneMatch=None, **kwargs):
+        if Key in self.interleave:
+            self.objects[Key] = json.dumps(self.interleave.pop(Key)).encode()
+        current = self.objects.get(Key)
+        if (IfNoneMatch == "*" and current is not None) or (
+            IfMatch and (current is None or self.etag(current) != IfMatch)
+        ):
+            raise self._error("PreconditionFailed", "PutObject")
+        self.puts.append(Key)
+        self.objects[Key] = Body
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        self.puts.append(key)
+        self.objects[key] = fileobj.read()
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def load(self, key):
+        return json.loads(self.objects[key])
+
+
+@pytest.fixture
+def conditional_s3(monkeypatch):
+    """config의 s3 client를 ConditionalS3로 교체"""
+    import config
+
+    fake = ConditionalS3()
+    monkeypatch.setitem(config._clients, "s3", fake)
+    return fake
@@ -0,0 +1,59 @@
+import json
+
+import bulk_sync
+
+
+def test_build_filter_combines_status_and_edited_time():
+    assert bulk_sync.build_filter() is None
+    assert bulk_sync.build_filter(["Uploaded"]) == {
+        "property": "status",
+        "status": {"equals": "Uploaded"},
+    }
+
+    query = bulk_sync.build_filter(["Uploaded", "Ready"], "2024-01-01T00:00:00Z")
+
+    assert len(query["and"]) == 2
+    assert len(query["and"][0]["or"]) == 2
+    assert query["and"][1]["last_edited_time"] == {
+        "on_or_after": "2024-01-01T00:00:00Z"
+    }
+
+
+def test_run_sync_stops_before_deadline_and_resumes(monkeypatch):
+    saved = []
+    monkeypatch.setattr(
+        bulk_sync, "save_checkpoint", lambda checkpoint, bucket: saved.append(1)
+    )
+    monkeypatch.setattr(bulk_sync, "get_custom_id", lambda page: page["custom_id"])
+    monkeypatch.setattr(
+        bulk_sync,
+        "publish_page",
+        lambda page, custom_id, force: {
+            "statusCode": 200,
+            "body": json.dumps({"message": "Upload Successful"}),
+        },
+    )
+    pages = {f"page-{i}": {"id": f"page-{i}", "custom_id": str(i)} for i in range(5)}
+    checkpoint = bulk_sync.new_checkpoint(pages, {})
+
+    # 세 번째 포스트를 시작하기 전에 남은 시간이 부족해짐
+    remaining = iter([600, 600, 10])
+    bulk_sync.run_sync(
+        checkpoint, pages, "bucket", lambda: next(remaining, 10), max_workers=1
+    )
+
+    assert checkpoint["status"] == "paused"
+    assert [result["custom_id"] for result in checkpoint["results"]] == ["0", "1"]
+    assert checkpoint["pending"] == ["page-2", "page-3", "page-4"]
+
+    bulk_sync.run_sync(checkpoint, pages, "bucket", lambda: 600, max_workers=2)
+
+    assert checkpoint["status"] == "completed"
+    assert sorted(result["custom_id"] for result in checkpoint["results"]) == [
+        "0",
+        "1",
+        "2",
+        "3",
+        "4",
+    ]
+    assert bulk_sync.summarize(checkpoint)["failed"] == []
@@ -0,0 +1,61 @@
+import cdn
+import config
+import metrics
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def pending(monkeypatch):
+    # 다른 테스트의 S3 쓰기가 남긴 경로는 제외
+    monkeypatch.setattr(cdn, "_pending", set())
+
+
+class FakeCloudFront:
+    def __init__(self):
+        self.calls = []
+
+    def create_invalidation(self, DistributionId, InvalidationBatch):
+        self.calls.append(InvalidationBatch)
+        return {"Invalidation": {"Id": "I1"}}
+
+
+def test_collapse_paths_merges_folders_under_cap():
+    paths = [f"/posts/web/1/file-{i}" for i in range(5)] + ["/posts/index.json"]
+
+    assert cdn.collapse_paths(paths, limit=10) == sorted(paths)
+    assert cdn.collapse_paths(paths, limit=2) == ["/posts/index.json", "/posts/web/1/*"]
+    assert cdn.collapse_paths(paths, limit=1) == ["/posts/*"]
+    assert cdn.collapse_paths(["/a/1", "/b/1"], limit=1) == ["/*"]
+
+
+def test_flush_sends_one_coalesced_batch(monkeypatch):
+    fake = FakeCloudFront()
+    monkeypatch.setitem(config._clients, "cloudfront", fake)
+    monkeypatch.setattr(cdn, "CLOUDFRONT_DISTRIBUTION_ID", "DIST")
+
+    monkeypatch.setattr(metrics, "_trace", metrics.Trace("req-1"))
+    cdn.invalidate("posts/index.json", "posts/웹/index.json")
+    cdn.invalidate("posts/index.json")
+    assert cdn.flush_invalidations() == [
+        "/posts/%EC%9B%B9/index.json",
+        "/posts/index.json",
+    ]
+    # 모아 둔 경로는 한 번만 무효화
+    assert cdn.flush_invalidations() == []
+
+    # 같은 경로 묶음을 다시 무효화해도 CallerReference는 매번 새로 만듦
+    # (재사용하면 CloudFront가 예전 무효화를 돌려주고 새 객체는 캐시에 남음)
+    cdn.invalidate("posts/웹/index.json", "posts/index.json")
+    cdn.flush_invalidations()
+    references = [call["CallerReference"] for call in fake.calls]
+    assert len(set(references)) == 2
+    assert all(reference.startswith("req-1-") for reference in references)
+    assert fake.calls[0]["Paths"] == fake.calls[1]["Paths"]
+    assert fake.calls[0]["Paths"]["Quantity"] == 2
+
+
+def test_flush_without_distribution_only_clears(monkeypatch):
+    monkeypatch.setattr(cdn, "CLOUDFRONT_DISTRIBUTION_ID", None)
+    cdn.invalidate("posts/index.json")
+    assert cdn.flush_invalidations() == []
+    assert not cdn._pending
@@ -0,0 +1,144 @@
+import json
+
+import client
+import pytest
+import urllib3
+
+
+class FakeResponse:
+    def __init__(self, status, data=None, headers=None):
+        self.status = status
+        self.data = json.dumps(data or {}).encode("utf-8")
+        self.headers = headers or {}
+
+
+class FakeHttp:
+    """urllib3.PoolManager 대신 정해 둔 응답(또는 예외)을 순서대로 돌려줌"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.timeouts = []
+
+    def request(self, method, url, headers=None, body=None, fields=None, **kwargs):
+        self.requests.append((method, url, fields))
+        self.timeouts.append(kwargs.get("timeout"))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self.paused = []
+
+    def acquire(self):
+        self.acquired += 1
+
+    def pause(self, seconds):
+        self.paused.append(seconds)
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    sleeps = []
+    limiter = FakeLimiter()
+    monkeypatch.setattr(client.time, "sleep", sleeps.append)
+    monkeypatch.setattr(client, "rate_limiter", limiter)
+    monkeypatch.setattr(client, "backoff_delay", lambda attempt: 0.5 * 2**attempt)
+    monkeypatch.setattr(client, "notion_headers", lambda: {})
+
+    def use(*responses):
+        http = FakeHttp(*responses)
+        monkeypatch.setattr(client, "http", http)
+        return http
+
+    use.sleeps = sleeps
+    use.limiter = limiter
+    return use
+
+
+def test_make_request_honours_retry_after_on_429(fake_client):
+    http = fake_client(
+        FakeResponse(429, headers={"Retry-After": "3"}),
+        FakeResponse(200, {"ok": True}),
+    )
+
+    assert client.make_request("GET", "https://notion/x") == {"ok": True}
+    assert len(http.requests) == 2
+    assert fake_client.sleeps == [3.0]
+    # 다른 스레드의 요청도 Retry-After 동안 멈춤
+    assert fake_client.limiter.paused == [3.0]
+    assert fake_client.limiter.acquired == 2
+
+
+def test_make_request_retries_server_and_connection_errors(fake_client):
+    http = fake_client(
+        FakeResponse(502),
+        urllib3.exceptions.ProtocolError("connection reset"),
+        FakeResponse(200, {"ok": True}),
+    )
+
+    assert client.make_request("GET", "https://notion/x") == {"ok": True}
+    assert len(http.requests) == 3
+    # Retry-After가 없으면 지수 백오프
+    assert fake_client.sleeps == [0.5, 1.0]
+    assert fake_client.limiter.paused == []
+
+
+def test_make_request_retries_stalled_requests(fake_client):
+    http = fake_client(
+        urllib3.exceptions.ConnectTimeoutError(None, "connect timed out"),
+        urllib3.exceptions.ReadTimeoutError(None, "https://notion/x", "timed out"),
+        FakeResponse(200, {"ok": True}),
+    )
+
+    assert client.make_request("GET", "https://notion/x") == {"ok": True}
+    assert len(http.requests) == 3
+    # 멈춘 연결이 Lambda 제한 시간까지 붙잡지 않도록 모든 요청에 제한 시간 지정
+    assert http.timeouts == [client.NOTION_TIMEOUT] * 3
+
+
+def test_make_request_raises_after_retries_run_out(fake_client, monkeypatch):
+    monkeypatch.setattr(client, "NOTION_MAX_RETRIES", 2)
+    http = fake_client(*[FakeResponse(503) for _ in range(3)])
+
+    with pytest.raises(client.NotionAPIError) as excinfo:
+        client.make_request("GET", "https://notion/x")
+
+    assert excinfo.value.status == 503
+    assert len(http.requests) == 3
+
+
+def test_make_request_does_not_retry_client_errors(fake_client):
+    http = fake_client(FakeResponse(404), FakeResponse(200))
+
+    with pytest.raises(client.NotionAPIError) as excinfo:
+        client.make_request("GET", "https://notion/x")
+
+    assert excinfo.value.status == 404
+    assert len(http.requests) == 1
+
+
+def test_fetch_page_content_follows_all_pages(fake_client):
+    pages = [
+        {
+            "results": [{"id": f"{page}-{i}"} for i in range(100)],
+            "has_more": page < 2,
+            "next_cursor": f"cursor-{page + 1}" if page < 2 else None,
+        }
+        for page in range(3)
+    ]
+    http = fake_client(*[FakeResponse(200, page) for page in pages])
+
+    content = client.fetch_page_content("page")
+
+    assert len(content["results"]) == 300
+    assert content["results"][-1] == {"id": "2-99"}
+    assert [fields.get("start_cursor") for _, _, fields in http.requests] == [
+        None,
+        "cursor-1",
+        "cursor-2",
+    ]
@@ -0,0 +1,44 @@
+import json
+
+import config
+
+
+class FakeSecretsManager:
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        value = self.values.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return {"SecretString": json.dumps(value)}
+
+
+def test_get_secret_is_cached_until_ttl(monkeypatch):
+    fake = FakeSecretsManager([{"auth-token": "a"}, {"auth-token": "b"}])
+    monkeypatch.setattr(config, "_secrets", {})
+    monkeypatch.setitem(config._clients, "secretsmanager", fake)
+    now = [100.0]
+    monkeypatch.setattr(config.time, "monotonic", lambda: now[0])
+
+    assert config.get_secret("s")["auth-token"] == "a"
+    assert config.get_secret("s")["auth-token"] == "a"
+    assert fake.calls == 1
+
+    now[0] += config.SECRET_TTL_SECONDS + 1
+    assert config.get_secret("s")["auth-token"] == "b"
+    assert fake.calls == 2
+
+
+def test_get_secret_keeps_stale_value_when_refresh_fails(monkeypatch):
+    fake = FakeSecretsManager([{"auth-token": "a"}, RuntimeError("boom")])
+    monkeypatch.setattr(config, "_secrets", {})
+    monkeypatch.setitem(config._clients, "secretsmanager", fake)
+    now = [100.0]
+    monkeypatch.setattr(config.time, "monotonic", lambda: now[0])
+
+    config.get_secret("s")
+    now[0] += config.SECRET_TTL_SECONDS + 1
+    assert config.get_secret("s") == {"auth-token": "a"}
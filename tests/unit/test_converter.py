@@ -0,0 +1,326 @@
+import converter
+import utils
+
+
+def context(page_dir="42"):
+    return converter.ConversionContext(page_dir, "web")
+
+
+def image_block(url, caption=""):
+    return {
+        "type": "image",
+        "has_children": False,
+        "image": {
+            "file": {"url": url},
+            "caption": [{"plain_text": caption}] if caption else [],
+        },
+    }
+
+
+def test_image_downloads_are_resolved_after_conversion():
+    def fake_store(image_url):
+        if "broken" in image_url:
+            return None
+        return utils.StoredImage(image_url.rsplit("/", 1)[-1])
+
+    blocks = [
+        image_block("https://files.notion.so/a.png", "first"),
+        image_block("https://files.notion.so/broken.png"),
+    ]
+    with utils.DownloadPipeline(fake_store, max_workers=2) as downloads:
+        context = converter.ConversionContext("42", "web", downloads)
+        markdown = "\n\n".join(
+            converter.get_block_content(block, context) for block in blocks
+        )
+        assert "notion-image://" in markdown
+        markdown = converter.resolve_image_links(markdown, downloads.wait())
+
+    assert markdown == (
+        "![first](/assets/a.png)\n\n![](https://files.notion.so/broken.png)"
+    )
+
+
+def test_multiline_and_linked_captions_are_resolved():
+    stored = utils.StoredImage("a.png")
+    block = {
+        "type": "image",
+        "has_children": False,
+        "image": {
+            "file": {"url": "https://files.notion.so/a.png"},
+            "caption": [
+                span("첫 줄\n둘째 줄 "),
+                span("출처", link="https://e.com"),
+                span(" [1]"),
+            ],
+        },
+    }
+    with utils.DownloadPipeline(lambda url: stored) as downloads:
+        context = converter.ConversionContext("42", "web", downloads)
+        markdown = "![외부](https://e.com/x.png) " + converter.get_block_content(
+            block, context
+        )
+        markdown = converter.resolve_image_links(markdown, downloads.wait())
+
+    assert markdown == (
+        "![외부](https://e.com/x.png) "
+        "![첫 줄\n둘째 줄 [출처](https://e.com) \\[1\\]](/assets/a.png)"
+    )
+
+
+def span(text, link=None, **annotations):
+    return {
+        "plain_text": text,
+        "annotations": {
+            "bold": False,
+            "italic": False,
+            "strikethrough": False,
+            "underline": False,
+            "code": False,
+            "color": "default",
+            **annotations,
+        },
+        "text": {"content": text, "link": {"url": link} if link else None},
+    }
+
+
+def test_image_with_variants_gets_srcset():
+    stored = utils.StoredImage(
+        "ab.png",
+        1280,
+        720,
+        (("ab-640w.webp", 640), ("ab-1280w.webp", 1280)),
+        "data:image/webp;base64,AAAA",
+    )
+
+    markdown = converter.resolve_image_links(
+        '![a *b* "c"](notion-image://t/0)',
+        {"notion-image://t/0": ("https://files.notion.so/ab.png", stored)},
+    )
+
+    assert markdown == (
+        '<img src="/assets/ab-1280w.webp" '
+        'srcSet="/assets/ab-640w.webp 640w, /assets/ab-1280w.webp 1280w" '
+        'sizes="(max-width: 1280px) 100vw, 1280px" alt="a b &quot;c&quot;" '
+        'width={1280} height={720} loading="lazy" decoding="async" '
+        'style={{ backgroundImage: "url(data:image/webp;base64,AAAA)", '
+        'backgroundSize: "cover" }} />'
+    )
+
+
+def test_adjacent_spans_with_same_style_are_merged():
+    rich_text = [
+        span("a", bold=True),
+        span("b ", bold=True, color="red"),
+        span("c"),
+        span("lnk", link="https://e.com/a (b)", italic=True),
+    ]
+
+    assert converter.extract_text_with_annotations(rich_text) == (
+        "**ab** c[*lnk*](https://e.com/a%20%28b%29)"
+    )
+
+
+def test_markdown_special_characters_are_escaped_outside_code():
+    rich_text = [
+        span("snake_case <T> {x} "),
+        span("a`b", code=True),
+        span(" "),
+        span("x{y}", code=True),
+    ]
+
+    assert converter.extract_text_with_annotations(rich_text) == (
+        "snake\\_case \\<T\\> \\{x\\} ``a`b`` `x{y}`"
+    )
+
+
+def test_inline_code_fence_is_longer_than_backtick_runs():
+    rich_text = [span("a ``` b", code=True), span(" "), span("`x", code=True)]
+
+    assert converter.extract_text_with_annotations(rich_text) == (
+        "````a ``` b```` `` `x ``"
+    )
+
+
+def paragraph(text):
+    return {
+        "type": "paragraph",
+        "has_children": False,
+        "paragraph": {"rich_text": [span(text)]},
+    }
+
+
+def test_block_start_markers_in_paragraph_are_escaped():
+    texts = {
+        "# 제목 아님": "\\# 제목 아님",
+        "> 인용 아님": "\\> 인용 아님",
+        "- 목록 아님": "\\- 목록 아님",
+        "+ 목록 아님": "\\+ 목록 아님",
+        "1. 번호 아님": "1\\. 번호 아님",
+        "첫 줄\n---": "첫 줄\n\\---",
+        "#태그 -1 2024년": "#태그 -1 2024년",
+    }
+    for text, expected in texts.items():
+        assert converter.get_block_content(paragraph(text), context()) == expected
+    # 목록 항목 안의 텍스트도 중첩 제목이 되지 않도록
+    assert converter.get_block_content(
+        list_item("bulleted_list_item", "# x"), context()
+    ) == ("- \\# x")
+
+
+def test_code_block_keeps_text_verbatim():
+    block = {
+        "type": "code",
+        "has_children": False,
+        "code": {
+            "language": "python",
+            "rich_text": [span("def f(a_b):\n"), span("    return a_b * 2", bold=True)],
+        },
+    }
+
+    assert converter.get_block_content(block, context("42")) == (
+        "```python\ndef f(a_b):\n    return a_b * 2\n```"
+    )
+
+
+def list_item(block_type, text, children=()):
+    return {
+        "type": block_type,
+        "has_children": bool(children),
+        "children": list(children),
+        block_type: {"rich_text": [span(text)]},
+    }
+
+
+def test_numbered_list_continues_after_nested_items():
+    blocks = [
+        list_item("numbered_list_item", "one"),
+        list_item(
+            "numbered_list_item",
+            "two",
+            [
+                list_item("numbered_list_item", "a"),
+                list_item("bulleted_list_item", "b", [list_item("paragraph", "c")]),
+                list_item("numbered_list_item", "d"),
+            ],
+        ),
+        list_item("numbered_list_item", "three"),
+        list_item("paragraph", "end"),
+        list_item("numbered_list_item", "again"),
+    ]
+    doc = context()
+
+    markdown = "\n".join(converter.get_block_content(block, doc) for block in blocks)
+
+    assert markdown == (
+        "1. one\n"
+        "2. two\n"
+        "    1. a\n"
+        "    - b\n"
+        "        c\n"
+        "    1. d\n"
+        "3. three\n"
+        "end\n"
+        "1. again"
+    )
+
+
+def test_contexts_are_independent():
+    item = list_item("numbered_list_item", "x")
+    first, second = context(), context()
+
+    converter.get_block_content(item, first)
+    converter.get_block_content(item, first)
+
+    assert converter.get_block_content(item, second) == "1. x"
+    assert converter.get_block_content(item, first) == "3. x"
+
+
+def table_row(*cells):
+    return {"type": "table_row", "table_row": {"cells": [[span(c)] for c in cells]}}
+
+
+def test_container_blocks_render_their_children():
+    toggle = list_item("toggle", "more", [list_item("numbered_list_item", "x")])
+    table = {
+        "type": "table",
+        "has_children": True,
+        "table": {"table_width": 2, "has_column_header": True},
+        "children": [table_row("a", "b|c"), table_row("1")],
+    }
+    columns = {
+        "type": "column_list",
+        "has_children": True,
+        "column_list": {},
+        "children": [
+            list_item("column", "", [list_item("paragraph", "left")]),
+            list_item("column", "", [list_item("paragraph", "right")]),
+        ],
+    }
+    doc = context()
+
+    assert converter.get_block_content(toggle, doc) == (
+        "<details>\n<summary>more</summary>\n\n1. x\n\n</details>"
+    )
+    assert converter.get_block_content(table, doc) == (
+        "| a | b\\|c |\n|---|---|\n| 1 |  |"
+    )
+    assert converter.get_block_content(columns, doc) == "left\n\nright"
+
+
+def test_link_and_equation_blocks():
+    doc = context()
+    bookmark = {"type": "bookmark", "bookmark": {"url": "https://e.com/a_b"}}
+    equation = {"type": "equation", "equation": {"expression": "e^{i\\pi} + 1 = 0"}}
+
+    assert converter.get_block_content(bookmark, doc) == (
+        "[https://e.com/a\\_b](https://e.com/a_b)"
+    )
+    assert converter.get_block_content(equation, doc) == ("$$\ne^{i\\pi} + 1 = 0\n$$")
+
+
+def test_registered_handler_is_used(monkeypatch):
+    monkeypatch.setattr(converter, "BLOCK_HANDLERS", dict(converter.BLOCK_HANDLERS))
+    converter.register_handler(
+        "audio", lambda block_data, block, context, indent_level: "<audio />"
+    )
+
+    assert converter.get_block_content({"type": "audio"}, context()) == "<audio />"
+    assert "NOT SUPPORTED" in converter.get_block_content({"type": "pdf"}, context())
+
+
+def test_table_without_column_header_gets_empty_header():
+    table = {
+        "type": "table",
+        "has_children": True,
+        "table": {"table_width": 2, "has_row_header": True},
+        "children": [table_row("k", "line1\nline2")],
+    }
+
+    assert converter.get_block_content(table, context()) == (
+        "|   |   |\n|---|---|\n| **k** | line1<br />line2 |"
+    )
+
+
+def test_table_cells_escape_pipes_inside_code():
+    table = {
+        "type": "table",
+        "has_children": True,
+        "table": {"table_width": 2, "has_column_header": True},
+        "children": [
+            {
+                "type": "table_row",
+                "table_row": {
+                    "cells": [
+                        [span("a|b")],
+                        [span("x || y", code=True), span(" "), span("\\|", code=True)],
+                    ]
+                },
+            }
+        ],
+    }
+
+    assert converter.get_block_content(table, context()) == (
+        "| a\\|b | `x \\|\\| y` `\\\\|` |\n|---|---|"
+    )
+    # 표 밖의 code는 그대로
+    assert converter.extract_text_with_annotations([span("a|b", code=True)]) == "`a|b`"
@@ -0,0 +1,106 @@
+import json
+
+import idempotency
+import main
+import pytest
+
+
+@pytest.fixture
+def store():
+    store = idempotency.MemoryStore()
+    idempotency.set_store(store)
+    yield store
+    idempotency.set_store(None)
+
+
+def upload_event(custom_id=7, last_edited_time="2024-05-01T10:00:00.000Z"):
+    return {
+        "body": json.dumps(
+            {
+                "data": {
+                    "last_edited_time": last_edited_time,
+                    "properties": {"ID": {"unique_id": {"number": custom_id}}},
+                }
+            }
+        )
+    }
+
+
+def test_request_key_requires_edit_time():
+    assert idempotency.request_key("upload", "7", None) is None
+    assert (
+        idempotency.request_key("upload", 7, "2024-05-01T10:00:00.000Z", False)
+        == "upload:7:2024-05-01T10:00:00.000Z:False"
+    )
+
+
+def test_memory_store_claims_once_until_lease_expires(store):
+    assert store.claim("k", now=1000) == (True, None)
+    assert store.claim("k", now=1001) == (
+        False,
+        {"status": idempotency.IN_PROGRESS, "response": None},
+    )
+
+    # 처리 중에 중단된 요청은 lease가 지나면 다시 처리
+    later = 1000 + idempotency.IDEMPOTENCY_LEASE_SECONDS + 1
+    assert store.claim("k", now=later) == (True, None)
+
+
+def test_repeated_upload_returns_cached_response(store, monkeypatch):
+    calls = []
+
+    def upload_post(custom_id, force=False):
+        calls.append(custom_id)
+        return {"statusCode": 202, "body": json.dumps({"job_id": "job-1"})}
+
+    monkeypatch.setattr(main, "upload_post", upload_post)
+
+    first = main.handle_upload_request(upload_event())
+    second = main.handle_upload_request(upload_event())
+    edited = main.handle_upload_request(upload_event(last_edited_time="later"))
+
+    assert calls == ["7", "7"]
+    assert json.loads(second["body"]) == json.loads(first["body"])
+    assert second["headers"]["Idempotent-Replayed"] == "true"
+    assert "headers" not in edited
+
+
+def test_in_flight_upload_is_not_run_again(store, monkeypatch):
+    responses = []
+
+    def upload_post(custom_id, force=False):
+        # 처리 중에 같은 요청이 다시 들어옴
+        responses.append(main.handle_upload_request(upload_event()))
+        return {"statusCode": 200, "body": json.dumps({"message": "ok"})}
+
+    monkeypatch.setattr(main, "upload_post", upload_post)
+
+    assert main.handle_upload_request(upload_event())["statusCode"] == 200
+    assert len(responses) == 1
+    assert responses[0]["statusCode"] == 202
+
+
+def test_failed_upload_can_be_retried(store, monkeypatch):
+    results = iter(
+        [
+            {"statusCode": 500, "body": json.dumps({"message": "failed"})},
+            {"statusCode": 200, "body": json.dumps({"message": "ok"})},
+        ]
+    )
+    monkeypatch.setattr(main, "upload_post", lambda *args: next(results))
+
+    assert main.handle_upload_request(upload_event())["statusCode"] == 500
+    assert main.handle_upload_request(upload_event())["statusCode"] == 200
+    assert main.handle_upload_request(upload_event())["statusCode"] == 200
+
+
+def test_completed_response_is_replayed_only_briefly(store):
+    store.complete("k", {"statusCode": 202}, now=1000)
+
+    assert store.claim("k", now=1030) == (
+        False,
+        {"status": idempotency.COMPLETED, "response": {"statusCode": 202}},
+    )
+    # 같은 분 안의 새 수정도 같은 키이므로 재사용 시간이 지나면 다시 처리
+    later = 1000 + idempotency.IDEMPOTENCY_REPLAY_SECONDS + 1
+    assert store.claim("k", now=later) == (True, None)
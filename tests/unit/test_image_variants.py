@@ -0,0 +1,51 @@
+import io
+
+import image_variants
+import pytest
+import utils
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buffer, "PNG")
+    buffer.seek(0)
+    return utils.DownloadedImage(buffer, "abcd.png", "image/png", "abcd" * 16)
+
+
+def test_variants_are_capped_at_original_width():
+    info = image_variants.make_variants(png(1000, 500))
+
+    assert [(name, width) for name, width, _ in info["variants"]] == [
+        ("abcdabcdabcdabcd-640w.webp", 640),
+        ("abcdabcdabcdabcd-1000w.webp", 1000),
+    ]
+    assert (info["width"], info["height"]) == (1000, 500)
+    assert info["placeholder"].startswith("data:image/webp;base64,")
+    with Image.open(io.BytesIO(info["variants"][0][2])) as variant:
+        assert (variant.format, variant.size) == ("WEBP", (640, 320))
+
+
+def test_existing_variants_are_not_encoded_again():
+    image = png(2000, 1000)
+
+    info = image_variants.make_variants(image, exists=lambda name: "640w" in name)
+
+    assert [data is None for _, _, data in info["variants"]] == [True, False]
+    assert image.fileobj.tell() == 0
+
+
+def test_unsupported_images_are_kept_as_is():
+    gif = png(100, 100)._replace(content_type="image/gif")
+    broken = utils.DownloadedImage(io.BytesIO(b"not an image"), "x.png", "", "00")
+
+    assert image_variants.make_variants(gif) is None
+    assert image_variants.make_variants(broken) is None
+
+
+def test_og_card_is_cropped_to_fixed_size():
+    card = image_variants.make_card(png(800, 800))
+
+    with Image.open(io.BytesIO(card)) as image:
+        assert (image.format, image.size) == ("JPEG", image_variants.OG_CARD_SIZE)
@@ -0,0 +1,45 @@
+import listing
+
+
+def listed_ids(fake, key):
+    return [post["id"] for post in fake.load(key)["posts"]]
+
+
+def meta(custom_id, category="web", date="2024/05/01"):
+    metadata = {
+        "title": f"post {custom_id}",
+        "date": date,
+        "description": "",
+        "tags": [],
+        "author": "Anonymous",
+    }
+    return listing.post_meta(metadata, category, custom_id, "v1", "thumbnail.png")
+
+
+def test_post_meta_points_into_version_folder():
+    entry = meta("3")
+    assert entry["thumbnail"] == "/posts/web/3/v1/thumbnail.png"
+    assert entry["path"] == "/posts/web/3/v1/page.mdx"
+    assert entry["og_image"] is None
+
+
+def test_listing_is_updated_per_post(conditional_s3):
+    fake = conditional_s3
+
+    listing.update_listing(meta("1", date="2024/01/01"), "bucket")
+    listing.update_listing(meta("2", date="2024/03/01"), "bucket")
+    listing.update_listing(meta("3", "life", date="2024/02/01"), "bucket")
+
+    # 최신 글이 먼저
+    assert listed_ids(fake, listing.listing_key()) == ["2", "3", "1"]
+    assert listed_ids(fake, listing.listing_key("web")) == ["2", "1"]
+    assert listed_ids(fake, listing.listing_key("life")) == ["3"]
+
+    # 카테고리가 바뀌면 이전 카테고리 목록에서 빠짐
+    listing.update_listing(meta("1", "life", date="2024/01/01"), "bucket")
+    assert listed_ids(fake, listing.listing_key("web")) == ["2"]
+    assert listed_ids(fake, listing.listing_key("life")) == ["3", "1"]
+
+    listing.remove_from_listing("3", "life", "bucket")
+    assert listed_ids(fake, listing.listing_key()) == ["2", "1"]
+    assert listed_ids(fake, listing.listing_key("life")) == ["1"]
@@ -0,0 +1,186 @@
+import main
+import manifest
+import pytest
+import s3_uploader
+
+
+def test_delete_post_ignores_stale_index_category(monkeypatch):
+    deleted = []
+    removed = []
+    monkeypatch.setattr(
+        main,
+        "lookup_page",
+        lambda custom_id, bucket: {"page_id": "p", "category": "old"},
+    )
+    # 포스트는 카테고리가 바뀌어 web에 게시돼 있음
+    monkeypatch.setattr(
+        main,
+        "load_manifest",
+        lambda category, custom_id, bucket: (
+            {"revision": 1} if category == "web" else None
+        ),
+    )
+    monkeypatch.setattr(
+        main,
+        "find_page_by_custom_id",
+        lambda database_id, custom_id: {
+            "id": "p",
+            "properties": {"category": {"type": "select", "select": {"name": "web"}}},
+        },
+    )
+    monkeypatch.setattr(
+        main,
+        "delete_post_from_s3",
+        lambda custom_id, category, bucket: deleted.append(category) or [],
+    )
+    monkeypatch.setattr(
+        main, "remove_from_page_index", lambda custom_id, bucket: removed.append(1)
+    )
+    for name in (
+        "remove_from_search_index",
+        "remove_from_listing",
+        "update_post_status",
+    ):
+        monkeypatch.setattr(main, name, lambda *args: None)
+
+    response = main.delete_post("7")
+
+    assert response["statusCode"] == 200
+    assert deleted == ["web"]
+    assert removed
+
+
+def test_is_up_to_date_waits_for_edit_minute_to_close():
+    page = {"last_edited_time": "2024-05-01T10:00:00.000Z"}
+    edited_at = manifest.parse_edit_time(page["last_edited_time"])
+    published = {
+        "version": manifest.MANIFEST_VERSION,
+        "last_edited_time": page["last_edited_time"],
+    }
+
+    # 같은 분 안에 가져온 내용은 그 뒤의 수정이 빠졌을 수 있음
+    assert not manifest.is_up_to_date(dict(published, synced_at=edited_at + 30), page)
+    assert manifest.is_up_to_date(dict(published, synced_at=edited_at + 60), page)
+    assert not manifest.is_up_to_date(published, page)
+
+
+def test_publish_post_skips_new_version_when_content_is_unchanged(monkeypatch):
+    rendered = {
+        "markdown": "---\n---\n\n본문",
+        "blocks": [{"hash": "h", "markdown": "본문"}],
+        "cover": None,
+        "cover_validators": None,
+        "thumbnail": None,
+        "og_image": None,
+        "cover_files": {},
+        "text": "본문",
+    }
+    metadata = {
+        "title": "제목",
+        "date": "2024-05-01",
+        "description": "",
+        "tags": [],
+        "author": "Anonymous",
+    }
+    _, objects = main.version_objects(rendered, metadata, "web", "7", "v1")
+    published = {
+        "version": manifest.MANIFEST_VERSION,
+        "revision": 1,
+        # 상태 PATCH로 last_edited_time만 바뀐 상태
+        "last_edited_time": "2024-05-01T10:00:00.000Z",
+        "objects": {
+            name: s3_uploader.content_hash(body) for name, body in objects.items()
+        },
+    }
+    saved = []
+    monkeypatch.setattr(main, "load_manifest", lambda *args: dict(published))
+    monkeypatch.setattr(main, "load_block_cache", lambda *args: rendered["blocks"])
+    monkeypatch.setattr(main, "render_page", lambda *args: rendered)
+    monkeypatch.setattr(main, "page_metadata", lambda *args: metadata)
+    monkeypatch.setattr(
+        main, "save_manifest", lambda data, *args, **kwargs: saved.append(data)
+    )
+    monkeypatch.setattr(
+        main, "upload_version", lambda *args: pytest.fail("uploaded a new version")
+    )
+
+    page = {"id": "p", "last_edited_time": "2024-05-01T10:05:00.000Z"}
+    result = main.publish_post(page, "제목", "web", "7")
+
+    assert result == {"changed": False, "failed": []}
+    assert saved[0]["revision"] == 1
+    assert saved[0]["last_edited_time"] == page["last_edited_time"]
+    assert saved[0]["synced_at"]
+
+
+def test_concurrent_publish_discards_losing_version(conditional_s3, monkeypatch):
+    fake = conditional_s3
+    key = "posts/web/7/manifest.json"
+    rendered = {
+        "markdown": "본문",
+        "blocks": [],
+        "cover": None,
+        "cover_validators": None,
+        "thumbnail": None,
+        "og_image": None,
+        "cover_files": {},
+        "text": "본문",
+    }
+    metadata = {
+        "title": "제목",
+        "date": "2024-05-01",
+        "description": "",
+        "tags": [],
+        "author": "Anonymous",
+    }
+    # 이번 게시가 manifest를 쓰기 직전에 다른 게시가 먼저 v1으로 전환
+    fake.interleave[key] = {
+        "version": manifest.MANIFEST_VERSION,
+        "revision": 1,
+        "folder": "v1-winner",
+        "last_edited_time": "2024-05-01T09:00:00.000Z",
+        "objects": {},
+    }
+    versions = []
+    discarded = []
+    monkeypatch.setattr(main, "render_page", lambda *args: rendered)
+    monkeypatch.setattr(main, "page_metadata", lambda *args: metadata)
+    monkeypatch.setattr(main, "load_block_cache", lambda *args: [])
+    monkeypatch.setattr(
+        main,
+        "upload_version",
+        lambda objects, *args: versions.append(args[3])
+        or ({name: s3_uploader.content_hash(b) for name, b in objects.items()}, []),
+    )
+    monkeypatch.setattr(main, "discard_version", lambda *args: discarded.append(args))
+    page = {"id": "p", "last_edited_time": "2024-05-01T10:00:00.000Z"}
+    monkeypatch.setattr(main, "fetch_page", lambda page_id: page)
+    for name in ("schedule_gc", "update_listing", "update_search_index"):
+        monkeypatch.setattr(main, name, lambda *args: None)
+
+    result = main.publish_post(page, "제목", "web", "7")
+
+    assert result == {"changed": True, "failed": []}
+    first, second = versions
+    assert first.startswith("v1-") and first != "v1-winner"
+    assert discarded == [("web", "7", first)]
+    # 이긴 게시의 manifest를 기준으로 다시 게시
+    assert second.startswith("v2-")
+    assert fake.load(key)["folder"] == second
+
+
+def test_status_does_not_require_conditional_writes(monkeypatch):
+    monkeypatch.setattr(s3_uploader, "_conditional_writes", False)
+    monkeypatch.setattr(main, "DATABASE_ID", "db")
+    monkeypatch.setattr(main, "S3_BUCKET_NAME", "bucket")
+    monkeypatch.setattr(main, "get_auth_token", lambda: "token")
+    monkeypatch.setattr(main, "get_job", lambda job_id, bucket: {"job_id": job_id})
+    event = {"headers": {"Authorization": "token"}, "body": "{}"}
+
+    # 작업 상태 조회는 읽기만 하므로 오래된 boto3에서도 응답
+    status = main.lambda_handler(
+        dict(event, path="/status", queryStringParameters={"job_id": "a"}), None
+    )
+    assert status["statusCode"] == 200
+    # 쓰기 요청은 조건부 쓰기 없이 받지 않음
+    assert main.lambda_handler(dict(event, path="/upload"), None)["statusCode"] == 500
@@ -0,0 +1,79 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import metrics
+
+
+def test_spans_and_counters_aggregate_across_threads():
+    trace = metrics.start_trace("req-1")
+
+    def work():
+        for _ in range(100):
+            with metrics.span("download"):
+                metrics.incr("image_bytes", 10)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data = trace.snapshot()
+    assert data["spans"]["download"]["count"] == 400
+    assert (
+        data["spans"]["download"]["max_ms"]
+        <= data["spans"]["download"]["total_ms"] + 0.1
+    )
+    assert data["counters"] == {"image_bytes": 4000}
+
+
+def test_timed_records_even_when_function_raises():
+    trace = metrics.start_trace()
+
+    @metrics.timed("find_page")
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        fail()
+    except ValueError:
+        pass
+    assert trace.snapshot()["spans"]["find_page"]["count"] == 1
+
+
+def test_correlation_id_prefers_header_over_request_id():
+    context = SimpleNamespace(aws_request_id="lambda-id")
+    event = {"headers": {"x-correlation-id": "client-id"}}
+
+    assert metrics.correlation_id(event, context) == "client-id"
+    assert metrics.correlation_id({"headers": None}, context) == "lambda-id"
+    assert metrics.start_trace(None).correlation_id
+
+
+def test_emit_metrics_prints_one_emf_line(capsys):
+    metrics.start_trace("req-2")
+    with metrics.span("convert"):
+        pass
+    metrics.incr("notion_requests", 3)
+    metrics.incr("s3_put_bytes", 2048)
+
+    metrics.emit_metrics("api", {"Path": "/upload"})
+
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+    assert record["Operation"] == "api"
+    assert record["CorrelationId"] == "req-2"
+    assert record["Path"] == "/upload"
+    assert record["notion_requests"] == 3
+    assert record["spans"]["convert"]["count"] == 1
+
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Dimensions"] == [["Operation"]]
+    units = {metric["Name"]: metric["Unit"] for metric in directive["Metrics"]}
+    assert units["convert_ms"] == "Milliseconds"
+    assert units["notion_requests"] == "Count"
+    assert units["s3_put_bytes"] == "Bytes"
+    # 메트릭으로 선언한 이름은 모두 최상위 값으로 있어야 CloudWatch가 추출함
+    assert all(name in record for name in units)
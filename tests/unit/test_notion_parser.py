@@ -5,7 +5,7 @@ from notion_lambda.client import (
     fetch_page_content,
     page_to_markdown,
 )
-from notion_lambda.converter import get_block_content
+from notion_lambda.converter import ConversionContext, get_block_content
 
 # aws cli 설치 후 테스트 가능 (notion api_key secret manager로 가져옴)
 # pytest -s tests/unit/test_notion_parser.py -v
@@ -28,8 +28,9 @@ def test_convert():
     result = fetch_page_content(valid_page_id)
 
     content = ""
+    context = ConversionContext("test", "web")
     for block in result["results"]:
-        content += get_block_content(block, "test", "web") + "\n"
+        content += get_block_content(block, context) + "\n"
 
     print("\n=== Converted Content ===")
     print(content)
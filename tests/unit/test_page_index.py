@@ -0,0 +1,54 @@
+import json
+
+import page_index
+
+
+def test_page_index_tmp_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_index, "PAGE_INDEX_STORE", "tmp")
+    monkeypatch.setattr(
+        page_index, "PAGE_INDEX_LOCAL_PATH", str(tmp_path / "page-index.json")
+    )
+    monkeypatch.setattr(page_index, "_page_index", None)
+
+    assert page_index.lookup_page("42", "bucket") is None
+
+    page_index.update_page_index(42, "page-id", "web", "bucket")
+    assert page_index.lookup_page("42", "bucket") == {
+        "page_id": "page-id",
+        "category": "web",
+    }
+
+    # 다른 컨테이너(메모리 캐시 없음)에서도 /tmp 파일로 복원
+    monkeypatch.setattr(page_index, "_page_index", None)
+    assert page_index.lookup_page(42, "bucket")["page_id"] == "page-id"
+
+    page_index.remove_from_page_index("42", "bucket")
+    monkeypatch.setattr(page_index, "_page_index", None)
+    assert page_index.lookup_page("42", "bucket") is None
+
+
+def test_page_index_off(monkeypatch):
+    monkeypatch.setattr(page_index, "PAGE_INDEX_STORE", "off")
+    monkeypatch.setattr(page_index, "_page_index", None)
+    page_index.update_page_index("1", "page-id", "web", "bucket")
+    assert page_index.lookup_page("1", "bucket") is None
+
+
+def test_page_index_s3_does_not_overwrite_other_writers(conditional_s3, monkeypatch):
+    monkeypatch.setattr(page_index, "PAGE_INDEX_STORE", "s3")
+    monkeypatch.setattr(page_index, "_page_index", None)
+    page_index.update_page_index("1", "page-1", "web", "bucket")
+
+    # 다른 Lambda가 같은 인덱스에 항목을 추가 (이 컨테이너의 캐시는 오래됨)
+    index = conditional_s3.load(page_index.PAGE_INDEX_S3_KEY)
+    index["2"] = {"page_id": "page-2", "category": "life"}
+    conditional_s3.objects[page_index.PAGE_INDEX_S3_KEY] = json.dumps(index).encode()
+
+    page_index.update_page_index("3", "page-3", "web", "bucket")
+
+    assert set(conditional_s3.load(page_index.PAGE_INDEX_S3_KEY)) == {"1", "2", "3"}
+    # 다시 읽은 최신 내용으로 캐시도 갱신
+    assert page_index.lookup_page("2", "bucket")["category"] == "life"
+
+    page_index.remove_from_page_index("1", "bucket")
+    assert set(conditional_s3.load(page_index.PAGE_INDEX_S3_KEY)) == {"2", "3"}
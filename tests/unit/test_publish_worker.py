@@ -0,0 +1,125 @@
+import json
+
+import config
+import jobs
+import publish_worker
+import pytest
+from botocore.exceptions import EndpointConnectionError
+from client import NotionAPIError
+
+
+def record(message_id, **message):
+    return {"messageId": message_id, "body": json.dumps(message)}
+
+
+@pytest.fixture
+def saved_jobs(monkeypatch):
+    """update_job 호출을 {job_id: 마지막 상태}로 기록"""
+    saved = {}
+
+    def update_job(job, bucket_name, status, **fields):
+        job = dict(job, status=status, **fields)
+        saved[job["job_id"]] = job
+        return job
+
+    monkeypatch.setattr(publish_worker, "get_job", lambda job_id, bucket: None)
+    monkeypatch.setattr(publish_worker, "update_job", update_job)
+    return saved
+
+
+def test_group_messages_groups_by_post_and_drops_malformed():
+    records = [
+        record("m1", job_id="a", custom_id=7),
+        {"messageId": "m2", "body": "not json"},
+        record("m3", job_id="b", custom_id="8"),
+        record("m4", job_id="c", custom_id="7", force=True),
+        record("m5", job_id="d"),
+    ]
+
+    groups = publish_worker.group_messages(records)
+
+    assert list(groups) == ["7", "8"]
+    assert [message_id for message_id, _ in groups["7"]] == ["m1", "m4"]
+
+
+def test_process_group_publishes_once_for_coalesced_jobs(saved_jobs, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        publish_worker,
+        "publish_by_custom_id",
+        lambda custom_id, force: calls.append((custom_id, force))
+        or {"statusCode": 200, "body": json.dumps({"message": "ok"})},
+    )
+    messages = [
+        ("m1", {"job_id": "a", "custom_id": "7"}),
+        ("m2", {"job_id": "b", "custom_id": "7", "force": True}),
+    ]
+
+    assert publish_worker.process_group("7", messages)
+
+    # 하나라도 force면 force로 한 번만 게시
+    assert calls == [("7", True)]
+    assert {job["status"] for job in saved_jobs.values()} == {jobs.SUCCEEDED}
+    assert saved_jobs["a"]["coalesced"] == ["a", "b"]
+
+
+@pytest.mark.parametrize(
+    "outcome, retry, status",
+    [
+        ({"statusCode": 500, "body": "{}"}, True, jobs.QUEUED),
+        ({"statusCode": 404, "body": "{}"}, False, jobs.FAILED),
+        (NotionAPIError("throttled", 429), True, jobs.QUEUED),
+    ],
+)
+def test_process_group_requeues_only_retryable_failures(
+    saved_jobs, monkeypatch, outcome, retry, status
+):
+    def publish_by_custom_id(custom_id, force):
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(publish_worker, "publish_by_custom_id", publish_by_custom_id)
+
+    ok = publish_worker.process_group("7", [("m1", {"job_id": "a", "custom_id": "7"})])
+
+    assert ok is not retry
+    assert saved_jobs["a"]["status"] == status
+
+
+class FakeSQS:
+    def __init__(self, error=None):
+        self.sent = []
+        self.error = error
+
+    def send_message(self, **kwargs):
+        if self.error:
+            raise self.error
+        self.sent.append(kwargs)
+
+
+def test_enqueue_publish_uses_post_message_group(conditional_s3, monkeypatch):
+    sqs = FakeSQS()
+    monkeypatch.setitem(config._clients, "sqs", sqs)
+    monkeypatch.setattr(jobs, "PUBLISH_QUEUE_URL", "https://sqs/queue.fifo")
+
+    job = jobs.enqueue_publish(7, False, "bucket")
+
+    assert job["status"] == jobs.QUEUED
+    (message,) = sqs.sent
+    # 같은 포스트의 작업은 한 번에 하나씩 처리되도록 custom_id로 그룹
+    assert message["MessageGroupId"] == "7"
+    assert "DelaySeconds" not in message
+    assert json.loads(message["MessageBody"])["job_id"] == job["job_id"]
+    assert conditional_s3.load(jobs.job_key(job["job_id"]))["status"] == jobs.QUEUED
+
+
+def test_enqueue_publish_marks_job_failed_when_send_fails(conditional_s3, monkeypatch):
+    sqs = FakeSQS(EndpointConnectionError(endpoint_url="https://sqs"))
+    monkeypatch.setitem(config._clients, "sqs", sqs)
+    monkeypatch.setattr(jobs, "PUBLISH_QUEUE_URL", "https://sqs/queue.fifo")
+
+    job = jobs.enqueue_publish("7", False, "bucket")
+
+    assert job["status"] == jobs.FAILED
+    assert conditional_s3.load(jobs.job_key(job["job_id"]))["status"] == jobs.FAILED
@@ -0,0 +1,39 @@
+import time
+
+from ratelimit import RequestStats, TokenBucket, backoff_delay
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # 첫 요청은 즉시, 이후 5번은 1/50초 간격
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_token_bucket_pause_blocks_until_retry_after():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(0.1)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, max_delay=2.0) <= 2.0
+
+
+def test_request_stats_snapshot():
+    stats = RequestStats()
+    stats.record(0.1, 200)
+    stats.record(0.3, 429)
+    stats.record(0.2)
+    stats.record_retry()
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 3
+    assert snapshot["throttled"] == 1
+    assert snapshot["errors"] == 1
+    assert snapshot["retries"] == 1
+    assert snapshot["max_latency_ms"] == 300.0
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from reconcile import diff_state
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def make_page(custom_id, category, status):
+    return {
+        "id": f"page-{custom_id}",
+        "properties": {
+            "ID": {"type": "unique_id", "unique_id": {"number": custom_id}},
+            "category": {"type": "select", "select": {"name": category}},
+            "status": {"type": "status", "status": {"name": status}},
+        },
+    }
+
+
+def make_post(manifest=True, age=timedelta(days=1)):
+    return {"keys": [], "manifest": manifest, "last_modified": NOW - age}
+
+
+def test_diff_state_finds_drift_in_memory():
+    pages = [
+        make_page(1, "web", "Uploaded"),  # 정상
+        make_page(2, "web", "Uploaded"),  # S3에 없음
+        make_page(3, "ai", "Uploaded"),  # web -> ai로 이동
+        make_page(4, "web", "Not Uploaded"),  # 게시됐지만 상태가 다름
+        make_page(5, "web", "Uploaded"),  # 게시 중 (manifest 전)
+    ]
+    posts = {
+        ("web", "1"): make_post(),
+        ("web", "3"): make_post(),
+        ("web", "4"): make_post(),
+        ("web", "5"): make_post(manifest=False, age=timedelta(seconds=5)),
+        ("web", "9"): make_post(),  # 데이터베이스에 없음
+        ("web", "10"): make_post(manifest=False, age=timedelta(seconds=5)),
+    }
+
+    report = diff_state(pages, posts, NOW)
+
+    assert [entry["custom_id"] for entry in report["missing"]] == ["2", "3", "5"]
+    assert report["moved"] == [
+        {"custom_id": "3", "page_id": "page-3", "category": "ai", "previous": ["web"]}
+    ]
+    assert [entry["custom_id"] for entry in report["unmarked"]] == ["4"]
+    # 최근에 쓰인 manifest 없는 폴더는 게시 중일 수 있으므로 남김
+    assert report["orphaned"] == [{"category": "web", "custom_id": "9"}]
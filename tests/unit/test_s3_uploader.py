@@ -0,0 +1,158 @@
+import io
+
+import config
+import metrics
+import pytest
+import s3_uploader
+import utils
+
+
+class FakePaginator:
+    def __init__(self, s3, page_size):
+        self.s3 = s3
+        self.page_size = page_size
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(key for key in self.s3.objects if key.startswith(Prefix))
+        for i in range(0, len(keys), self.page_size):
+            yield {"Contents": [{"Key": key} for key in keys[i : i + self.page_size]]}
+
+
+class FakeS3:
+    """list_objects_v2 페이지 크기와 delete_objects 호출을 확인하기 위한 stub"""
+
+    def __init__(self, keys=(), fail_keys=(), page_size=1000):
+        self.objects = {key: b"" for key in keys}
+        self.fail_keys = set(fail_keys)
+        self.page_size = page_size
+        self.delete_calls = []
+
+    def get_paginator(self, name):
+        return FakePaginator(self, self.page_size)
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        assert len(keys) <= 1000
+        self.delete_calls.append(keys)
+        errors = []
+        for key in keys:
+            if key in self.fail_keys:
+                errors.append({"Key": key, "Code": "AccessDenied"})
+            else:
+                self.objects.pop(key, None)
+        return {"Errors": errors} if errors else {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        if key in self.fail_keys:
+            raise s3_uploader.ClientError(
+                {"Error": {"Code": "InternalError", "Message": "boom"}}, "PutObject"
+            )
+        self.objects[key] = fileobj.read()
+        # s3transfer는 업로드가 끝나면 파일 객체를 닫음
+        fileobj.close()
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self.objects[Key] = self.objects[CopySource["Key"]]
+
+
+def test_delete_post_from_s3_paginates_and_chunks(monkeypatch):
+    keys = [f"posts/web/1/file-{i:04d}.png" for i in range(2500)]
+    fake = FakeS3(keys + ["posts/web/2/page.mdx"], page_size=1000)
+    monkeypatch.setitem(config._clients, "s3", fake)
+
+    results = s3_uploader.delete_post_from_s3("1", "web", "bucket")
+
+    assert len(results) == 2500
+    assert all(result.ok for result in results)
+    assert [len(call) for call in fake.delete_calls] == [1000, 1000, 500]
+    assert list(fake.objects) == ["posts/web/2/page.mdx"]
+
+
+def test_delete_post_from_s3_reports_partial_failures(monkeypatch):
+    fake = FakeS3(
+        ["posts/web/1/page.mdx", "posts/web/1/thumbnail.png"],
+        fail_keys=["posts/web/1/thumbnail.png"],
+    )
+    monkeypatch.setitem(config._clients, "s3", fake)
+
+    results = s3_uploader.delete_post_from_s3("1", "web", "bucket")
+
+    assert [result.key for result in results if not result.ok] == [
+        "posts/web/1/thumbnail.png"
+    ]
+
+
+def test_upload_version_copies_unchanged_and_reports_failures(monkeypatch):
+    fake = FakeS3(
+        ["posts/web/1/v1/page.mdx", "posts/web/1/v1/thumbnail.png"],
+        fail_keys=["posts/web/1/v2/b.json"],
+    )
+    fake.objects["posts/web/1/v1/page.mdx"] = b"same"
+    monkeypatch.setitem(config._clients, "s3", fake)
+    trace = metrics.start_trace()
+    previous = {
+        "version": "v1",
+        "objects": {
+            "page.mdx": s3_uploader.content_hash(b"same"),
+            "thumbnail.png": "abc",
+        },
+    }
+
+    hashes, results = s3_uploader.upload_version(
+        {"page.mdx": b"same", "thumbnail.png": None, "a.json": b"{}", "b.json": b"{}"},
+        "1",
+        "web",
+        "bucket",
+        "v2",
+        previous,
+    )
+
+    assert [result.key for result in results if not result.ok] == [
+        "posts/web/1/v2/b.json"
+    ]
+    assert fake.objects["posts/web/1/v2/page.mdx"] == b"same"
+    assert "posts/web/1/v2/thumbnail.png" in fake.objects
+    assert "posts/web/1/v2/a.json" in fake.objects
+    # 이전 버전은 그대로 남음
+    assert "posts/web/1/v1/page.mdx" in fake.objects
+    assert hashes["thumbnail.png"] == "abc"
+    # 객체마다 로그 대신 카운터로 집계
+    counters = trace.snapshot()["counters"]
+    assert counters["s3_puts"] == 1
+    assert counters["s3_copies"] == 2
+
+
+def test_store_image_and_thumbnail_create_variants_before_upload(monkeypatch):
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.new("RGB", (900, 600), (10, 120, 200)).save(buffer, "PNG")
+    data = buffer.getvalue()
+
+    def downloaded(*args):
+        return utils.DownloadedImage(
+            io.BytesIO(data), "a1b2.png", "image/png", "a1b2" * 16
+        )
+
+    fake = FakeS3()
+    monkeypatch.setitem(config._clients, "s3", fake)
+    monkeypatch.setattr(s3_uploader, "_known_assets", set())
+    monkeypatch.setattr(s3_uploader, "asset_exists", lambda key, bucket: False)
+    monkeypatch.setattr(s3_uploader, "download_image", downloaded)
+    monkeypatch.setattr(
+        s3_uploader,
+        "download_thumbnail",
+        lambda page, validators=None: downloaded()._replace(filename="thumbnail.png"),
+    )
+
+    stored = s3_uploader.store_image("https://e.com/a.png", "bucket")
+    thumbnail = s3_uploader.store_thumbnail({}, "1", "web", "bucket", "v2")
+
+    assert stored.variants == (
+        ("a1b2a1b2a1b2a1b2-640w.webp", 640),
+        ("a1b2a1b2a1b2a1b2-900w.webp", 900),
+    )
+    assert "assets/a1b2a1b2a1b2a1b2-640w.webp" in fake.objects
+    assert thumbnail.card == "og.jpg"
+    assert set(thumbnail.hashes) == {"thumbnail.png", "og.jpg"}
+    assert fake.objects["posts/web/1/v2/thumbnail.png"] == data
+    assert "posts/web/1/v2/og.jpg" in fake.objects
@@ -0,0 +1,102 @@
+import json
+
+import main
+import pytest
+import s3_uploader
+import search_index
+
+
+def test_tokenize_splits_hangul_into_bigrams():
+    assert search_index.tokenize("검색을 Search, 2024년 a_b") == [
+        "검색",
+        "색을",
+        "search",
+        "2024",
+        "년",
+        "a_b",
+    ]
+
+
+def test_shard_of_is_stable():
+    # 프론트엔드의 FNV-1a 구현과 같은 값이어야 함
+    assert search_index.shard_of("a", 16) == 0xE40C292C % 16
+    assert 0 <= search_index.shard_of("검색") < search_index.SEARCH_SHARDS
+
+
+def test_page_text_walks_nested_blocks():
+    blocks = [
+        {
+            "type": "toggle",
+            "toggle": {"rich_text": [{"plain_text": "접기"}]},
+            "children": [
+                {
+                    "type": "table_row",
+                    "table_row": {"cells": [[{"plain_text": "셀"}]]},
+                }
+            ],
+        },
+        {"type": "image", "image": {"caption": [{"plain_text": "그림"}]}},
+    ]
+    assert search_index.page_text(blocks) == "접기\n셀\n그림"
+
+
+def test_update_search_index_touches_only_changed_shards(conditional_s3):
+    fake = conditional_s3
+    doc = {"title": "검색 색인", "category": "web", "tags": ["python"]}
+
+    search_index.update_search_index("1", doc, "본문 python", "bucket")
+    search_index.update_search_index("2", dict(doc, title="다른 글"), "본문", "bucket")
+
+    shard = search_index.shard_key(search_index.shard_of("검색"))
+    assert fake.load(shard)["검색"] == {"1": search_index.TITLE_BOOST}
+    postings = fake.load(search_index.shard_key(search_index.shard_of("python")))
+    assert postings["python"] == {
+        "1": 1 + search_index.TAG_BOOST,
+        "2": search_index.TAG_BOOST,
+    }
+    assert set(fake.load(search_index.docs_key())["docs"]) == {"1", "2"}
+
+    # 본문만 조금 바뀌면 그 토큰의 샤드만 다시 씀
+    fake.puts.clear()
+    search_index.update_search_index("1", doc, "본문 python 추가", "bucket")
+    shards = {key for key in fake.puts if key.startswith("search/shards/")}
+    assert shards == {search_index.shard_key(search_index.shard_of("추가"))}
+
+    search_index.remove_from_search_index("1", "bucket")
+    assert "검색" not in fake.load(shard)
+    assert fake.load(search_index.shard_key(search_index.shard_of("본문")))["본문"] == {
+        "2": 1
+    }
+    assert set(fake.load(search_index.docs_key())["docs"]) == {"2"}
+    assert search_index.post_key("1") not in fake.objects
+
+
+def test_update_json_object_retries_on_concurrent_write(conditional_s3, monkeypatch):
+    fake = conditional_s3
+    monkeypatch.setattr(s3_uploader.time, "sleep", lambda seconds: None)
+    fake.objects["index.json"] = json.dumps({"a": 1}).encode()
+    # 읽은 뒤 쓰기 전에 다른 Lambda가 먼저 씀
+    fake.interleave["index.json"] = {"a": 1, "b": 2}
+
+    saved = s3_uploader.update_json_object(
+        "index.json", "bucket", lambda data: dict(data, c=3)
+    )
+
+    assert saved == {"a": 1, "b": 2, "c": 3}
+    assert fake.load("index.json") == saved
+
+
+def test_update_json_object_refuses_without_conditional_writes(
+    conditional_s3, monkeypatch
+):
+    # Lambda 런타임의 오래된 boto3는 IfMatch를 모름
+    monkeypatch.setattr(s3_uploader, "_conditional_writes", False)
+
+    with pytest.raises(s3_uploader.ConditionalWriteUnsupported):
+        s3_uploader.update_json_object("index.json", "bucket", lambda data: {})
+    # 색인 갱신의 넓은 except에서도 삼키지 않음
+    with pytest.raises(s3_uploader.ConditionalWriteUnsupported):
+        search_index.update_search_index("1", {"title": "t"}, "", "bucket")
+
+    assert conditional_s3.puts == []
+    assert s3_uploader.CONDITIONAL_WRITE_REQUIREMENT in main.check_config()
@@ -0,0 +1,157 @@
+import hashlib
+
+import urllib3
+import utils
+
+
+class FakeResponse:
+    def __init__(self, data, status=200, headers=None):
+        self.data = data
+        self.status = status
+        self.headers = headers or {}
+
+    def stream(self, amt):
+        for i in range(0, len(self.data), amt):
+            yield self.data[i : i + amt]
+
+    def release_conn(self):
+        pass
+
+
+class FakeHttp:
+    def __init__(self, responses):
+        self.responses = responses
+        self.headers = []
+        self.timeouts = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.headers.append(headers or {})
+        self.timeouts.append(kwargs.get("timeout"))
+        response = self.responses[url]
+        if isinstance(response, Exception):
+            raise response
+        if callable(response):
+            return response(headers or {})
+        return response
+
+
+def test_download_image_names_files_by_content(monkeypatch):
+    first_url = "https://files.notion.so/a/image.png?X-Amz-Signature=1"
+    second_url = "https://files.notion.so/b/image.png?X-Amz-Signature=2"
+    cover_url = "https://example.com/cover"
+    monkeypatch.setattr(
+        utils,
+        "http",
+        FakeHttp(
+            {
+                first_url: FakeResponse(b"same"),
+                second_url: FakeResponse(b"same"),
+                cover_url: FakeResponse(
+                    b"other", headers={"Content-Type": "image/jpeg"}
+                ),
+                "https://example.com/missing.png": FakeResponse(b"", status=403),
+            }
+        ),
+    )
+
+    first = utils.download_image(first_url)
+    second = utils.download_image(second_url)
+    third = utils.download_image(cover_url)
+
+    # 같은 내용은 URL이 달라도 같은 파일명
+    assert first.filename == second.filename
+    assert first.filename.endswith(".png")
+    assert first.content_type == "image/png"
+    assert first.digest == hashlib.sha256(b"same").hexdigest()
+    assert first.fileobj.read() == b"same"
+    # 확장자가 없는 URL은 Content-Type으로 결정
+    assert third.filename.endswith((".jpg", ".jpeg"))
+    assert utils.download_image("https://example.com/missing.png") is None
+
+    for image in (first, second, third):
+        image.close()
+
+
+def test_download_image_gives_up_on_stalled_download(monkeypatch):
+    url = "https://files.notion.so/a/image.png"
+    fake = FakeHttp({url: urllib3.exceptions.ReadTimeoutError(None, url, "timed out")})
+    monkeypatch.setattr(utils, "http", fake)
+
+    # 제한 시간이 지나면 실패로 처리해 게시 전체가 멈추지 않음
+    assert utils.download_image(url) is None
+    assert fake.timeouts == [utils.IMAGE_TIMEOUT]
+
+
+def test_download_thumbnail_uses_fixed_name(monkeypatch):
+    monkeypatch.setattr(
+        utils,
+        "http",
+        FakeHttp({"https://example.com/cover.webp": FakeResponse(b"cover")}),
+    )
+    page = {
+        "cover": {
+            "type": "external",
+            "external": {"url": "https://example.com/cover.webp"},
+        }
+    }
+    image = utils.download_thumbnail(page)
+    assert image.filename == "thumbnail.webp"
+    image.close()
+    assert utils.download_thumbnail({"cover": None}) is None
+
+
+def test_thumbnail_uses_conditional_get_and_response_type(monkeypatch):
+    url = "https://example.com/cover.png"
+
+    def respond(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return FakeResponse(b"", status=304)
+        return FakeResponse(
+            b"cover",
+            headers={
+                "Content-Type": "image/jpeg",
+                "ETag": '"v1"',
+                "Last-Modified": "Wed, 01 May 2024 00:00:00 GMT",
+            },
+        )
+
+    fake = FakeHttp({url: respond})
+    monkeypatch.setattr(utils, "http", fake)
+    page = {"cover": {"type": "external", "external": {"url": url}}}
+
+    image = utils.download_thumbnail(page)
+    image.close()
+
+    # 확장자는 URL(.png)이 아니라 응답의 Content-Type으로 결정
+    assert image.filename == "thumbnail.jpg"
+    assert image.validators == {
+        "etag": '"v1"',
+        "last_modified": "Wed, 01 May 2024 00:00:00 GMT",
+    }
+    assert utils.download_thumbnail(page, image.validators) is utils.NOT_MODIFIED
+    assert fake.headers[-1] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 May 2024 00:00:00 GMT",
+    }
+
+
+def test_generate_metadata_escapes_frontmatter_values():
+    page = {
+        "created_time": "2024-05-01T09:00:00.000Z",
+        "properties": {
+            "tags": {"multi_select": [{"name": "aws"}, {"name": 'say "hi"'}]},
+            "description": {"rich_text": [{"plain_text": "a: b"}]},
+        },
+    }
+
+    metadata = utils.generate_metadata(page, "Re: 제목")
+
+    assert metadata.splitlines() == [
+        "---",
+        'title: "Re: 제목"',
+        'date: "2024/05/01"',
+        'description: "a: b"',
+        'tags: ["aws", "say \\"hi\\""]',
+        'author: "Anonymous"',
+        "---",
+    ]
@@ -0,0 +1,34 @@
+from version_gc import find_garbage
+
+
+def test_find_garbage_keeps_manifest_recent_and_newer_versions():
+    prefix = "posts/web/1/"
+    keys = [
+        prefix + name
+        for name in [
+            "manifest.json",
+            "page.mdx",
+            "thumbnail.png",
+            "v1/page.mdx",
+            "v2/page.mdx",
+            "v3/page.mdx",
+            "v3/thumbnail.png",
+            "v4/page.mdx",
+            "v10/page.mdx",
+        ]
+    ]
+
+    garbage = find_garbage(keys, prefix, revision=3)
+
+    assert garbage == [
+        prefix + "page.mdx",
+        prefix + "thumbnail.png",
+        prefix + "v1/page.mdx",
+    ]
+
+
+def test_find_garbage_reads_revision_from_suffixed_folders():
+    prefix = "posts/web/1/"
+    keys = [prefix + "v1-0a1b2c3d/page.mdx", prefix + "v3-9f8e7d6c/page.mdx"]
+
+    assert find_garbage(keys, prefix, revision=3) == [prefix + "v1-0a1b2c3d/page.mdx"]
@@ -2,6 +2,7 @@ import aws_cdk as core
 import aws_cdk.assertions as assertions
 
 from contents_platform.cloudfront import CloudFrontStack
+from contents_platform.post_upload import PostUploadStack
 
 
 # example tests. To run these tests, uncomment this file along with the example
@@ -15,3 +16,196 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+
+def post_upload_template(**context):
+    # 테스트에서는 boto3 layer 번들링(pip install)을 건너뜀
+    app = core.App(context={"aws:cdk:bundling-stacks": [], **context})
+    return assertions.Template.from_stack(PostUploadStack(app, "PostUploadStack"))
+
+
+def test_upload_is_queued_for_publish_worker():
+    template = post_upload_template()
+
+    template.resource_count_is("AWS::SQS::Queue", 2)
+    template.has_resource_properties(
+        "AWS::SQS::Queue",
+        {
+            "FifoQueue": True,
+            "ContentBasedDeduplication": True,
+            "DelaySeconds": 5,
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::EventSourceMapping",
+        {
+            "BatchSize": 10,
+            "FunctionResponseTypes": ["ReportBatchItemFailures"],
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function", {"Handler": "publish_worker.lambda_handler"}
+    )
+
+
+def test_post_lambdas_use_supported_runtime():
+    template = post_upload_template()
+
+    # 게시 Lambda는 모두 같은 인터프리터 (python3.9는 새 함수를 만들 수 없음)
+    functions = template.find_resources("AWS::Lambda::Function")
+    runtimes = {
+        function["Properties"].get("Runtime")
+        for function in functions.values()
+        if function["Properties"].get("Handler", "").endswith(".lambda_handler")
+    }
+    assert runtimes == {"python3.12"}
+
+
+def test_pillow_layer_is_attached_to_publishers():
+    template = post_upload_template(
+        pillow_layer_arn="arn:aws:lambda:us-east-1:123:layer:pillow:1"
+    )
+
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "publish_worker.lambda_handler",
+            "Layers": assertions.Match.array_with(
+                ["arn:aws:lambda:us-east-1:123:layer:pillow:1"]
+            ),
+            "MemorySize": 1024,
+        },
+    )
+
+
+def test_idempotency_table_is_shared_with_api_lambda():
+    template = post_upload_template()
+
+    template.has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "KeySchema": [{"AttributeName": "key", "KeyType": "HASH"}],
+            "BillingMode": "PAY_PER_REQUEST",
+            "TimeToLiveSpecification": {
+                "AttributeName": "expires_at",
+                "Enabled": True,
+            },
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "main.lambda_handler",
+            "Environment": {
+                "Variables": assertions.Match.object_like(
+                    {"IDEMPOTENCY_TABLE": assertions.Match.any_value()}
+                )
+            },
+        },
+    )
+
+
+def test_publishers_can_invalidate_post_distribution():
+    template = post_upload_template()
+
+    # 무효화 대상은 포스트 버킷을 원본으로 하는 배포
+    (distribution_id,) = template.find_resources("AWS::CloudFront::Distribution")
+    (bucket_id,) = template.find_resources("AWS::S3::Bucket")
+    template.has_resource_properties(
+        "AWS::CloudFront::Distribution",
+        {
+            "DistributionConfig": assertions.Match.object_like(
+                {
+                    "Origins": [
+                        assertions.Match.object_like(
+                            {
+                                "DomainName": {
+                                    "Fn::GetAtt": [bucket_id, "RegionalDomainName"]
+                                }
+                            }
+                        )
+                    ]
+                }
+            )
+        },
+    )
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "publish_worker.lambda_handler",
+            "Environment": {
+                "Variables": assertions.Match.object_like(
+                    {"CLOUDFRONT_DISTRIBUTION_ID": {"Ref": distribution_id}}
+                )
+            },
+        },
+    )
+    template.has_resource_properties(
+        "AWS::IAM::Policy",
+        {
+            "PolicyDocument": {
+                "Statement": assertions.Match.array_with(
+                    [
+                        assertions.Match.object_like(
+                            {"Action": "cloudfront:CreateInvalidation"}
+                        )
+                    ]
+                )
+            }
+        },
+    )
+
+
+def test_post_distribution_serves_only_public_prefixes():
+    template = post_upload_template()
+
+    (distribution,) = template.find_resources("AWS::CloudFront::Distribution").values()
+    config = distribution["Properties"]["DistributionConfig"]
+    # 기본 동작(jobs/, meta/ 등)은 원본에 가지 않고 403
+    assert config["DefaultCacheBehavior"]["FunctionAssociations"]
+    behaviors = {
+        behavior["PathPattern"]: bool(behavior.get("FunctionAssociations"))
+        for behavior in config["CacheBehaviors"]
+    }
+    assert behaviors == {
+        "posts/*/manifest.json": True,
+        "posts/*/blocks.json": True,
+        "posts/*": False,
+        "assets/*": False,
+        "search/*": False,
+    }
+    # 앞의 패턴이 먼저 적용되므로 manifest/블록 캐시 거부가 posts/*보다 앞
+    patterns = list(behaviors)
+    assert patterns.index("posts/*/blocks.json") < patterns.index("posts/*")
+
+
+def test_boto3_layer_is_built_by_default():
+    template = post_upload_template()
+
+    # 기본 배포에서도 조건부 쓰기를 지원하는 boto3를 layer로 붙임
+    (layer_id,) = template.find_resources("AWS::Lambda::LayerVersion")
+    for handler in (
+        "main.lambda_handler",
+        "publish_worker.lambda_handler",
+        "bulk_sync.lambda_handler",
+        "reconcile.lambda_handler",
+    ):
+        template.has_resource_properties(
+            "AWS::Lambda::Function",
+            {"Handler": handler, "Layers": [{"Ref": layer_id}]},
+        )
+
+
+def test_boto3_layer_arn_replaces_bundled_layer():
+    template = post_upload_template(
+        boto3_layer_arn="arn:aws:lambda:us-east-1:123:layer:boto3:1"
+    )
+
+    template.has_resource_properties(
+        "AWS::Lambda::Function",
+        {
+            "Handler": "main.lambda_handler",
+            "Layers": ["arn:aws:lambda:us-east-1:123:layer:boto3:1"],
+        },
+    )
+    template.resource_count_is("AWS::Lambda::LayerVersion", 0)